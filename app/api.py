@@ -0,0 +1,390 @@
+"""
+레고 창작 설계 파이프라인 HTTP API (Streamlit 과 별도로 실행되는 ASGI 서비스)
+
+실행:
+    uvicorn api:app --app-dir app --host 0.0.0.0 --port 8000 --workers 2
+
+- 설계 결과 보관소(DesignStore)는 SQLite 파일이므로 같은 파일을 보는 워커/컨테이너끼리 공유된다.
+  (?wait=false 로 만든 id 를 다른 워커가 받아도 GET 으로 조회 가능)
+
+- POST /designs              : 설계 생성 (기본 동기 응답)
+    ?stream=true             → SSE(text/event-stream)로 토큰/노드 이벤트 스트리밍
+    ?wait=false              → 202 + id 즉시 반환, 백그라운드 실행 후 GET 으로 조회
+- GET  /designs/{design_id}  : 설계 결과/상태 조회
+- GET  /healthz              : 클라이언트/동시 실행 상태
+- GET  /metrics              : Prometheus 형식 메트릭 (LEGO_METRICS=on 일 때 수집)
+
+환경변수:
+- LEGO_API_MAX_CONCURRENCY (기본 4): 워커당 동시 그래프 실행 수
+- LEGO_API_QUEUE_TIMEOUT (기본 30초): 실행 슬롯을 기다리는 최대 시간 (초과 시 503)
+- LEGO_API_TIMEOUT (기본 180초): 그래프 1회 실행 제한 시간 (초과 시 504)
+- LEGO_API_MAX_RECORDS (기본 1000): 보관할 설계 결과 수 (오래된 것부터 삭제)
+- LEGO_API_STORE_PATH (기본 app/cache/design_records.sqlite3): 설계 결과 보관 파일 (워커/컨테이너가 공유할 경로)
+
+요청의 pipeline 필드: full(3단계) / fast(1회 호출) / auto(기본, 소형 + 입문자 작품이면 fast – workflow.graph.select_pipeline)
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from utils import metrics
+from utils.config import get_int_env, warmup_clients, check_clients_health
+from utils.user_input import build_user_input
+from workflow.graph import (
+    create_pipeline_graph,
+    select_pipeline,
+    build_initial_state,
+    astream_lego_graph,
+    pipeline_signature,
+    PIPELINES,
+)
+from retrieval.vector_store import get_retrieval_stats
+from workflow.result_cache import get_result_cache, design_cache_key
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_PATH = os.path.join(BASE_DIR, "cache", "design_records.sqlite3")
+
+
+class DesignRequest(BaseModel):
+    """설계 요청 (Streamlit 사이드바 입력과 같은 필드)"""
+
+    goal: str
+    mode: str = ""
+    scale: str = ""
+    usage: str = ""
+    difficulty: str = ""
+    colors: str = ""
+    parts: str = ""
+    constraints: str = ""
+    pipeline: str = ""  # full / fast / auto (빈 값이면 auto)
+
+
+class DesignStore:
+    """
+    설계 결과 보관소 (SQLite 파일, 오래된 것부터 max_records 개까지 유지)
+
+    - 워커 프로세스/컨테이너가 같은 파일을 열면 어느 워커로 GET 이 와도 같은 결과를 본다.
+    - 레코드는 JSON 한 덩어리로 저장하고, update 는 BEGIN IMMEDIATE 안에서 읽고-고쳐-쓰기
+      (다른 프로세스의 update 와 섞여 필드가 유실되지 않도록)
+    - 모든 메서드는 blocking 이므로 이벤트 루프에서는 asyncio.to_thread 로 호출
+    """
+
+    def __init__(self, max_records: int, path: str = DEFAULT_STORE_PATH) -> None:
+        self.max_records = max_records
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS design_records (
+                id TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_design_records_created ON design_records (created_at)")
+
+    def create(self, user_input: str, cache_key: str = "", pipeline: str = "") -> Dict[str, Any]:
+        record = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "created_at": time.time(),
+            "user_input": user_input,
+            "pipeline": pipeline,
+            "cache_key": cache_key,
+            "cached": False,
+            "final_answer": None,
+            "messages": [],
+            "error": None,
+            "elapsed_sec": None,
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO design_records (id, record, created_at) VALUES (?, ?, ?)",
+                (record["id"], json.dumps(record, ensure_ascii=False), record["created_at"]),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM design_records WHERE id IN (
+                    SELECT id FROM design_records ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_records,),
+            )
+        return record
+
+    def update(self, design_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT record FROM design_records WHERE id = ?", (design_id,)).fetchone()
+                if row is not None:
+                    record = json.loads(row[0])
+                    record.update(fields)
+                    self._conn.execute(
+                        "UPDATE design_records SET record = ? WHERE id = ?",
+                        (json.dumps(record, ensure_ascii=False), design_id),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, design_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM design_records WHERE id = ?", (design_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 워커당 파이프라인별 컴파일된 그래프 1개를 모든 요청이 공유
+    try:
+        warmup_clients()
+    except Exception as e:
+        logger.warning("[api] 클라이언트 워밍업 실패: %s", e)
+    app.state.graphs = {pipeline: create_pipeline_graph(pipeline) for pipeline in PIPELINES}
+    app.state.slots = asyncio.Semaphore(get_int_env("LEGO_API_MAX_CONCURRENCY", 4))
+    app.state.queue_timeout = float(get_int_env("LEGO_API_QUEUE_TIMEOUT", 30))
+    app.state.run_timeout = float(get_int_env("LEGO_API_TIMEOUT", 180))
+    app.state.store = DesignStore(
+        get_int_env("LEGO_API_MAX_RECORDS", 1000),
+        path=(os.getenv("LEGO_API_STORE_PATH") or "").strip() or DEFAULT_STORE_PATH,
+    )
+    app.state.tasks = set()
+    yield
+
+
+app = FastAPI(title="Lego AI Design API", lifespan=lifespan)
+
+
+# ------------------------------------------------------------
+# 실행 유틸
+# ------------------------------------------------------------
+def _complete(record: Dict[str, Any], state: Dict[str, Any], elapsed: float) -> None:
+    """(blocking) 실행 결과를 store 에 기록하고 결과 캐시에 저장"""
+    app.state.store.update(
+        record["id"],
+        status="done",
+        final_answer=state.get("final_answer") or "",
+        messages=state.get("messages", []),
+        elapsed_sec=elapsed,
+    )
+    cache = get_result_cache()
+    if cache and record.get("cache_key"):
+        cache.set(record["cache_key"], state)
+
+
+async def _update(design_id: str, **fields: Any) -> None:
+    """store.update 를 이벤트 루프 밖(스레드)에서 실행"""
+    await asyncio.to_thread(app.state.store.update, design_id, **fields)
+
+
+async def _acquire_slot() -> None:
+    """동시 실행 슬롯 확보 (대기 시간 초과 시 503)"""
+    try:
+        await asyncio.wait_for(app.state.slots.acquire(), timeout=app.state.queue_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="서버가 바쁩니다. 잠시 후 다시 시도하세요.")
+
+
+async def _run_design(record: Dict[str, Any]) -> Dict[str, Any]:
+    """그래프 1회 실행 (슬롯은 호출 측에서 확보한 상태). 결과를 store 에 기록."""
+    await _update(record["id"], status="running")
+    started = time.perf_counter()
+    try:
+        with metrics.span("graph.run", entry="api"):
+            state = await asyncio.wait_for(
+                app.state.graphs[record["pipeline"]].ainvoke(build_initial_state(record["user_input"])),
+                timeout=app.state.run_timeout,
+            )
+    except asyncio.TimeoutError:
+        await _update(record["id"], status="timeout", error="실행 시간 초과", elapsed_sec=time.perf_counter() - started)
+        raise HTTPException(status_code=504, detail="설계 생성 시간이 초과되었습니다.")
+    except Exception as e:
+        logger.exception("[api] 그래프 실행 중 예외 발생: %s", record["id"])
+        await _update(record["id"], status="error", error=str(e), elapsed_sec=time.perf_counter() - started)
+        raise HTTPException(status_code=500, detail=f"설계 생성 중 오류가 발생했습니다: {e}")
+
+    await asyncio.to_thread(_complete, record, state, time.perf_counter() - started)
+    return await asyncio.to_thread(app.state.store.get, record["id"])
+
+
+async def _run_in_background(record: Dict[str, Any]) -> None:
+    try:
+        await _acquire_slot()
+    except HTTPException as e:
+        await _update(record["id"], status="rejected", error=e.detail)
+        return
+    try:
+        await _run_design(record)
+    except HTTPException:
+        pass  # 상태는 store 에 이미 기록됨
+    finally:
+        app.state.slots.release()
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_design(record: Dict[str, Any]) -> AsyncIterator[str]:
+    """SSE 스트림: created / token / node_end / final / error 이벤트"""
+    try:
+        await _acquire_slot()
+    except HTTPException as e:
+        await _update(record["id"], status="rejected", error=e.detail)
+        yield _sse("error", {"id": record["id"], "detail": e.detail})
+        return
+
+    await _update(record["id"], status="running")
+    started = time.perf_counter()
+    deadline = started + app.state.run_timeout
+    events = astream_lego_graph(app.state.graphs[record["pipeline"]], build_initial_state(record["user_input"]))
+
+    try:
+        yield _sse("created", {"id": record["id"]})
+        while True:
+            try:
+                event = await asyncio.wait_for(events.__anext__(), timeout=max(deadline - time.perf_counter(), 0.001))
+            except StopAsyncIteration:
+                break
+
+            if event["type"] == "final":
+                state = event["state"]
+                await asyncio.to_thread(_complete, record, state, time.perf_counter() - started)
+                yield _sse("final", {"id": record["id"], "final_answer": state.get("final_answer") or ""})
+            else:
+                yield _sse(event["type"], {k: v for k, v in event.items() if k != "type"})
+    except asyncio.TimeoutError:
+        await _update(record["id"], status="timeout", error="실행 시간 초과", elapsed_sec=time.perf_counter() - started)
+        yield _sse("error", {"id": record["id"], "detail": "설계 생성 시간이 초과되었습니다."})
+    except Exception as e:
+        logger.exception("[api] 스트리밍 실행 중 예외 발생: %s", record["id"])
+        await _update(record["id"], status="error", error=str(e), elapsed_sec=time.perf_counter() - started)
+        yield _sse("error", {"id": record["id"], "detail": str(e)})
+    finally:
+        await events.aclose()
+        app.state.slots.release()
+
+
+def _prepare_design(req: DesignRequest) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    (blocking) 요청 정리 + 레코드 생성 + 결과 캐시 조회 → (record, 캐시된 결과 또는 None)
+
+    파이프라인 서명(클라이언트 설정 조회), SQLite 결과 캐시/보관소 접근이 있으므로 스레드에서 실행
+    """
+    fields = req.model_dump()
+    user_input = build_user_input(req.goal, fields)
+    pipeline = select_pipeline(req.pipeline, fields)
+
+    # 같은 입력/프롬프트/모델 조합이면 이전 결과를 바로 반환
+    cache = get_result_cache()
+    cache_key = design_cache_key(user_input, pipeline_signature(pipeline=pipeline)) if cache else ""
+    record = app.state.store.create(user_input, cache_key=cache_key, pipeline=pipeline)
+
+    cached = cache.get(cache_key) if cache else None
+    if cached:
+        app.state.store.update(
+            record["id"],
+            status="done",
+            cached=True,
+            final_answer=cached.get("final_answer", ""),
+            messages=cached.get("messages", []),
+            elapsed_sec=0.0,
+        )
+    return record, cached
+
+
+# ------------------------------------------------------------
+# 엔드포인트
+# ------------------------------------------------------------
+@app.post("/designs")
+async def create_design(
+    req: DesignRequest,
+    stream: bool = Query(False, description="SSE 스트리밍 응답"),
+    wait: bool = Query(True, description="false 이면 202 로 즉시 반환"),
+):
+    record, cached = await asyncio.to_thread(_prepare_design, req)
+    logger.info(
+        "[api] 설계 요청 접수: id=%s, pipeline=%s, stream=%s, wait=%s",
+        record["id"],
+        record["pipeline"],
+        stream,
+        wait,
+    )
+
+    if cached:
+        if stream:
+            events = [
+                _sse("created", {"id": record["id"]}),
+                _sse("final", {"id": record["id"], "final_answer": cached.get("final_answer", ""), "cached": True}),
+            ]
+            return StreamingResponse(iter(events), media_type="text/event-stream")
+        if not wait:
+            return JSONResponse(status_code=202, content={"id": record["id"], "status": "done"})
+        return await asyncio.to_thread(app.state.store.get, record["id"])
+
+    if not wait:
+        task = asyncio.create_task(_run_in_background(record))
+        # 실행 중인 Task 가 GC 되지 않도록 참조 유지
+        app.state.tasks.add(task)
+        task.add_done_callback(app.state.tasks.discard)
+        return JSONResponse(status_code=202, content={"id": record["id"], "status": "queued"})
+
+    if stream:
+        return StreamingResponse(
+            _stream_design(record),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    await _acquire_slot()
+    try:
+        return await _run_design(record)
+    finally:
+        app.state.slots.release()
+
+
+@app.get("/designs/{design_id}")
+async def get_design(design_id: str):
+    record = await asyncio.to_thread(app.state.store.get, design_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="해당 설계를 찾을 수 없습니다.")
+    return record
+
+
+@app.get("/healthz")
+async def healthz():
+    cache = get_result_cache()
+    return {
+        "clients": check_clients_health(),
+        "busy": app.state.slots.locked(),
+        "result_cache": await asyncio.to_thread(cache.stats) if cache else None,
+        "retrieval": get_retrieval_stats(),
+        "background_tasks": len(app.state.tasks),
+        "metrics_enabled": metrics.is_enabled(),
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
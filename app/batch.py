@@ -0,0 +1,355 @@
+"""
+설계 일괄 생성 CLI (카탈로그/교구 세트용 대량 생성)
+
+실행:
+    cd app && python -m batch --input designs.jsonl --output results.jsonl --concurrency 4
+
+입력 JSONL (한 줄에 요청 하나, Streamlit 사이드바와 같은 필드):
+    {"id": "kit-01", "goal": "빨간 지붕의 작은 집", "scale": "소형", "usage": "전시용", "difficulty": "입문자",
+     "colors": "빨강, 흰색", "parts": "", "constraints": ""}
+    - id 는 선택 (없으면 요청 내용 해시로 만듦 → 같은 파일로 다시 실행해도 같은 id)
+    - pipeline 은 선택: full(3단계) / fast(1회 호출) / auto (없으면 --pipeline, 기본 auto – 소형 + 입문자 작품이면 fast)
+
+출력 JSONL: 항목이 끝나는 대로 한 줄씩 추가 (id, status, pipeline, final_answer, bricks, elapsed_sec, ...)
+- 출력 파일이 곧 체크포인트: 다시 실행하면 status=done 인 id 는 건너뛰고 나머지만 실행
+  (실패/시간 초과 항목은 다시 시도, --skip-failed 로 건너뛰기. 같은 id 가 여러 줄이면 마지막 줄이 유효)
+- 줄마다 flush + fsync 하므로 중간에 죽어도 끝난 항목은 남고, 마지막 줄이 반쯤 써졌으면 읽을 때 무시
+- 진행 상황(완료/실패 수, 처리량, ETA)을 stderr 로 출력
+
+환경변수:
+- LEGO_BATCH_CONCURRENCY (기본 4): 동시 그래프 실행 수
+- LEGO_BATCH_TIMEOUT (기본 300초): 항목 1건 실행 제한 시간
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO
+
+from utils import metrics
+from utils.answer_parser import parse_answer
+from utils.config import get_int_env, warmup_clients
+from utils.user_input import build_user_input
+from workflow.graph import (
+    create_pipeline_graph,
+    select_pipeline,
+    build_initial_state,
+    pipeline_signature,
+    PIPELINE_AUTO,
+)
+from workflow.result_cache import get_result_cache, design_cache_key
+
+logger = logging.getLogger(__name__)
+
+# 입력 한 줄에서 읽는 필드 (Streamlit render_sidebar / API DesignRequest 와 동일)
+REQUEST_FIELDS = ("goal", "mode", "scale", "usage", "difficulty", "colors", "parts", "constraints")
+
+
+def _request_id(request: Dict[str, str]) -> str:
+    payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def read_requests(path: str, pipeline: str = PIPELINE_AUTO) -> List[Dict[str, Any]]:
+    """
+    입력 JSONL → [{"id", "line", "request", "pipeline"}, ...]
+    - pipeline: 줄에 pipeline 필드가 없을 때 쓰는 값 (auto 는 규모/난이도로 full/fast 확정)
+    - 빈 줄/주석(#) 무시, JSON 이 아니거나 goal 이 없으면 ValueError (줄 번호 포함)
+    - 같은 내용이 여러 번 나오면 id 뒤에 #2, #3 … 을 붙여 각각 실행
+    """
+    items: List[Dict[str, Any]] = []
+    seen: Dict[str, int] = {}
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: JSON 형식이 아닙니다 ({e})") from e
+            if not isinstance(data, dict) or not str(data.get("goal") or "").strip():
+                raise ValueError(f"{path}:{line_no}: goal 필드가 필요합니다")
+
+            request = {field: str(data.get(field) or "") for field in REQUEST_FIELDS}
+            item_id = str(data.get("id") or "") or _request_id(request)
+            seen[item_id] = seen.get(item_id, 0) + 1
+            if seen[item_id] > 1:
+                item_id = f"{item_id}#{seen[item_id]}"
+            choice = str(data.get("pipeline") or "") or pipeline
+            items.append(
+                {"id": item_id, "line": line_no, "request": request, "pipeline": select_pipeline(choice, request)}
+            )
+    return items
+
+
+def _iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 비정상 종료로 반쯤 써진 줄
+            if isinstance(record, dict) and record.get("id"):
+                yield record
+
+
+def load_checkpoint(path: str) -> Dict[str, str]:
+    """기존 출력 파일에서 id → 마지막 status (파일이 없으면 빈 dict)"""
+    if not os.path.exists(path):
+        return {}
+    return {record["id"]: record.get("status", "") for record in _iter_records(path)}
+
+
+class ResultWriter:
+    """결과 JSONL 에 한 줄씩 추가 (줄마다 flush + fsync → 체크포인트 역할)"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 이전 실행이 줄 중간에 끊겼으면 새 줄에서 시작
+        needs_newline = False
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file: TextIO = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """완료 수/처리량/ETA 집계 (이번 실행에서 처리한 항목 기준)"""
+
+    def __init__(self, total: int, skipped: int, stream: TextIO = sys.stderr, interval: float = 2.0) -> None:
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.cached = 0
+        self.stream = stream
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last_print = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.done + self.failed
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        remaining = self.total - self.skipped - self.processed
+        rate = self.rate()
+        return remaining / rate if rate > 0 else None
+
+    def update(self, status: str, cached: bool = False) -> None:
+        if status == "done":
+            self.done += 1
+        else:
+            self.failed += 1
+        if cached:
+            self.cached += 1
+        now = time.perf_counter()
+        if now - self._last_print >= self.interval or self.skipped + self.processed >= self.total:
+            self._last_print = now
+            self.print()
+
+    def line(self) -> str:
+        eta = self.eta()
+        return (
+            f"[batch] {self.skipped + self.processed}/{self.total}"
+            f" (이번 실행 완료 {self.done}, 실패 {self.failed}, 캐시 {self.cached}, 이전 실행 {self.skipped})"
+            f" | {self.rate() * 60:.1f}건/분"
+            f" | 경과 {_format_duration(time.perf_counter() - self.started)}"
+            f" | ETA {_format_duration(eta) if eta is not None else '-'}"
+        )
+
+    def print(self) -> None:
+        print(self.line(), file=self.stream, flush=True)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "done": self.done,
+            "failed": self.failed,
+            "cached": self.cached,
+            "elapsed_sec": round(time.perf_counter() - self.started, 3),
+            "items_per_min": round(self.rate() * 60, 2),
+        }
+
+
+async def _run_item(graph, item: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """요청 1건 실행 → 출력 레코드 (예외는 status 로 기록하고 밖으로 던지지 않음)"""
+    request = item["request"]
+    user_input = build_user_input(request["goal"], request)
+    pipeline = item["pipeline"]
+    record: Dict[str, Any] = {
+        "id": item["id"],
+        "line": item["line"],
+        "request": request,
+        "pipeline": pipeline,
+        "cached": False,
+    }
+
+    cache = get_result_cache()
+    cache_key = design_cache_key(user_input, pipeline_signature(pipeline=pipeline)) if cache else ""
+    started = time.perf_counter()
+    try:
+        state = cache.get(cache_key) if cache else None
+        if state:
+            record["cached"] = True
+        else:
+            with metrics.span("graph.run", entry="batch"):
+                state = await asyncio.wait_for(graph.ainvoke(build_initial_state(user_input)), timeout=timeout)
+            if cache:
+                cache.set(cache_key, state)
+    except asyncio.TimeoutError:
+        record.update(status="timeout", error=f"실행 시간 초과 ({timeout:.0f}초)")
+    except Exception as e:
+        logger.exception("[batch] 그래프 실행 중 예외 발생: %s", item["id"])
+        record.update(status="error", error=str(e))
+    else:
+        final_answer = state.get("final_answer") or ""
+        timings = [m.get("timing") or {} for m in state.get("messages", [])]
+        record.update(
+            status="done",
+            final_answer=final_answer,
+            bricks=parse_answer(final_answer)["rows"],
+            prompt_tokens=sum(t.get("prompt_tokens", 0) for t in timings),
+            prompt_tokens_saved=sum(t.get("prompt_tokens_saved", 0) for t in timings),
+        )
+
+    record["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    record["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    return record
+
+
+async def run_batch(
+    items: List[Dict[str, Any]],
+    output_path: str,
+    concurrency: int = 4,
+    timeout: float = 300.0,
+    retry_failed: bool = True,
+    graph=None,
+    progress_stream: TextIO = sys.stderr,
+) -> Dict[str, Any]:
+    """
+    items 를 최대 concurrency 개씩 동시에 실행하고 끝나는 대로 output_path 에 기록.
+    출력 파일에 이미 끝난(status=done) id 는 건너뜀. 반환값은 실행 요약.
+    graph 를 주면 모든 항목이 그 그래프를 사용 (없으면 항목의 pipeline 별로 한 번씩 생성)
+    """
+    previous = load_checkpoint(output_path)
+    finished: Set[str] = {i for i, status in previous.items() if status == "done" or not retry_failed}
+    pending = [item for item in items if item["id"] not in finished]
+    progress = Progress(len(items), len(items) - len(pending), stream=progress_stream)
+    if progress.skipped:
+        logger.info("[batch] 이전 실행에서 끝난 항목 %d건 건너뜀", progress.skipped)
+    progress.print()
+
+    if not pending:
+        return progress.summary()
+
+    graphs = {item["pipeline"]: graph for item in pending} if graph is not None else {}
+    for item in pending:
+        if item["pipeline"] not in graphs:
+            graphs[item["pipeline"]] = create_pipeline_graph(item["pipeline"])
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+
+    writer = ResultWriter(output_path)
+
+    async def worker() -> None:
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            record = await _run_item(graphs[item["pipeline"]], item, timeout)
+            writer.write(record)
+            progress.update(record["status"], cached=record["cached"])
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(pending))))))
+    finally:
+        writer.close()
+    return progress.summary()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="레고 설계 일괄 생성 (JSONL 입력 → JSONL 출력, 중단 후 이어서 실행)")
+    parser.add_argument("--input", required=True, help="설계 요청 JSONL (한 줄에 goal + 사이드바 필드)")
+    parser.add_argument("--output", required=True, help="결과 JSONL (체크포인트 겸용, 이어서 실행 시 같은 경로)")
+    parser.add_argument("--concurrency", type=int, default=get_int_env("LEGO_BATCH_CONCURRENCY", 4))
+    parser.add_argument("--timeout", type=float, default=get_int_env("LEGO_BATCH_TIMEOUT", 300), help="항목당 제한 시간(초)")
+    parser.add_argument(
+        "--pipeline",
+        choices=("auto", "full", "fast"),
+        default=PIPELINE_AUTO,
+        help="pipeline 필드가 없는 줄의 실행 방식 (auto: 소형 + 입문자 작품은 fast)",
+    )
+    parser.add_argument("--skip-failed", action="store_true", help="이전 실행에서 실패한 항목도 다시 실행하지 않음")
+    parser.add_argument("--verbose", action="store_true", help="에이전트/검색 로그까지 출력")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+    )
+
+    try:
+        items = read_requests(args.input, pipeline=args.pipeline)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    try:
+        warmup_clients()
+    except Exception as e:
+        logger.warning("[batch] 클라이언트 워밍업 실패: %s", e)
+
+    summary = asyncio.run(
+        run_batch(
+            items,
+            args.output,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            retry_failed=not args.skip_failed,
+        )
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,25 @@
 import re
-from typing import List, Dict, Any
-
+import time
+import logging
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+
+from utils import metrics
+from utils.answer_parser import PART_NUM_PATTERN, split_part_num
+from utils.image_cache import get_image_cache
 from utils.rebrickable_client import RebrickableClient
 
 
-PART_NUM_PATTERN = re.compile(r"\b(\d{3,6}[a-zA-Z]?)\b")
 URL_PATTERN = re.compile(r"https?://\S+")
 
+logger = logging.getLogger(__name__)
 
-def _extract_part_num(type_raw: str, num_raw: str) -> (str, str, str):
-    """
-    part_type, part_num 두 칸을 같이 보고
-    - 첫 번째로 발견된 3~6자리(+알파벳) 토큰을 부품 번호로 사용
-    - 해당 번호는 원 문자열에서 제거하고 남은 텍스트는 색상/기타 정보로 반환
-    """
-    text_for_num = f"{num_raw} {type_raw}".strip()
-
-    m = PART_NUM_PATTERN.search(text_for_num)
-    if not m:
-        return "", type_raw.strip(), num_raw.strip()
-
-    part_num = m.group(1)
-
-    # type_raw / num_raw 에서 번호 제거
-    type_left = PART_NUM_PATTERN.sub("", type_raw).strip(" ,")
-    num_left = PART_NUM_PATTERN.sub("", num_raw).strip(" ,")
-
-    # 남은 건 색상/수량 등의 추가 정보로 쓰기
-    extra = " ".join([s for s in [type_left, num_left] if s]).strip()
-
-    return part_num, type_left, extra
+# 아직 조회 중인 행 (render_brick_table_html 의 resolved 값)
+PENDING = object()
+PENDING_NAME_HTML = "<span style='color:#999;'>조회 중…</span>"
+PENDING_IMAGE_HTML = (
+    "<div style='width:80px; height:60px; margin:auto; background:#eee; border-radius:4px;'></div>"
+)
 
 
 def _clean_description(desc: str, extra_info: str) -> str:
@@ -50,43 +40,61 @@ def _clean_description(desc: str, extra_info: str) -> str:
     return desc or "-"
 
 
-def build_brick_table_html(
-    rows: List[Dict[str, Any]],
-    client: RebrickableClient,
-) -> str:
-    """
-    브릭/부품 제안 리스트를 받아 Rebrickable API로 이름/이미지를 채운 HTML 테이블 생성.
+def prepare_brick_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """파싱된 행마다 부품 번호/설명/검색 힌트 정리 (네트워크 호출 없음)"""
+    prepared: List[Dict[str, str]] = []
+    for row in rows:
+        type_raw = (row.get("part_type") or "").strip()
+        num_raw = (row.get("part_num") or "").strip()
+        desc_raw = (row.get("description") or "").strip()
 
-    최종 표 의미는 항상:
-      부품 종류 | 부품 번호 | 부품 이름 | 이미지 | 설명 및 용도
+        # 부품 번호 추출 (type/num 칸을 같이 보고 숫자 하나 뽑기)
+        part_num, type_text, extra_info = split_part_num(type_raw, num_raw)
 
-    - 부품 번호는 3~6자리(+선택 알파벳) 토큰만 허용
-    - 부품 종류에 숫자만 들어온 경우 → 번호로 인식하고 종류는 비움
-    - 설명 안에 들어온 URL 은 모두 제거
+        # 설명 정리 (URL 제거 + 색상/수량 정보 합치기)
+        description = _clean_description(desc_raw, extra_info)
 
-    - 같은 부품(번호 + 이름 + 이미지 URL)이면 설명이 조금 달라도 한 줄만 남깁니다.
+        prepared.append(
+            {
+                "part_num": part_num,
+                "type_text": type_text,
+                "description": description,
+                "hint_text": " ".join([type_text, description]).strip(),
+            }
+        )
+
+    return prepared
+
+
+def render_brick_table_html(
+    prepared: List[Dict[str, str]],
+    resolved: Sequence[Any],
+    images: Optional[Dict[str, Optional[str]]] = None,
+) -> str:
     """
+    정리된 행과 조회 결과로 HTML 테이블 생성.
 
+    - resolved[i] 가 PENDING 이면 아직 조회 중인 행 → 이름/이미지 칸에 자리표시
+    - None 이면 조회 실패 → "-"
+    - images: 이미지 URL → 썸네일 data URI (utils/image_cache.py).
+      None 이면 원본 URL 을 그대로 쓰고, 주어졌는데 아직 없는 URL 은 자리표시,
+      값이 None(썸네일 실패)이면 원본 URL 로 대체
+    """
     html_rows: List[str] = []
     # ✅ 중복 제거: (번호, 이름, 이미지) 가 같으면 하나만 출력
     seen_rows = set()
 
-    for row in rows:
-        type_raw = (row.get("part_type") or "").strip()
-        num_raw = (row.get("part_num") or "").strip()
-        desc_raw = (row.get("description") or "").strip()
+    for item, part_data in zip(prepared, resolved):
+        part_num = item["part_num"]
+        type_text = item["type_text"]
+        description = item["description"]
+        pending = part_data is PENDING
 
-        # 1) 부품 번호 추출 (type/num 칸을 같이 보고 숫자 하나 뽑기)
-        part_num, type_text, extra_info = _extract_part_num(type_raw, num_raw)
-
-        # 2) 설명 정리 (URL 제거 + 색상/수량 정보 합치기)
-        description = _clean_description(desc_raw, extra_info)
-
-        # 3) Rebrickable 조회 (번호가 있으면 우선, 없으면 타입/설명으로 텍스트 검색)
-        hint_text = " ".join([type_text, description]).strip()
-        part_data = client.resolve_part(part_num, hint_text)
-
-        if part_data:
+        if pending:
+            part_name = ""
+            img_url = ""
+            resolved_part_num = part_num
+        elif part_data:
             part_name = (part_data.get("name") or "").strip()
             img_url = (part_data.get("part_img_url") or "").strip()
             # Rebrickable에서 다시 번호를 가져와서 확정
@@ -96,7 +104,7 @@ def build_brick_table_html(
             img_url = ""
             resolved_part_num = part_num
 
-        # 4) 최종 부품 번호 셀: 순수 번호만 남기기
+        # 3) 최종 부품 번호 셀: 순수 번호만 남기기
         display_num = "-"
         source_for_num = resolved_part_num or part_num or ""
         if source_for_num:
@@ -104,26 +112,30 @@ def build_brick_table_html(
             if m:
                 display_num = m.group(1)
 
-        # 5) 부품 종류 셀
+        # 4) 부품 종류 셀
         display_type = type_text
         if not display_type and part_name:
             display_type = part_name
 
-        # 6) 이미지 셀
-        if img_url:
+        # 5) 이미지 셀 (캐시된 썸네일이 있으면 data URI 로 넣어 CDN 요청 없이 표시)
+        if pending or (img_url and images is not None and img_url not in images):
+            img_html = PENDING_IMAGE_HTML
+        elif img_url:
+            img_src = (images or {}).get(img_url) or img_url
             img_html = (
-                f"<img src='{img_url}' alt='part image' "
+                f"<img src='{img_src}' alt='part image' loading='lazy' "
                 f"style='max-width:80px; height:auto;' />"
             )
         else:
             img_html = "-"
 
-        # ✅ 7) 중복 행 체크
+        # ✅ 6) 중복 행 체크
         #    번호 + 이름 + 이미지URL 가 동일하면 같은 부품으로 보고 스킵
+        #    (조회 중인 행은 같은 조회 키(번호 + 힌트)끼리만 합침)
         dedupe_key = (
-            display_num,
-            part_name or "-",
-            img_url or "",
+            (display_num, "pending", item["hint_text"])
+            if pending
+            else (display_num, part_name or "-", img_url or "")
         )
         if dedupe_key in seen_rows:
             continue
@@ -134,7 +146,7 @@ def build_brick_table_html(
             <tr>
               <td style="padding: 8px; text-align:left;">{display_type or "-"}</td>
               <td style="padding: 8px; text-align:center; white-space:nowrap;">{display_num}</td>
-              <td style="padding: 8px; text-align:left;">{part_name or "-"}</td>
+              <td style="padding: 8px; text-align:left;">{PENDING_NAME_HTML if pending else part_name or "-"}</td>
               <td style="padding: 8px; text-align:center;">{img_html}</td>
               <td style="padding: 8px; text-align:left;">{description}</td>
             </tr>
@@ -160,3 +172,172 @@ def build_brick_table_html(
     </div>
     """
     return table_html
+
+
+def build_brick_table_html(
+    rows: List[Dict[str, Any]],
+    client: RebrickableClient,
+) -> str:
+    """
+    브릭/부품 제안 리스트를 받아 Rebrickable API로 이름/이미지를 채운 HTML 테이블 생성.
+
+    최종 표 의미는 항상:
+      부품 종류 | 부품 번호 | 부품 이름 | 이미지 | 설명 및 용도
+
+    - 부품 번호는 3~6자리(+선택 알파벳) 토큰만 허용
+    - 부품 종류에 숫자만 들어온 경우 → 번호로 인식하고 종류는 비움
+    - 설명 안에 들어온 URL 은 모두 제거
+
+    - 같은 부품(번호 + 이름 + 이미지 URL)이면 설명이 조금 달라도 한 줄만 남깁니다.
+    """
+
+    prepared = prepare_brick_rows(rows)
+
+    # Rebrickable 일괄 조회 (중복 제거 + 병렬, 번호 우선 / 없으면 텍스트 검색)
+    with metrics.span("brick_table.resolve"):
+        resolved = client.resolve_parts([(p["part_num"], p["hint_text"]) for p in prepared])
+
+    # 부품 이미지 썸네일 (로컬 캐시, 없으면 한 번만 내려받음)
+    images = None
+    image_cache = get_image_cache()
+    if image_cache is not None:
+        with metrics.span("brick_table.images"):
+            images = image_cache.data_uris(_image_urls(resolved), max_workers=client.max_workers)
+
+    return render_brick_table_html(prepared, resolved, images)
+
+
+def _image_urls(resolved: Iterable[Any]) -> List[str]:
+    return [
+        (data.get("part_img_url") or "").strip()
+        for data in resolved
+        if data is not PENDING and data and data.get("part_img_url")
+    ]
+
+
+class BrickTableJob:
+    """
+    브릭 표 점진 렌더링용 백그라운드 조회 작업.
+
+    - 생성 즉시 정리된 행으로 자리표시 표를 만들 수 있고 (html()),
+      부품 조회는 별도 스레드에서 진행하면서 결과가 오는 대로 해당 행을 채운다.
+    - 조회가 끝나면 최종 HTML 을 한 번만 만들어 재사용
+    - 작업은 세션끼리 공유(st.cache_resource)되므로, 일시적 오류(타임아웃/5xx/429)로 실패한 행은
+      retry_failed() 로 RETRY_INTERVAL 초 뒤 최대 MAX_RETRIES 번 그 행만 다시 조회
+      (없는 부품으로 확정된 행은 다시 조회하지 않음)
+    """
+
+    RETRY_INTERVAL = 30.0
+    MAX_RETRIES = 2
+
+    def __init__(self, rows: List[Dict[str, Any]], client: RebrickableClient) -> None:
+        self.prepared = prepare_brick_rows(rows)
+        self.client = client
+        self.keys = [(p["part_num"], p["hint_text"]) for p in self.prepared]
+        self.resolved: List[Any] = [PENDING] * len(self.prepared)
+        self.image_cache = get_image_cache()
+        self.images: Optional[Dict[str, Optional[str]]] = {} if self.image_cache is not None else None
+        self.created_at = time.perf_counter()
+        self.first_paint_sec: Optional[float] = None
+        self.resolve_sec: Optional[float] = None
+        self.retries = 0
+        self._finished_at = 0.0
+        self._done = threading.Event()
+        self._final_html: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="brick-table", daemon=True)
+
+    def start(self) -> "BrickTableJob":
+        self._thread.start()
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def progress(self) -> Tuple[int, int]:
+        """(조회가 끝난 행 수, 전체 행 수)"""
+        with self._lock:
+            return sum(1 for r in self.resolved if r is not PENDING), len(self.resolved)
+
+    def html(self) -> str:
+        """현재까지의 조회 결과로 만든 표 (처음 호출 시각을 첫 표시 시간으로 기록)"""
+        if self._final_html is not None:
+            return self._final_html
+        with self._lock:
+            resolved = list(self.resolved)
+            images = dict(self.images) if self.images is not None else None
+        html = render_brick_table_html(self.prepared, resolved, images)
+        if self.first_paint_sec is None:
+            self.first_paint_sec = time.perf_counter() - self.created_at
+            metrics.observe("lego_brick_table_first_paint_seconds", self.first_paint_sec)
+        if self.done and PENDING not in resolved:
+            self._final_html = html
+        return html
+
+    def _on_resolved(self, key: Tuple[str, str], data: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            for i, k in enumerate(self.keys):
+                if k == key:
+                    self.resolved[i] = data
+
+        # 썸네일도 같은 조회 스레드에서 바로 준비 (캐시에 있으면 디스크/메모리에서 읽기만 함)
+        url = (data or {}).get("part_img_url") or ""
+        if self.image_cache is not None and url.strip():
+            uri = self.image_cache.data_uri(url)
+            with self._lock:
+                self.images[url.strip()] = uri
+
+    def retry_failed(self) -> bool:
+        """
+        조회가 끝난 뒤 일시적 오류로 실패한 행이 있으면 그 행만 다시 조회 시작 (시작했으면 True).
+        마지막 조회 후 RETRY_INTERVAL 초가 지나지 않았거나 MAX_RETRIES 번 재시도했으면 하지 않음.
+        """
+        with self._lock:
+            if not self._done.is_set() or self.retries >= self.MAX_RETRIES:
+                return False
+            if time.perf_counter() - self._finished_at < self.RETRY_INTERVAL:
+                return False
+            failed = list(
+                dict.fromkeys(
+                    key
+                    for key, data in zip(self.keys, self.resolved)
+                    if data is None and not self.client.is_known_missing(*key)
+                )
+            )
+            if not failed:
+                return False
+            self.resolved = [PENDING if key in failed else data for key, data in zip(self.keys, self.resolved)]
+            self.retries += 1
+            self._final_html = None
+            self._done.clear()
+            self._thread = threading.Thread(target=self._run, args=(failed,), name="brick-table-retry", daemon=True)
+        logger.info("[brick_table] 일시적 실패 %d건 재조회 (%d/%d회)", len(failed), self.retries, self.MAX_RETRIES)
+        self._thread.start()
+        return True
+
+    def _run(self, keys: Optional[List[Tuple[str, str]]] = None) -> None:
+        try:
+            with metrics.span("brick_table.resolve"):
+                self.client.resolve_parts(keys or self.keys, on_resolved=self._on_resolved)
+        except Exception:
+            logger.exception("[brick_table] 부품 조회 중 예외 발생")
+        finally:
+            with self._lock:
+                # 예외 등으로 채우지 못한 행은 조회 실패로, 썸네일이 없는 이미지는 원본 URL 로 표시
+                self.resolved = [None if r is PENDING else r for r in self.resolved]
+                if self.images is not None:
+                    for url in _image_urls(self.resolved):
+                        self.images.setdefault(url, None)
+            self.resolve_sec = time.perf_counter() - self.created_at
+            self._finished_at = time.perf_counter()
+            self._done.set()
+            logger.info(
+                "[brick_table] 부품 조회 완료: %d행, %.2fs (첫 표시 %s)",
+                len(self.prepared),
+                self.resolve_sec,
+                f"{self.first_paint_sec * 1000:.1f}ms" if self.first_paint_sec is not None else "-",
+            )
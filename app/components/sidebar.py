@@ -1,5 +1,12 @@
 import streamlit as st
 
+# 실행 파이프라인 선택지 (값은 workflow.graph 의 PIPELINE_AUTO / PIPELINE_FAST / PIPELINE_FULL)
+PIPELINE_OPTIONS = {
+    "auto": "자동 (소형 + 입문자는 빠른 모드)",
+    "fast": "빠른 모드 (1회 호출)",
+    "full": "상세 모드 (3단계 에이전트)",
+}
+
 
 def render_sidebar() -> dict:
     """레고 창작 설정 사이드바"""
@@ -66,6 +73,20 @@ def render_sidebar() -> dict:
             height=80,
         )
 
+        st.markdown("---")
+        pipeline = st.radio(
+            "생성 방식",
+            options=list(PIPELINE_OPTIONS),
+            format_func=PIPELINE_OPTIONS.get,
+            index=0,
+            help="빠른 모드는 요구사항 정리와 최종 가이드를 한 번의 LLM 호출로 작성합니다.",
+        )
+
+        stream = st.checkbox(
+            "에이전트 응답 실시간 표시 (스트리밍)",
+            value=True,
+        )
+
     return {
         "mode": mode,
         "scale": scale,
@@ -74,4 +95,6 @@ def render_sidebar() -> dict:
         "colors": colors,
         "parts": parts,
         "constraints": constraints,
+        "pipeline": pipeline,
+        "stream": stream,
     }
@@ -1,19 +1,35 @@
 import os
-import re
+import time
+import hashlib
+import queue
+import asyncio
+import threading
 import textwrap
 import logging
 from logging.handlers import RotatingFileHandler
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator
 
 import streamlit as st
 import streamlit.components.v1 as components
 
 from components.sidebar import render_sidebar
-from workflow.graph import create_lego_graph
+from workflow.graph import (
+    create_pipeline_graph,
+    select_pipeline,
+    build_initial_state,
+    astream_lego_graph,
+    pipeline_signature,
+    PIPELINE_NODE_LABELS,
+)
+from workflow.result_cache import get_result_cache, design_cache_key
 from workflow.state import LegoState
+from utils import metrics
+from utils.config import warmup_clients, get_int_env
+from utils.user_input import build_user_input
+from utils.answer_parser import parse_answer
 
 from utils.rebrickable_client import RebrickableClient
-from components.brick_table import build_brick_table_html
+from components.brick_table import BrickTableJob
 from datetime import datetime, timedelta, timezone
 
 KST = timezone(timedelta(hours=9))
@@ -74,30 +90,54 @@ st.set_page_config(
 
 
 @st.cache_resource
-def get_graph():
-    return create_lego_graph()
-
-
-def build_user_input(goal: str, sidebar_state: Dict[str, Any]) -> str:
-    lines = [
-        "[창작 목표]",
-        goal.strip() or "미입력",
-        "",
-        "[전반 정보]",
-        f"- 규모: {sidebar_state.get('scale', '')}",
-        f"- 용도: {sidebar_state.get('usage', '')}",
-        f"- 난이도 선호: {sidebar_state.get('difficulty', '')}",
-        "",
-        "[보유 색상/테마]",
-        sidebar_state.get("colors", "").strip() or "미입력",
-        "",
-        "[보유 브릭/부품 정보]",
-        sidebar_state.get("parts", "").strip() or "미입력",
-        "",
-        "[제약 조건 / 추가 요청]",
-        sidebar_state.get("constraints", "").strip() or "미입력",
-    ]
-    return "\n".join(lines)
+def get_graph(pipeline: str):
+    # 공유 LLM/임베딩 클라이언트를 미리 만들어 두고, 컴파일된 그래프를 세션 간 공유 (파이프라인별 1개)
+    try:
+        warmup_clients()
+    except Exception as e:
+        logger.warning("[main] 클라이언트 워밍업 실패: %s", e)
+    return create_pipeline_graph(pipeline)
+
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """비동기 그래프 실행용 프로세스 공유 이벤트 루프 (전용 스레드에서 계속 실행).
+
+    재실행마다 asyncio.run 으로 루프를 새로 만들면 비동기 HTTP 커넥션 풀을 재사용할 수 없으므로
+    루프 하나를 계속 유지하고 모든 세션이 공유한다.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="lego-async-loop", daemon=True).start()
+    return loop
+
+
+def run_async(coro) -> Any:
+    """공유 이벤트 루프에서 코루틴을 실행하고 결과를 기다린다."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+def iter_async(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """공유 이벤트 루프에서 비동기 제너레이터를 돌리고, 결과를 현재(스크립트) 스레드에서 순서대로 받는다."""
+    items: "queue.Queue[Any]" = queue.Queue()
+    done = object()
+
+    async def pump() -> None:
+        try:
+            async for item in agen:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    asyncio.run_coroutine_threadsafe(pump(), get_event_loop())
+    while True:
+        item = items.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
 
 
 # ------------------------------------------------------------
@@ -116,229 +156,92 @@ def _clean_visual_newline_lines(text: str) -> str:
     return "\n".join(filtered)
 
 
-# ------------------------------------------------------------
-# 5. 브릭/부품 제안 섹션 파싱 유틸
-# ------------------------------------------------------------
-def split_brick_section(answer: str) -> Tuple[str, str, str]:
-    """전체 답변에서 '5. 브릭/부품 제안' 섹션만 분리."""
-    pattern = r"^\s*(?:[#*]+\s*)?5\.\s*브릭\s*/?\s*부품\s*제안.*$"
+BRICK_TABLE_POLL_INTERVAL = 0.5  # 부품 조회 중 표 갱신 주기(초)
 
-    match = re.search(pattern, answer, flags=re.MULTILINE)
-    if not match:
-        logger.info("[main] '브릭/부품 제안' 섹션 헤더를 찾지 못했습니다.")
-        return answer, "", ""
 
-    header_start = match.start()
-    header_end = match.end()
-    logger.info(
-        "[main] 브릭/부품 제안 헤더 위치: start=%d, end=%d",
-        header_start,
-        header_end,
-    )
+@st.cache_resource
+def get_rebrickable_client() -> RebrickableClient:
+    """세션/재실행 간 공유하는 Rebrickable 클라이언트 (HTTP 커넥션 풀 재사용)"""
+    return RebrickableClient()
 
-    rest = answer[header_end:]
-    next_sec_match = re.search(r"(?m)^\s*\d+\.\s", rest)
-    if next_sec_match:
-        section_end = header_end + next_sec_match.start()
-    else:
-        section_end = len(answer)
 
-    before = answer[:header_start]
-    brick_section = answer[header_start:section_end]
-    after = answer[section_end:]
+def build_brick_view(answer: str) -> Dict[str, Any]:
+    """최종 답변을 화면 구성 요소로 변환 (Streamlit 호출/네트워크 호출 없음 – 결과를 캐시할 수 있도록 분리)
 
-    logger.info(
-        "[main] 브릭/부품 제안 섹션 분리 완료: before_len=%d, section_len=%d, after_len=%d",
-        len(before),
-        len(brick_section),
-        len(after),
-    )
-    return before, brick_section, after
+    - 5번 섹션을 표로 만들 수 있으면 {"before", "header", "rows", "after"}
+      (rows 의 부품 정보 조회는 BrickTableJob 이 백그라운드에서 수행)
+    - 섹션이 없거나 파싱에 실패하면 {"markdown": 정리된 전체 답변}
+    """
+    with metrics.span("answer.parse"):
+        parsed = parse_answer(answer)
 
+    # 5번 섹션 자체가 없으면 전체를 그대로 출력 (parse_answer 가 '\n' 줄은 이미 정리)
+    if not parsed["header"]:
+        return {"markdown": parsed["before"]}
 
-def _extract_first_part_num(text: str) -> str:
-    """설명 문자열에서 LEGO 파트 번호로 보이는 첫 숫자 뽑기 (3~6자리)."""
-    m = re.search(r"\b(\d{3,6})\b", text)
-    if not m:
-        return ""
-    return m.group(1)
+    if not parsed["rows"]:
+        logger.warning(
+            "[main] 브릭/부품 제안 섹션 파싱 실패 → 원본 섹션 그대로 표시."
+        )
+        return {"markdown": _clean_visual_newline_lines(answer)}
+
+    return {
+        "before": parsed["before"],
+        "header": parsed["header"],
+        "rows": parsed["rows"],
+        "after": parsed["after"],
+    }
 
 
-def parse_brick_rows_from_section(brick_section: str) -> List[Dict[str, Any]]:
+@st.cache_data(
+    max_entries=get_int_env("LEGO_BRICK_VIEW_CACHE_SIZE", 64),
+    ttl=get_int_env("LEGO_BRICK_VIEW_CACHE_TTL", 3600),
+    show_spinner=False,
+)
+def _cached_brick_view(answer_key: str, _answer: str) -> Dict[str, Any]:
+    """답변 해시(answer_key)별 화면 구성 요소 캐시 (서버 메모리, 모든 세션 공유)
+
+    Streamlit 은 사이드바 위젯만 바꿔도 스크립트 전체를 다시 실행하므로,
+    같은 답변이면 파싱을 다시 하지 않는다. (부품 조회/HTML 은 get_brick_table_job 이 재사용)
+    (_answer 는 밑줄로 시작해 캐시 키 계산에서 제외됨 – 긴 본문 대신 해시만 비교)
     """
-    브릭/부품 제안 섹션 텍스트에서 행(row) 리스트 추출.
+    logger.info("[main] 브릭 표 파싱 (캐시 없음): key=%s", answer_key[:12])
+    return build_brick_view(_answer)
 
-    새 표 형식 (우선 지원):
-      | 부품 종류 | 부품 번호 | 부품 이름 | 이미지 | 설명 및 용도 |
 
-    - 에이전트가 위 형식을 지키면 이 규칙으로 파싱
-    - 그렇지 않은 경우에는 기존(레거시) 3~4열 포맷으로 최대한 해석
+@st.cache_resource(
+    max_entries=get_int_env("LEGO_BRICK_VIEW_CACHE_SIZE", 64),
+    ttl=get_int_env("LEGO_BRICK_VIEW_CACHE_TTL", 3600),
+    show_spinner=False,
+)
+def get_brick_table_job(answer_key: str, _rows: List[Dict[str, Any]]) -> BrickTableJob:
+    """답변 해시별 부품 조회 작업 (처음 요청될 때 백그라운드 조회 시작, 끝난 뒤에는 최종 HTML 재사용)
+
+    일시적 오류로 실패한 행은 다음 렌더링 때 BrickTableJob.retry_failed 가 다시 조회한다.
     """
-    lines = brick_section.splitlines()
-    if not lines:
-        return []
-
-    # 첫 줄은 보통 "5. 브릭/부품 제안" 헤더 → 내용에서 제외
-    content_lines = [ln for ln in lines[1:] if ln.strip()]
-    if not content_lines:
-        return []
-
-    # --- 헤더 행 찾기 ---
-    header_idx = None
-    for idx, line in enumerate(content_lines):
-        stripped = line.strip()
-        if "|" not in stripped:
-            continue
-        # 구분선(| --- | --- |)은 제외
-        sep_candidate = stripped.replace("|", "").strip()
-        if sep_candidate and set(sep_candidate) <= set("-: "):
-            continue
-        header_idx = idx
-        break
-
-    if header_idx is None:
-        logger.warning("[main] 브릭/부품 제안 섹션에서 테이블 헤더를 찾지 못했습니다.")
-        return []
-
-    header_line = content_lines[header_idx].strip()
-    header_cells = [c.strip() for c in header_line.strip("|").split("|")]
-    n_cols = len(header_cells)
-    header_text = " ".join(header_cells)
-
-    logger.info("[main] 브릭/부품 헤더: %s", header_cells)
-
-    # --- 새 표 형식인지 먼저 판별 ---
-    is_new_standard = (
-        any("부품 종류" in c for c in header_cells)
-        and any("부품 번호" in c for c in header_cells)
-        and any("부품 이름" in c for c in header_cells)
-        and any("이미지" in c for c in header_cells)
-        and ("설명" in header_text or "용도" in header_text)
-    )
+    return BrickTableJob(_rows, get_rebrickable_client()).start()
 
-    rows: List[Dict[str, Any]] = []
-
-    if is_new_standard:
-        # ✅ 새 표 포맷: 부품 종류 / 부품 번호 / 부품 이름 / 이미지 / 설명 및 용도
-        logger.info("[main] 새 표 형식(5열)으로 브릭 제안 파싱")
-
-        # 각 컬럼 인덱스 찾기 (혹시 순서가 바뀌어도 이름으로 찾도록)
-        def find_idx(keyword: str, default: int) -> int:
-            for i, c in enumerate(header_cells):
-                if keyword in c:
-                    return i
-            return default
-
-        idx_type = find_idx("부품 종류", 0)
-        idx_num = find_idx("부품 번호", 1 if n_cols > 1 else 0)
-        idx_desc = find_idx("설명", n_cols - 1)
-
-        for line in content_lines[header_idx + 1 :]:
-            stripped = line.strip()
-            if not stripped or "|" not in stripped:
-                continue
-
-            # 구분선 스킵
-            sep_candidate = stripped.replace("|", "").strip()
-            if sep_candidate and set(sep_candidate) <= set("-: "):
-                continue
-
-            cells = [c.strip() for c in stripped.strip("|").split("|")]
-            if len(cells) < 3:  # 최소 3개는 있어야 의미 있음
-                continue
-
-            # 인덱스 범위 방어
-            def safe_get(c_list, idx):
-                return c_list[idx] if 0 <= idx < len(c_list) else ""
-
-            part_type = safe_get(cells, idx_type)
-            part_num = safe_get(cells, idx_num)
-            description = safe_get(cells, idx_desc)
-
-            # URL이 설명에 들어온 경우는 후처리에서 제거하므로 여기서는 그대로 둠
-            rows.append(
-                {
-                    "part_type": part_type,
-                    "part_num": part_num,
-                    "description": description,
-                }
-            )
 
-        logger.info("[main] 새 표 형식으로 파싱된 행 수: %d", len(rows))
-        return rows
-
-    # ------------------------------------------------------------
-    # 이하: 레거시 3~4열 포맷 (예전 규칙) → 기존 코드 최대한 유지
-    # ------------------------------------------------------------
-    logger.info("[main] 레거시 표 형식으로 브릭 제안 파싱 시도")
-
-    # 첫 줄은 '5. 브릭/부품 제안' 헤더일 가능성이 크니 건너뜀
-    # 이미 content_lines 는 1줄 건너뛴 상태
-    # header_idx 이후가 실제 데이터
-    content_lines_after_header = content_lines
-    header_line = content_lines_after_header[header_idx].strip()
-    header_cells = [c.strip() for c in header_line.strip("|").split("|")]
-    n_cols = len(header_cells)
-    header_text = " ".join(header_cells)
-
-    # --- 포맷 판별 (기존 로직) ---
-    format_type = "type_first_detail_3"
-
-    if n_cols >= 4 and "용도" in header_cells[0] and "부품 번호" in header_text:
-        format_type = "usage_first_4"
-    elif n_cols == 3 and (
-        "상세 예시" in header_cells[1]
-        or "상세 설명" in header_cells[1]
-        or "상세 예시 및 부품 번호" in header_cells[1]
-    ):
-        format_type = "type_first_detail_3"
-    else:
-        if n_cols >= 3 and "상세" in header_cells[1]:
-            format_type = "type_first_detail_3"
-        elif n_cols >= 4:
-            format_type = "usage_first_4"
-
-    logger.info("[main] 브릭/부품 제안 레거시 포맷 판별: %s", format_type)
-
-    def _extract_first_part_num(text: str) -> str:
-        m = re.search(r"\b(\d{3,6}[a-zA-Z]?)\b", text)
-        return m.group(1) if m else ""
-
-    for line in content_lines_after_header[header_idx + 1 :]:
-        stripped = line.strip()
-        if not stripped or "|" not in stripped:
-            continue
-        sep_candidate = stripped.replace("|", "").strip()
-        if sep_candidate and set(sep_candidate) <= set("-: "):
-            continue
-
-        cells = [c.strip() for c in stripped.strip("|").split("|")]
-
-        if format_type == "usage_first_4":
-            if len(cells) < 4:
-                continue
-            usage = cells[0]
-            part_type = cells[1]
-            part_num = cells[2]
-            description = cells[3] or usage
-        else:  # type_first_detail_3
-            if len(cells) < 3:
-                continue
-            part_type = cells[0]
-            detail = cells[1]
-            description = cells[2]
-            part_num = _extract_first_part_num(detail)
-
-        rows.append(
-            {
-                "part_type": part_type,
-                "part_num": part_num,
-                "description": description,
-            }
-        )
+def render_brick_table(job: BrickTableJob) -> None:
+    """브릭 표를 바로 표시하고, 조회가 끝날 때까지 fragment 만 주기적으로 다시 그려 칸을 채운다.
+
+    조회 중에는 run_every 로 표 영역만 재실행되므로 나머지 가이드는 그대로 읽을 수 있다.
+    조회가 끝나면 앱 전체를 한 번 다시 실행해 주기 실행을 멈춘다 (나머지는 모두 캐시 적중).
+    """
+    polling = not job.done
+
+    @st.fragment(run_every=BRICK_TABLE_POLL_INTERVAL if polling else None)
+    def _table() -> None:
+        done = job.done
+        if not done:
+            resolved, total = job.progress()
+            st.caption(f"🔎 부품 정보를 조회하는 중입니다... ({resolved}/{total})")
+        # HTML 표를 그대로 렌더링 (순서 고정: 부품 종류 / 부품 번호 / 부품 이름 / 이미지 / 설명 및 용도)
+        components.html(job.html(), height=400, scrolling=True)
+        if polling and done:
+            st.rerun()
 
-    logger.info("[main] 레거시 포맷으로 파싱된 행 수: %d", len(rows))
-    return rows
+    _table()
 
 
 def render_answer_with_brick_table(answer: str) -> None:
@@ -347,60 +250,110 @@ def render_answer_with_brick_table(answer: str) -> None:
     또한, 테이블 위/아래에 보이는 '\\n' 라인은 제거하고,
     5번 제목이 항상 보이도록 정리한다.
     """
-    # 전체 답변을 5번 섹션 기준으로 분리
-    before, brick_section, after = split_brick_section(answer)
+    answer_key = hashlib.sha256(answer.encode("utf-8")).hexdigest()
+    view = _cached_brick_view(answer_key, answer)
 
-    # 5번 섹션 자체가 없으면, 전체를 한 번 깨끗이 정리해서 바로 출력
-    if not brick_section:
-        st.markdown(_clean_visual_newline_lines(answer))
+    if "markdown" in view:
+        st.markdown(view["markdown"])
         return
 
-    # 5번 섹션 안에서, 눈에 보이는 '\n' 라인은 제거하고
-    # 의미 있는 라인만 남김
-    raw_section_lines = brick_section.splitlines()
-    section_lines = [
-        ln for ln in raw_section_lines if ln.strip() and ln.strip() != r"\n"
-    ]
+    if view["before"].strip():
+        st.markdown(view["before"])
 
-    if not section_lines:
-        logger.warning(
-            "[main] 브릭/부품 제안 섹션이 비어 있음 → 전체 답변만 출력."
-        )
-        st.markdown(_clean_visual_newline_lines(answer))
-        return
+    # 👉 여기서 5번 제목이 항상 보이도록 출력
+    st.markdown(view["header"])
 
-    # 첫 줄은 항상 '5. 브릭/부품 제안' 헤더가 되도록 보정
-    header_line = section_lines[0]
-    cleaned_brick_section = "\n".join(section_lines)
+    # 표는 자리표시와 함께 바로 표시하고, 부품 정보는 조회되는 대로 채움
+    # (캐시된 작업에 일시적 실패 행이 남아 있으면 그 행만 다시 조회)
+    job = get_brick_table_job(answer_key, view["rows"])
+    job.retry_failed()
+    render_brick_table(job)
 
-    # 테이블 파싱은 정리된 섹션 텍스트 기준으로 수행
-    brick_rows = parse_brick_rows_from_section(cleaned_brick_section)
+    if view["after"].strip():
+        st.markdown(view["after"])
 
-    if not brick_rows:
-        logger.warning(
-            "[main] 브릭/부품 제안 섹션 파싱 실패 → 원본 섹션 그대로 표시."
-        )
-        st.markdown(_clean_visual_newline_lines(answer))
-        return
 
-    # before/after 텍스트에서도 눈에 보이는 '\n' 라인은 제거
-    before_clean = _clean_visual_newline_lines(before)
-    after_clean = _clean_visual_newline_lines(after)
+# ------------------------------------------------------------
+# 스트리밍 실행 (에이전트별 패널에 토큰을 바로 표시)
+# ------------------------------------------------------------
+STREAM_RENDER_INTERVAL = 0.1  # 화면 갱신 최소 간격(초)
 
-    client = RebrickableClient()
-    brick_table_html = build_brick_table_html(brick_rows, client)
 
-    if before_clean.strip():
-        st.markdown(before_clean)
+def run_graph_streaming(graph, initial_state: LegoState, labels: Dict[str, str]) -> Dict[str, Any]:
+    """그래프를 (비동기) 스트리밍 실행하며 에이전트별 패널에 출력 토큰을 점진적으로 렌더링.
 
-    # 👉 여기서 5번 제목이 항상 보이도록 출력
-    st.markdown(header_line)
+    labels: 노드 이름 → 패널 제목 (실행 순서, 마지막 노드 패널을 펼쳐 둠)
+    첫 토큰까지 걸린 시간(TTFT)을 헤드라인 지연 지표로 표시/로그한다.
+    """
+    status = st.empty()
+    panels: Dict[str, Any] = {}
+    last_node = list(labels)[-1]
+    for node, label in labels.items():
+        with st.expander(label, expanded=(node == last_node)):
+            panels[node] = st.empty()
+
+    texts: Dict[str, str] = {node: "" for node in labels}
+    timings: Dict[str, Dict[str, Any]] = {}
+    last_render: Dict[str, float] = {node: 0.0 for node in labels}
+    started = time.perf_counter()
+    ttft: Optional[float] = None
+    final_state: Dict[str, Any] = {}
+
+    first_label = next(iter(labels.values())).split(" ", 1)[-1]
+    status.info(f"⏳ {first_label} 에이전트가 응답을 준비 중입니다...")
+
+    for event in iter_async(astream_lego_graph(graph, initial_state)):
+        node = event.get("node", "")
+        if event["type"] == "token" and node in panels:
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                logger.info("[main] 첫 토큰까지 걸린 시간(TTFT): %.2fs", ttft)
+                status.caption(f"⚡ 첫 응답까지 {ttft:.2f}초")
+            texts[node] += event["text"]
+            now = time.perf_counter()
+            if now - last_render[node] >= STREAM_RENDER_INTERVAL:
+                panels[node].markdown(texts[node] + " ▌")
+                last_render[node] = now
+        elif event["type"] == "node_end" and node in panels:
+            # 유사 요청 캐시 적중 시에는 토큰 없이 완성된 응답만 전달됨
+            timings[node] = event.get("timing") or {}
+            with panels[node].container():
+                st.markdown(texts[node] or event.get("text", ""))
+                st.caption(format_node_timing(timings[node]))
+        elif event["type"] == "final":
+            final_state = event["state"]
+
+    total = time.perf_counter() - started
+    per_role = " · ".join(
+        f"{labels[node].split(' ', 1)[-1]} {t['llm_sec']:.1f}초"
+        for node, t in timings.items()
+        if node in labels and "llm_sec" in t
+    )
+    logger.info(
+        "[main] 스트리밍 실행 완료: TTFT=%s, 전체=%.2fs, 역할별=%s",
+        f"{ttft:.2f}s" if ttft is not None else "-",
+        total,
+        per_role or "-",
+    )
+    summary = f"⚡ 첫 응답까지 {ttft:.2f}초 · 전체 {total:.1f}초" if ttft is not None else f"전체 {total:.1f}초"
+    status.caption(f"{summary} ({per_role})" if per_role else summary)
+    return final_state
 
-    # HTML 표를 그대로 렌더링 (순서 고정: 부품 종류 / 부품 번호 / 부품 이름 / 이미지 / 설명 및 용도)
-    components.html(brick_table_html, height=400, scrolling=True)
 
-    if after_clean.strip():
-        st.markdown(after_clean)
+def format_node_timing(timing: Dict[str, Any]) -> str:
+    """에이전트 패널 하단 표시용 (모델/소요 시간/프롬프트 캐시·절감 토큰)"""
+    if timing.get("cached"):
+        return "♻️ 유사 요청 캐시 응답"
+    if "llm_sec" not in timing:
+        return ""
+    text = f"⏱ {timing['llm_sec']:.1f}초 · {timing.get('model', '-')} ({timing.get('tier', '-')})"
+    if "ttft_sec" in timing:
+        text += f" · 첫 토큰 {timing['ttft_sec']:.2f}초"
+    if timing.get("cached_input_tokens"):
+        text += f" · 프롬프트 캐시 {timing['cached_input_tokens']}토큰"
+    if timing.get("prompt_tokens_saved"):
+        text += f" · 프롬프트 {timing['prompt_tokens']}토큰 (예산으로 {timing['prompt_tokens_saved']}토큰 절감)"
+    return text
 
 
 # ------------------------------------------------------------
@@ -440,7 +393,8 @@ def main() -> None:
         st.info(
             "버튼을 누르면, 입력하신 정보(아이디어/규모/용도/보유 브릭 등)와\n"
             "내부 레고 지식(RAG)을 바탕으로\n"
-            "요구사항 분석 → 설계 생성 → 최종 정리까지 Multi-Agent가 순차적으로 수행합니다.",
+            "요구사항 분석 → 설계 생성 → 최종 정리까지 Multi-Agent가 순차적으로 수행합니다.\n"
+            "(빠른 모드: 소형 + 입문자 작품은 한 번의 호출로 최종 가이드를 바로 작성합니다.)",
             icon="🤖",
         )
 
@@ -448,36 +402,52 @@ def main() -> None:
         st.session_state.lego_response = ""
 
     if generate_button:
-        with st.spinner("LangGraph 에이전트들이 레고 창작 아이디어를 구상 중입니다..."):
-            try:
-                graph = get_graph()
-                user_input = build_user_input(goal, sidebar_state)
+        try:
+            pipeline = select_pipeline(sidebar_state.get("pipeline", ""), sidebar_state)
+            graph = get_graph(pipeline)
+            user_input = build_user_input(goal, sidebar_state)
 
-                logger.info("[main] 사용자 입력:\n%s", user_input)
+            logger.info("[main] 파이프라인=%s, 사용자 입력:\n%s", pipeline, user_input)
 
-                initial_state: LegoState = {
-                    "user_input": user_input,
-                    "messages": [],
-                    "docs": {},
-                    "contexts": {},
-                    "current_step": "START",
-                    "prev_node": "",
-                }
+            initial_state: LegoState = build_initial_state(user_input)
 
-                result_state: Dict[str, Any] = graph.invoke(initial_state)
-                answer = result_state.get("final_answer") or "결과를 생성하지 못했습니다."
+            # 같은 입력/프롬프트/모델 조합이면 이전 결과 재사용
+            cache = get_result_cache()
+            cache_key = design_cache_key(user_input, pipeline_signature(pipeline=pipeline)) if cache else ""
+            lookup_started = time.perf_counter()
+            cached = cache.get(cache_key) if cache else None
 
+            if cached:
+                result_state = cached
                 logger.info(
-                    "[main] LangGraph 실행 완료. 최종 답변 길이: %d",
-                    len(answer),
+                    "[main] 결과 캐시 적중 (%.1fms). 통계: %s",
+                    (time.perf_counter() - lookup_started) * 1000,
+                    cache.stats(),
                 )
+                st.caption("♻️ 같은 조건의 이전 결과를 재사용했습니다.")
+            else:
+                with metrics.span("graph.run", entry="streamlit"):
+                    if sidebar_state.get("stream"):
+                        result_state = run_graph_streaming(graph, initial_state, PIPELINE_NODE_LABELS[pipeline])
+                    else:
+                        with st.spinner("LangGraph 에이전트들이 레고 창작 아이디어를 구상 중입니다..."):
+                            # 비동기 실행: 모든 에이전트의 RAG 검색을 그래프 진입 시 동시에 수행
+                            result_state = run_async(graph.ainvoke(initial_state))
+                if cache:
+                    cache.set(cache_key, result_state)
+            answer = result_state.get("final_answer") or "결과를 생성하지 못했습니다."
+
+            logger.info(
+                "[main] LangGraph 실행 완료. 최종 답변 길이: %d",
+                len(answer),
+            )
 
-                st.session_state.lego_response = answer
-            except Exception as e:
-                # 여기서 보는 스택트레이스는 Azure content filter 걸릴 때 나는 예외입니다.
-                # 코드 문제는 아니고, 답변 내용이 필터에 걸리면 Azure 쪽에서 에러를 줍니다.
-                logger.exception("[main] LangGraph 에이전트 호출 중 예외 발생")
-                st.error(f"에이전트 호출 중 오류가 발생했습니다: {e}")
+            st.session_state.lego_response = answer
+        except Exception as e:
+            # 여기서 보는 스택트레이스는 Azure content filter 걸릴 때 나는 예외입니다.
+            # 코드 문제는 아니고, 답변 내용이 필터에 걸리면 Azure 쪽에서 에러를 줍니다.
+            logger.exception("[main] LangGraph 에이전트 호출 중 예외 발생")
+            st.error(f"에이전트 호출 중 오류가 발생했습니다: {e}")
 
     st.markdown("### 3️⃣ AI 레고 창작 가이드")
 
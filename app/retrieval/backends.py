@@ -0,0 +1,296 @@
+"""
+벡터 검색 백엔드
+
+- ChromaBackend: Chroma(SQLite + HNSW) 영속 컬렉션 (기본)
+- NumpyBackend : 정규화된 float32 임베딩을 .npy(메모리 맵) + 메타데이터 JSON 으로 저장하고 (버전 포인터로 한 번에 교체)
+                 행렬곱 한 번으로 top-k 를 찾는 경량 백엔드 (지식 문서가 수백 청크 수준일 때 충분)
+
+임베딩 계산은 색인(retrieval.indexing)/검색(retrieval.vector_store) 쪽에서 하고,
+백엔드는 벡터 저장과 유사도 검색만 담당한다.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalBackend(ABC):
+    """벡터 검색 백엔드 인터페이스 (점수는 cosine 유사도, 높을수록 관련)"""
+
+    name: str = ""
+
+    @abstractmethod
+    def add(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], docs: Sequence[Document]) -> None:
+        """청크 추가 (같은 ID 가 있으면 덮어씀)"""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        ...
+
+    @abstractmethod
+    def reset(self) -> None:
+        """모든 청크 삭제"""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def search(self, vector: Sequence[float], k: int) -> List[Tuple[Document, float]]:
+        """(문서, 유사도) 목록을 유사도 내림차순으로 반환"""
+
+
+# ------------------------------------------------------------
+# Chroma
+# ------------------------------------------------------------
+class ChromaBackend(RetrievalBackend):
+    """Chroma 영속 컬렉션 (cosine 거리)"""
+
+    name = "chroma"
+    COLLECTION = "lego_knowledge"
+    # 이전 버전(langchain_chroma 기본 컬렉션)에서 만든 색인 – reset 시 함께 정리
+    LEGACY_COLLECTIONS = ("langchain",)
+
+    def __init__(self, persist_dir: str) -> None:
+        # chromadb 는 무거우므로 이 백엔드를 쓸 때만 import
+        import chromadb
+        from chromadb.config import Settings
+
+        os.makedirs(persist_dir, exist_ok=True)
+        self._client = chromadb.PersistentClient(path=persist_dir, settings=Settings(anonymized_telemetry=False))
+        self._collection = self._open_collection()
+
+    def _open_collection(self):
+        return self._client.get_or_create_collection(self.COLLECTION, metadata={"hnsw:space": "cosine"})
+
+    def add(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], docs: Sequence[Document]) -> None:
+        self._collection.upsert(
+            ids=list(ids),
+            embeddings=[list(map(float, v)) for v in vectors],
+            documents=[d.page_content for d in docs],
+            metadatas=[d.metadata or None for d in docs],
+        )
+
+    def delete(self, ids: Sequence[str]) -> None:
+        if ids:
+            self._collection.delete(ids=list(ids))
+
+    def reset(self) -> None:
+        existing = {c if isinstance(c, str) else c.name for c in self._client.list_collections()}
+        for name in (self.COLLECTION, *self.LEGACY_COLLECTIONS):
+            if name in existing:
+                self._client.delete_collection(name)
+        self._collection = self._open_collection()
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def search(self, vector: Sequence[float], k: int) -> List[Tuple[Document, float]]:
+        n = min(k, self.count())
+        if n <= 0:
+            return []
+        res = self._collection.query(
+            query_embeddings=[list(map(float, vector))],
+            n_results=n,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            (Document(page_content=text or "", metadata=meta or {}), 1.0 - float(dist))
+            for text, meta, dist in zip(res["documents"][0], res["metadatas"][0], res["distances"][0])
+        ]
+
+
+# ------------------------------------------------------------
+# NumPy (메모리 맵)
+# ------------------------------------------------------------
+class NumpyBackend(RetrievalBackend):
+    """
+    NumPy 브루트포스 백엔드
+
+    - vectors-<버전>.npy : (N, dim) float32, 행마다 L2 정규화 → 내적 = cosine 유사도
+    - chunks-<버전>.json : ids / texts / metadatas (행 순서와 동일)
+    - current.json       : 현재 버전 포인터 (두 파일을 다 쓴 뒤 os.replace 로 한 번에 교체)
+    - 검색은 메모리 맵으로 연 행렬에 대해 matrix @ query + argpartition
+    - 같은 디렉터리를 여러 프로세스(Streamlit/API)가 함께 열어도, 읽는 쪽은 항상 같은 버전의
+      벡터/메타데이터 쌍을 보므로 쓰는 도중의 색인을 읽거나 지우지 않는다.
+      (직전 버전 파일은 남겨 두어, 포인터를 읽은 직후 교체가 일어나도 열 수 있게 함)
+    """
+
+    name = "numpy"
+    POINTER_FILE = "current.json"
+    # 예전 형식 (포인터 없이 고정 이름 두 파일) – 읽기만 지원
+    LEGACY_VECTORS_FILE = "vectors.npy"
+    LEGACY_META_FILE = "chunks.json"
+    _LOAD_ATTEMPTS = 3
+    CLEANUP_AGE_SEC = 60.0
+
+    def __init__(self, persist_dir: str) -> None:
+        self.persist_dir = persist_dir
+        os.makedirs(persist_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+
+    def _read_pointer(self) -> Optional[Dict[str, str]]:
+        try:
+            with open(self._path(self.POINTER_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            if os.path.exists(self._path(self.LEGACY_VECTORS_FILE)):
+                return {"vectors": self.LEGACY_VECTORS_FILE, "chunks": self.LEGACY_META_FILE}
+            return None
+
+    def _load(self) -> None:
+        with self._lock:
+            self._matrix, self._ids, self._texts, self._metadatas = None, [], [], []
+            for _ in range(self._LOAD_ATTEMPTS):
+                pointer = self._read_pointer()
+                if pointer is None:
+                    return
+                try:
+                    with open(self._path(pointer["chunks"]), "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                    matrix = np.load(self._path(pointer["vectors"]), mmap_mode="r")
+                except FileNotFoundError:
+                    continue  # 다른 프로세스가 방금 새 버전으로 교체하고 옛 파일을 정리함 → 포인터 다시 읽기
+                if matrix.shape[0] != len(meta["ids"]):
+                    # 파일은 지우지 않음 (다른 프로세스가 쓰는 중일 수 있음) – 이 프로세스에서는 빈 색인으로 시작
+                    logger.warning("[NumpyBackend] 벡터/메타데이터 개수가 달라 색인을 읽지 않습니다: %s", pointer)
+                    return
+                self._matrix = matrix
+                self._ids, self._texts, self._metadatas = meta["ids"], meta["texts"], meta["metadatas"]
+                return
+            logger.warning("[NumpyBackend] 색인 파일이 계속 교체되어 읽지 못했습니다: %s", self.persist_dir)
+
+    def _save(self, matrix: np.ndarray, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        # 메모리 맵을 닫은 뒤 교체해야 Windows 등에서도 파일 정리 가능
+        self._matrix = None
+        previous = self._read_pointer()
+        version = f"{time.time_ns():x}-{os.getpid()}"
+        pointer = {"vectors": f"vectors-{version}.npy", "chunks": f"chunks-{version}.json"}
+        np.save(self._path(pointer["vectors"]), matrix.astype(np.float32, copy=False))
+        with open(self._path(pointer["chunks"]), "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f, ensure_ascii=False)
+        tmp_pointer = self._path(self.POINTER_FILE) + f".{os.getpid()}.tmp"
+        with open(tmp_pointer, "w", encoding="utf-8") as f:
+            json.dump(pointer, f)
+        os.replace(tmp_pointer, self._path(self.POINTER_FILE))
+        self._cleanup(keep=[pointer, previous or {}])
+        self._load()
+
+    def _data_files(self) -> List[str]:
+        return [
+            name
+            for name in os.listdir(self.persist_dir)
+            if (name.startswith("vectors") and name.endswith(".npy"))
+            or (name.startswith("chunks") and name.endswith(".json"))
+        ]
+
+    def _cleanup(self, keep: List[Dict[str, str]]) -> None:
+        """
+        현재/직전 버전을 제외한 데이터 파일 정리 (실패해도 다음 저장 때 다시 시도)
+        다른 프로세스가 아직 포인터를 바꾸기 전인 새 파일을 지우지 않도록 CLEANUP_AGE_SEC 이 지난 파일만 정리
+        """
+        keep_names = {name for pointer in keep for name in pointer.values()}
+        cutoff = time.time() - self.CLEANUP_AGE_SEC
+        for name in self._data_files():
+            if name in keep_names:
+                continue
+            try:
+                if os.path.getmtime(self._path(name)) < cutoff:
+                    os.remove(self._path(name))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _normalize(vectors: Any) -> np.ndarray:
+        m = np.asarray(vectors, dtype=np.float32)
+        if m.ndim == 1:
+            m = m[None, :]
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return m / norms
+
+    def add(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], docs: Sequence[Document]) -> None:
+        if not ids:
+            return
+        new = self._normalize(vectors)
+        with self._lock:
+            replaced = set(ids)
+            keep = [i for i, chunk_id in enumerate(self._ids) if chunk_id not in replaced]
+            if self._matrix is not None and self._matrix.shape[1] != new.shape[1]:
+                logger.warning("[NumpyBackend] 임베딩 차원이 바뀌어 기존 벡터를 버립니다.")
+                keep = []
+            old = np.asarray(self._matrix[keep]) if self._matrix is not None and keep else np.zeros((0, new.shape[1]), np.float32)
+            self._save(
+                np.vstack([old, new]),
+                [self._ids[i] for i in keep] + list(ids),
+                [self._texts[i] for i in keep] + [d.page_content for d in docs],
+                [self._metadatas[i] for i in keep] + [dict(d.metadata) for d in docs],
+            )
+
+    def delete(self, ids: Sequence[str]) -> None:
+        removed = set(ids)
+        with self._lock:
+            if self._matrix is None or not removed.intersection(self._ids):
+                return
+            keep = [i for i, chunk_id in enumerate(self._ids) if chunk_id not in removed]
+            self._save(
+                np.asarray(self._matrix[keep]).reshape(len(keep), self._matrix.shape[1]),
+                [self._ids[i] for i in keep],
+                [self._texts[i] for i in keep],
+                [self._metadatas[i] for i in keep],
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._matrix, self._ids, self._texts, self._metadatas = None, [], [], []
+            for name in [self.POINTER_FILE] + self._data_files():
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def search(self, vector: Sequence[float], k: int) -> List[Tuple[Document, float]]:
+        with self._lock:
+            matrix, ids_len = self._matrix, len(self._ids)
+            texts, metadatas = self._texts, self._metadatas
+        if matrix is None or ids_len == 0 or k <= 0:
+            return []
+        scores = matrix @ self._normalize(vector)[0]
+        k = min(k, ids_len)
+        top = np.argpartition(-scores, k - 1)[:k] if k < ids_len else np.arange(ids_len)
+        top = top[np.argsort(-scores[top])]
+        return [(Document(page_content=texts[i], metadata=dict(metadatas[i])), float(scores[i])) for i in top]
+
+
+BACKENDS = {
+    ChromaBackend.name: ChromaBackend,
+    NumpyBackend.name: NumpyBackend,
+}
+
+
+def create_backend(kind: str, persist_dir: str) -> RetrievalBackend:
+    """이름으로 백엔드 생성 (알 수 없는 이름이면 ValueError)"""
+    try:
+        backend_cls = BACKENDS[kind]
+    except KeyError:
+        raise ValueError(f"지원하지 않는 벡터 백엔드입니다: {kind} (가능: {', '.join(BACKENDS)})")
+    return backend_cls(persist_dir)
@@ -0,0 +1,117 @@
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 쿼리 정규화 (유니코드 NFC + 공백 정리)"""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    쿼리 임베딩 결과를 메모이즈하는 Embeddings 래퍼.
+
+    - 키: (배포명, 정규화된 쿼리 텍스트)
+    - LRU + TTL 로 크기/유효기간 제한
+    - 한 번의 그래프 실행에서 세 에이전트가 같은 user_input 으로 검색하므로
+      실제 임베딩 호출은 1번만 발생한다.
+    - 문서 임베딩(인덱스 구축용)은 캐시하지 않고 그대로 위임한다.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        namespace: str | None = None,
+        max_size: int = 256,
+        ttl_seconds: float = 3600.0,
+    ) -> None:
+        self.base = base
+        self.namespace = namespace or getattr(base, "deployment", None) or type(base).__name__
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # --------------------------------------------------------
+    # Embeddings 인터페이스
+    # --------------------------------------------------------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = (self.namespace, normalize_query(text))
+
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        vector = self.base.embed_query(text)
+        self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = (self.namespace, normalize_query(text))
+
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        vector = await self.base.aembed_query(text)
+        self._store(key, vector)
+        return vector
+
+    # --------------------------------------------------------
+    # 캐시 관리
+    # --------------------------------------------------------
+    def _lookup(self, key: Tuple[str, str]) -> List[float] | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                stored_at, vector = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                # 만료된 항목 제거
+                del self._cache[key]
+            self.misses += 1
+            return None
+
+    def _store(self, key: Tuple[str, str], vector: List[float]) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic(), vector)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int | float | str]:
+        """캐시 적중/미스 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
@@ -0,0 +1,324 @@
+"""
+지식 문서(knowledge/*.md) 증분 인덱싱
+
+- PERSIST_DIR/index_manifest.json 에 파일별 내용 해시와 청크 ID 목록을 기록한다.
+- 청크 ID 는 (파일명 + 청크 내용) 해시라서, 내용이 같은 청크는 다시 임베딩하지 않는다.
+- 동기화 시 추가/변경된 청크만 배치 단위로 임베딩하고, 사라진 청크는 삭제한다.
+
+수동 동기화:
+    cd app && python -m retrieval.indexing sync
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+from utils.config import get_int_env
+from retrieval.backends import RetrievalBackend
+from retrieval.lexical import LEXICAL_INDEX_FILE, BM25Index
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "index_manifest.json"
+MANIFEST_VERSION = 1
+
+# 청크 분할 설정 (바뀌면 청크 ID 가 모두 달라지므로 전체 재색인)
+# Markdown 헤더(#~###) 단위 섹션으로 먼저 나누고, 긴 섹션만 글자 수 기준으로 다시 자른다.
+HEADERS_TO_SPLIT_ON = [("#", "h1"), ("##", "h2"), ("###", "h3")]
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+
+_sync_lock = threading.Lock()
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _splitter_signature() -> Dict[str, Any]:
+    return {
+        "type": "markdown",
+        "headers": [h for h, _ in HEADERS_TO_SPLIT_ON],
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+
+
+def list_knowledge_files(knowledge_dir: str) -> Dict[str, str]:
+    """파일명 → 전체 경로 (knowledge 디렉터리의 *.md)"""
+    if not os.path.isdir(knowledge_dir):
+        return {}
+    return {
+        name: os.path.join(knowledge_dir, name)
+        for name in sorted(os.listdir(knowledge_dir))
+        if name.endswith(".md")
+    }
+
+
+def split_knowledge_file(name: str, text: str) -> List[Tuple[str, Document]]:
+    """
+    파일 1개를 청크로 나누고 (청크 ID, 문서) 목록 반환
+
+    - metadata: source(파일명), section(헤더 경로, 예: "레고 기본 구조 > 베이스플레이트 활용")
+    - 헤더 줄은 본문에서 빼고 section 으로만 남긴다 (프롬프트에는 출처 표시로 한 번만 들어감)
+    """
+    header_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON, strip_headers=True)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    chunks: List[Document] = []
+    for section in header_splitter.split_text(text):
+        if not section.page_content.strip():
+            continue
+        path = " > ".join(section.metadata[key] for _, key in HEADERS_TO_SPLIT_ON if key in section.metadata)
+        for piece in splitter.split_text(section.page_content):
+            chunks.append(Document(page_content=piece, metadata={"source": name, "section": path}))
+
+    result: List[Tuple[str, Document]] = []
+    seen: Dict[str, int] = {}
+    for chunk in chunks:
+        base_id = _sha256(f"{name}\0{chunk.page_content}")[:32]
+        # 같은 파일 안에 내용이 똑같은 청크가 있으면 순번을 붙여 구분
+        n = seen.get(base_id, 0)
+        seen[base_id] = n + 1
+        chunk_id = base_id if n == 0 else f"{base_id}-{n}"
+        result.append((chunk_id, chunk))
+    return result
+
+
+def _embedding_text(doc: Document) -> str:
+    """임베딩 입력: 섹션 경로를 앞에 붙여 짧은 청크도 문맥을 갖도록 함"""
+    section = doc.metadata.get("section", "")
+    return f"{section}\n{doc.page_content}" if section else doc.page_content
+
+
+# ------------------------------------------------------------
+# manifest
+# ------------------------------------------------------------
+def manifest_path(persist_dir: str) -> str:
+    return os.path.join(persist_dir, MANIFEST_NAME)
+
+
+def load_manifest(persist_dir: str) -> Optional[Dict[str, Any]]:
+    path = manifest_path(persist_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("[indexing] manifest 를 읽을 수 없어 전체 재색인합니다: %s", e)
+        return None
+
+
+def _save_manifest(persist_dir: str, manifest: Dict[str, Any]) -> None:
+    """임시 파일에 쓴 뒤 교체 (중간에 죽어도 manifest 가 깨지지 않도록)"""
+    os.makedirs(persist_dir, exist_ok=True)
+    path = manifest_path(persist_dir)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def knowledge_version(manifest: Optional[Dict[str, Any]]) -> str:
+    """색인된 지식 문서 전체의 버전 해시 (파일 해시 목록 기준)"""
+    if not manifest:
+        return ""
+    files = manifest.get("files", {})
+    return _sha256(json.dumps({k: v["sha256"] for k, v in sorted(files.items())}))[:16]
+
+
+# ------------------------------------------------------------
+# 동기화
+# ------------------------------------------------------------
+def sync_knowledge_index(
+    store: RetrievalBackend,
+    embeddings: Embeddings,
+    knowledge_dir: str,
+    persist_dir: str,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    knowledge 디렉터리와 벡터스토어를 맞춘다. (변경분만 임베딩/삭제)
+
+    - store: 벡터 검색 백엔드 (retrieval.backends)
+    - batch_size: 한 번에 임베딩할 청크 수 (기본 LEGO_EMBED_BATCH_SIZE, 64)
+    - 반환: {"added", "removed", "changed_files", "deleted_files", "unchanged_files", "embed_batches", "elapsed_sec"}
+    """
+    batch_size = max(1, batch_size or get_int_env("LEGO_EMBED_BATCH_SIZE", 64))
+    namespace = getattr(embeddings, "namespace", None) or type(embeddings).__name__
+
+    with _sync_lock:
+        started = time.perf_counter()
+        manifest = load_manifest(persist_dir)
+
+        # manifest 가 없거나(이전 버전 DB) 분할/임베딩 설정이 바뀌었으면 컬렉션을 비우고 전체 재색인
+        if (
+            manifest is None
+            or manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("splitter") != _splitter_signature()
+            or manifest.get("embedding") != namespace
+        ):
+            if manifest is not None or store.count():
+                logger.info("[indexing] 색인 설정이 바뀌어 전체 재색인합니다.")
+            store.reset()
+            manifest = {"files": {}}
+
+        old_files: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+        new_files: Dict[str, Dict[str, Any]] = {}
+        to_add: List[Tuple[str, Document]] = []
+        to_remove: List[str] = []
+        changed_files: List[str] = []
+        unchanged = 0
+        file_texts: Dict[str, str] = {}
+
+        for name, path in list_knowledge_files(knowledge_dir).items():
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            file_texts[name] = text
+            file_hash = _sha256(text)
+            old = old_files.get(name)
+            if old and old.get("sha256") == file_hash:
+                new_files[name] = old
+                unchanged += 1
+                continue
+
+            chunks = split_knowledge_file(name, text)
+            new_ids = [chunk_id for chunk_id, _ in chunks]
+            old_ids = set(old["chunks"]) if old else set()
+            to_add.extend((chunk_id, doc) for chunk_id, doc in chunks if chunk_id not in old_ids)
+            to_remove.extend(sorted(old_ids - set(new_ids)))
+            new_files[name] = {"sha256": file_hash, "chunks": new_ids}
+            changed_files.append(name)
+
+        deleted_files = sorted(set(old_files) - set(new_files))
+        for name in deleted_files:
+            to_remove.extend(old_files[name]["chunks"])
+
+        if to_remove:
+            store.delete(to_remove)
+
+        batches = 0
+        for i in range(0, len(to_add), batch_size):
+            batch = to_add[i : i + batch_size]
+            vectors = embeddings.embed_documents([_embedding_text(doc) for _, doc in batch])
+            store.add([chunk_id for chunk_id, _ in batch], vectors, [doc for _, doc in batch])
+            batches += 1
+
+        # BM25 역색인은 전체 청크로 다시 만든다 (임베딩이 없어 수백 청크 기준 수 ms)
+        lexical_path = os.path.join(persist_dir, LEXICAL_INDEX_FILE)
+        if to_add or to_remove or not os.path.exists(lexical_path):
+            chunks = [chunk for name in sorted(file_texts) for chunk in split_knowledge_file(name, file_texts[name])]
+            BM25Index.build(
+                [chunk_id for chunk_id, _ in chunks],
+                [doc.page_content for _, doc in chunks],
+                [doc.metadata for _, doc in chunks],
+            ).save(persist_dir)
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "splitter": _splitter_signature(),
+            "embedding": namespace,
+            "files": new_files,
+            "updated_at": time.time(),
+        }
+        _save_manifest(persist_dir, manifest)
+
+        report = {
+            "added": len(to_add),
+            "removed": len(to_remove),
+            "changed_files": changed_files,
+            "deleted_files": deleted_files,
+            "unchanged_files": unchanged,
+            "embed_batches": batches,
+            "knowledge_version": knowledge_version(manifest),
+            "elapsed_sec": time.perf_counter() - started,
+        }
+        if to_add or to_remove:
+            logger.info(
+                "[indexing] 지식 색인 동기화: 추가 %d, 삭제 %d, 변경 파일 %s, 삭제 파일 %s (%.2fs)",
+                report["added"],
+                report["removed"],
+                changed_files,
+                deleted_files,
+                report["elapsed_sec"],
+            )
+        return report
+
+
+# ------------------------------------------------------------
+# 파일 변경 감시 (선택)
+# ------------------------------------------------------------
+def _dir_fingerprint(knowledge_dir: str) -> Tuple[Tuple[str, int, int], ...]:
+    """파일명/크기/수정시각 목록 (내용 해시보다 훨씬 싸게 변경 여부 확인)"""
+    result = []
+    for name, path in list_knowledge_files(knowledge_dir).items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        result.append((name, st.st_size, st.st_mtime_ns))
+    return tuple(result)
+
+
+class KnowledgeWatcher:
+    """knowledge 디렉터리를 주기적으로 확인하고, 바뀌면 on_change 콜백 실행 (데몬 스레드)"""
+
+    def __init__(self, knowledge_dir: str, on_change: Callable[[], Any], interval: float = 5.0) -> None:
+        self.knowledge_dir = knowledge_dir
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._fingerprint = _dir_fingerprint(knowledge_dir)
+        self._thread = threading.Thread(target=self._loop, name="knowledge-watcher", daemon=True)
+
+    def start(self) -> "KnowledgeWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            fingerprint = _dir_fingerprint(self.knowledge_dir)
+            if fingerprint == self._fingerprint:
+                continue
+            self._fingerprint = fingerprint
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.warning("[indexing] 지식 문서 변경 반영 실패: %s", e)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from dotenv import load_dotenv
+
+    from retrieval.vector_store import get_vectorstore, get_index_report, refresh_knowledge_index
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="지식 문서 벡터 색인 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync", help="변경된 지식 문서만 다시 임베딩")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "sync":
+        # 벡터스토어를 열 때 동기화가 이미 실행되면 그 결과를 출력
+        get_vectorstore()
+        report = get_index_report() or refresh_knowledge_index()
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+지식 청크용 BM25 역색인 (한국어 문자 n-gram)
+
+- 단어(한글/영문/숫자 연속)와, 두 글자 이상 한글 단어의 문자 bigram 을 색인어로 사용
+  → 조사/어미가 붙은 형태("기어를", "테크닉빔")도 부분 일치로 찾을 수 있음
+- 색인 시(retrieval.indexing) 한 번 만들어 JSON 으로 저장, 검색 프로세스는 읽기만 한다.
+"""
+import os
+import re
+import json
+import math
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_FILE = "lexical_index.json"
+LEXICAL_INDEX_VERSION = 1
+
+_WORD_RE = re.compile(r"[0-9a-z]+(?:x[0-9]+)*|[가-힣]+")
+_HANGUL_RE = re.compile(r"^[가-힣]+$")
+
+
+def tokenize(text: str) -> List[str]:
+    """BM25 색인어 목록 (단어 + 한글 단어의 문자 bigram)"""
+    text = unicodedata.normalize("NFC", text or "").lower().replace("×", "x")
+    terms: List[str] = []
+    for word in _WORD_RE.findall(text):
+        terms.append(word)
+        if len(word) > 2 and _HANGUL_RE.match(word):
+            terms.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return terms
+
+
+class BM25Index:
+    """청크 단위 BM25 (Okapi, k1/b 기본값)"""
+
+    def __init__(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        doc_len: List[int],
+        postings: Dict[str, List[Tuple[int, int]]],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.doc_len = doc_len
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avgdl = (sum(doc_len) / len(doc_len)) if doc_len else 0.0
+
+    @classmethod
+    def build(cls, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> "BM25Index":
+        """청크 목록으로 역색인 생성 (색인어 → [(청크 번호, 빈도)], 섹션 경로도 색인)"""
+        doc_len: List[int] = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for idx, (text, meta) in enumerate(zip(texts, metadatas)):
+            counts = Counter(tokenize(f"{meta.get('section', '')}\n{text}"))
+            doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((idx, tf))
+        return cls(list(ids), list(texts), [dict(m) for m in metadatas], doc_len, postings)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def idf(self, term: str) -> float:
+        n = len(self.ids)
+        df = len(self.postings.get(term, ()))
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int) -> Tuple[List[Tuple[Document, float]], float]:
+        """
+        (문서, BM25 점수) 상위 k 개와 신뢰도(0~1)를 반환.
+
+        신뢰도 = 1위 문서가 포함한 질의 색인어의 IDF 합 / 질의 전체 색인어의 IDF 합
+        (질의어 대부분이 한 청크에 모여 있으면 1 에 가까움)
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.ids:
+            return [], 0.0
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for idx, tf in postings:
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * self.doc_len[idx] / (self.avgdl or 1.0)))
+                scores[idx] = scores.get(idx, 0.0) + idf * norm
+
+        if not scores:
+            return [], 0.0
+
+        ranked = sorted(scores.items(), key=lambda x: -x[1])[:k]
+        top_idx = ranked[0][0]
+        total_idf = sum(self.idf(t) for t in terms)
+        covered = sum(self.idf(t) for t in terms if any(idx == top_idx for idx, _ in self.postings.get(t, ())))
+        confidence = covered / total_idf if total_idf else 0.0
+
+        results = [
+            (Document(page_content=self.texts[idx], metadata=dict(self.metadatas[idx])), score)
+            for idx, score in ranked
+        ]
+        return results, confidence
+
+    # --- 저장/로드 ---
+
+    def save(self, index_dir: str) -> None:
+        os.makedirs(index_dir, exist_ok=True)
+        path = os.path.join(index_dir, LEXICAL_INDEX_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": LEXICAL_INDEX_VERSION,
+                    "ids": self.ids,
+                    "texts": self.texts,
+                    "metadatas": self.metadatas,
+                    "doc_len": self.doc_len,
+                    "postings": self.postings,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["BM25Index"]:
+        """저장된 색인 로드 (없거나 버전이 다르면 None)"""
+        path = os.path.join(index_dir, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != LEXICAL_INDEX_VERSION:
+            return None
+        postings = {term: [(idx, tf) for idx, tf in entries] for term, entries in data["postings"].items()}
+        return cls(data["ids"], data["texts"], data["metadatas"], data["doc_len"], postings)
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Document]],
+    k: int,
+    rrf_k: int = 60,
+) -> List[Tuple[Document, float]]:
+    """여러 검색 결과 순위를 RRF(1 / (rrf_k + rank)) 로 합쳐 (문서, 점수) 상위 k 개 반환 (같은 청크는 출처+본문으로 식별)"""
+    fused: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = (doc.metadata.get("source", ""), doc.page_content)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ranked = sorted(fused.items(), key=lambda x: -x[1])[:k]
+    return [(docs[key], score) for key, score in ranked]
@@ -1,73 +1,335 @@
 import os
-import glob
-from typing import List, Dict, Any
+import asyncio
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 
-from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
 
-from utils.config import get_embeddings
+from utils import metrics
+from utils.config import get_embeddings, get_int_env, get_float_env
+from utils.tokens import count_tokens, truncate_to_tokens
+from utils.user_input import split_user_input
+from retrieval.embedding_cache import CachedEmbeddings
+from retrieval.backends import RetrievalBackend, create_backend
+from retrieval.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+from retrieval.indexing import (
+    KnowledgeWatcher,
+    knowledge_version,
+    list_knowledge_files,
+    load_manifest,
+    sync_knowledge_index,
+)
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 KNOWLEDGE_DIR = os.path.join(BASE_DIR, "retrieval", "knowledge")
 PERSIST_DIR = os.path.join(BASE_DIR, "retrieval", "chroma_db")
+NUMPY_INDEX_DIR = os.path.join(BASE_DIR, "retrieval", "numpy_index")
 
+# 컨텍스트 예산이 이보다 적게 남으면 다음 문서를 잘라 넣지 않음
+MIN_TRUNCATED_TOKENS = 40
 
-def _load_lego_docs() -> List[Document]:
-    docs: List[Document] = []
-    pattern = os.path.join(KNOWLEDGE_DIR, "*.md")
-    for path in glob.glob(pattern):
-        with open(path, "r", encoding="utf-8") as f:
-            text = f.read()
-        name = os.path.basename(path)
-        docs.append(Document(page_content=text, metadata={"source": name}))
-    return docs
+# 프로세스 전역 벡터스토어 핸들 (한 번만 열어서 재사용)
+_store_lock = threading.Lock()
+_vectorstore: Optional[RetrievalBackend] = None
+_embeddings: Optional[CachedEmbeddings] = None
+_base_embeddings_override: Optional[Embeddings] = None
+_last_index_report: Optional[Dict[str, Any]] = None
+_watcher: Optional[KnowledgeWatcher] = None
+_lexical: Optional[BM25Index] = None
+# (만든 기준 BM25 색인, 지식 문서 전체 텍스트, 토큰 수) – 색인이 다시 로드되면 새로 만든다
+_static_knowledge: Optional[Tuple[BM25Index, str, int]] = None
 
+# 검색 경로별 호출 수 (hybrid: BM25 + 벡터 RRF, vector: BM25 후보가 없어 벡터 결과만 사용,
+# lexical_fast_path: 임베딩 없이 BM25 결과만 사용)
+_stats_lock = threading.Lock()
+_retrieval_stats: Dict[str, int] = {"vector": 0, "hybrid": 0, "lexical_fast_path": 0}
 
-def _build_vectorstore():
-    os.makedirs(PERSIST_DIR, exist_ok=True)
-    embeddings = get_embeddings()
-    docs = _load_lego_docs()
-    if not docs:
-        raise RuntimeError(f"지식 문서를 찾을 수 없습니다: {KNOWLEDGE_DIR}")
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
-    vs = Chroma.from_documents(
-        chunks,
-        embedding=embeddings,
-        persist_directory=PERSIST_DIR,
-    )
-    return vs
-
-
-def get_vectorstore():
-    has_db = os.path.exists(PERSIST_DIR) and os.listdir(PERSIST_DIR)
-    if not has_db:
-        return _build_vectorstore()
-    embeddings = get_embeddings()
-    vs = Chroma(
-        embedding_function=embeddings,
-        persist_directory=PERSIST_DIR,
-    )
-    return vs
-
-
-def get_retriever():
+
+def get_cached_embeddings() -> CachedEmbeddings:
+    """쿼리 임베딩 캐시가 적용된 임베딩 모델 (프로세스당 1개)
+
+    - LEGO_EMBED_CACHE_SIZE (기본 256): 캐시 최대 항목 수
+    - LEGO_EMBED_CACHE_TTL (기본 3600초): 캐시 유효 기간
+    """
+    global _embeddings
+    with _store_lock:
+        if _embeddings is None:
+            base = _base_embeddings_override or get_embeddings()
+            _embeddings = CachedEmbeddings(
+                base,
+                max_size=get_int_env("LEGO_EMBED_CACHE_SIZE", 256),
+                ttl_seconds=float(get_int_env("LEGO_EMBED_CACHE_TTL", 3600)),
+            )
+        return _embeddings
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """쿼리 임베딩 캐시 적중/미스 통계"""
+    return get_cached_embeddings().stats()
+
+
+def reset_vectorstore(embeddings: Optional[Embeddings] = None) -> None:
+    """
+    벡터스토어 핸들과 임베딩 캐시를 버린다. 다음 호출 때 다시 연다.
+
+    - embeddings 를 주면 이후 Azure 임베딩 대신 해당 모델을 사용 (fake 임베더 주입용)
+    """
+    global _vectorstore, _embeddings, _base_embeddings_override, _last_index_report, _watcher, _lexical
+    with _store_lock:
+        _vectorstore = None
+        _lexical = None
+        _embeddings = None
+        _base_embeddings_override = embeddings
+        _last_index_report = None
+        if _watcher is not None:
+            _watcher.stop()
+            _watcher = None
+
+
+def get_backend_kind() -> str:
+    """LEGO_VECTOR_BACKEND: chroma(기본) | numpy"""
+    return (os.getenv("LEGO_VECTOR_BACKEND") or "chroma").strip().lower()
+
+
+def get_index_dir() -> str:
+    """현재 백엔드의 색인 저장 디렉터리 (manifest 도 여기에 저장)"""
+    return NUMPY_INDEX_DIR if get_backend_kind() == "numpy" else PERSIST_DIR
+
+
+def get_vectorstore() -> RetrievalBackend:
+    """
+    프로세스 전역 벡터 검색 백엔드 (최초 1회만 디스크에서 열기)
+
+    - LEGO_VECTOR_BACKEND 로 백엔드 선택 (chroma | numpy)
+    - 열 때 지식 문서와 색인을 비교해 추가/변경/삭제된 청크만 반영 (LEGO_INDEX_SYNC_ON_START=0 이면 생략)
+    - LEGO_KNOWLEDGE_WATCH_INTERVAL(초, 기본 0=끔) 을 주면 지식 문서 변경을 감시해 자동 반영
+    """
+    global _vectorstore, _last_index_report, _watcher, _lexical
+    if _vectorstore is not None:
+        return _vectorstore
+
+    embeddings = get_cached_embeddings()
+    with _store_lock:
+        if _vectorstore is None:
+            index_dir = get_index_dir()
+            vs = create_backend(get_backend_kind(), index_dir)
+            if get_int_env("LEGO_INDEX_SYNC_ON_START", 1):
+                _last_index_report = sync_knowledge_index(vs, embeddings, KNOWLEDGE_DIR, index_dir)
+            if not list_knowledge_files(KNOWLEDGE_DIR) and not load_manifest(index_dir):
+                raise RuntimeError(f"지식 문서를 찾을 수 없습니다: {KNOWLEDGE_DIR}")
+            _lexical = BM25Index.load(index_dir)
+            _vectorstore = vs
+
+            interval = get_int_env("LEGO_KNOWLEDGE_WATCH_INTERVAL", 0)
+            if interval > 0 and _watcher is None:
+                _watcher = KnowledgeWatcher(KNOWLEDGE_DIR, refresh_knowledge_index, interval=interval).start()
+                logger.info("[vector_store] 지식 문서 변경 감시 시작 (%ds 간격)", interval)
+        return _vectorstore
+
+
+def refresh_knowledge_index(batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """지식 문서 변경분을 지금 바로 색인에 반영 (수동 호출/파일 감시용)"""
+    global _last_index_report, _lexical
     vs = get_vectorstore()
-    return vs.as_retriever(search_kwargs={"k": 4})
+    index_dir = get_index_dir()
+    report = sync_knowledge_index(vs, get_cached_embeddings(), KNOWLEDGE_DIR, index_dir, batch_size=batch_size)
+    _last_index_report = report
+    _lexical = BM25Index.load(index_dir)
+    return report
+
+
+def get_index_report() -> Optional[Dict[str, Any]]:
+    """마지막 색인 동기화 결과 (아직 동기화 전이면 None)"""
+    return _last_index_report
+
+
+def get_knowledge_version() -> str:
+    """현재 색인된 지식 문서 버전 해시 (결과 캐시 키 등에 사용)"""
+    if _last_index_report is not None:
+        return _last_index_report["knowledge_version"]
+    return knowledge_version(load_manifest(get_index_dir()))
+
+
+def get_retriever(k: int = 4) -> RunnableLambda:
+    """query → 문서 목록 Runnable (LangChain 체인 연결용)"""
+
+    def _search(query: str) -> List[Document]:
+        return search_lego_info(query, k=k)
+
+    async def _asearch(query: str) -> List[Document]:
+        return await asearch_lego_info(query, k=k)
+
+    return RunnableLambda(_search, afunc=_asearch, name="lego_retriever")
+
+
+def get_retrieval_mode() -> str:
+    """LEGO_RETRIEVAL_MODE: hybrid(기본, BM25 + 벡터 RRF) | vector"""
+    mode = (os.getenv("LEGO_RETRIEVAL_MODE") or "hybrid").strip().lower()
+    return mode if mode in ("hybrid", "vector") else "hybrid"
+
+
+def _count(path: str) -> None:
+    with _stats_lock:
+        _retrieval_stats[path] += 1
+
+
+def get_retrieval_stats() -> Dict[str, Any]:
+    """검색 경로별 호출 수와 lexical fast path 비율"""
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_retrieval_stats)
+    total = sum(stats.values())
+    stats["lexical_fast_path_rate"] = (stats["lexical_fast_path"] / total) if total else 0.0
+    return stats
+
+
+def _lexical_candidates(query: str, k: int) -> Tuple[Optional[List[Tuple[Document, float]]], List[Document]]:
+    """
+    BM25 검색. (fast path 결과 또는 None, RRF 에 넣을 후보 목록)
+
+    - 신뢰도는 창작 목표(split_user_input)만으로 판단: 에이전트 질의는 build_user_input 전체라
+      템플릿 문구(규모/용도/난이도 …)가 색인어 대부분을 차지해 전체 질의로는 신뢰도가 오르지 않음
+    - 목표로 검색한 1위 청크가 목표 색인어를 LEGO_LEXICAL_CONFIDENCE(기본 0.75, IDF 가중) 이상 포함하면
+      임베딩 호출 없이 목표 BM25 결과를 그대로 사용 (1 초과로 설정하면 fast path 끔)
+    - 그렇지 않으면 전체 질의 BM25 결과를 RRF 후보로 사용
+    """
+    lexical = _lexical
+    if lexical is None or get_retrieval_mode() != "hybrid":
+        return None, []
+    results, confidence = lexical.search(query, k)
+    goal = split_user_input(query)[0]
+    if goal != query:
+        fast, confidence = lexical.search(goal, k)
+    else:
+        fast = results
+    if fast and confidence >= get_float_env("LEGO_LEXICAL_CONFIDENCE", 0.75):
+        return fast, [doc for doc, _ in results]
+    return None, [doc for doc, _ in results]
+
+
+def _fuse(vector_results: List[Tuple[Document, float]], lexical_docs: List[Document], k: int) -> List[Tuple[Document, float]]:
+    if not lexical_docs:
+        _count("vector")
+        return vector_results[:k]
+    _count("hybrid")
+    return reciprocal_rank_fusion([[doc for doc, _ in vector_results], lexical_docs], k)
+
+
+def select_relevant(scored: List[Tuple[Document, float]], k: int) -> List[Document]:
+    """
+    검색 후보에서 실제로 프롬프트에 넣을 문서를 고른다 (adaptive k)
+
+    - 1위 점수 대비 LEGO_RETRIEVAL_MIN_RELATIVE_SCORE(기본 0.5) 미만인 후보는 제외
+    - 이미 고른 문서와 색인어가 LEGO_RETRIEVAL_MAX_OVERLAP(기본 0.8, Jaccard) 이상 겹치면 중복으로 보고 제외
+    - 최대 k 개
+    """
+    if not scored:
+        return []
+    min_relative = get_float_env("LEGO_RETRIEVAL_MIN_RELATIVE_SCORE", 0.5)
+    max_overlap = get_float_env("LEGO_RETRIEVAL_MAX_OVERLAP", 0.8)
+    top = scored[0][1]
+
+    selected: List[Document] = []
+    selected_terms: List[set] = []
+    for doc, score in scored:
+        if len(selected) >= k:
+            break
+        if selected and top > 0 and score < top * min_relative:
+            break
+        terms = set(tokenize(doc.page_content))
+        if any(_jaccard(terms, other) >= max_overlap for other in selected_terms):
+            continue
+        selected.append(doc)
+        selected_terms.append(terms)
+    return selected
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
 
 
 def search_lego_info(query: str, k: int = 4) -> List[Document]:
-    retriever = get_retriever()
-    docs = retriever.invoke(query)
-    return docs[:k]
+    """질의와 관련된 지식 청크 (최대 k 개, 관련도가 낮거나 중복인 청크는 제외)"""
+    vs = get_vectorstore()
+    candidates = k * 3
+    with metrics.span("retrieval.lexical"):
+        fast, lexical_docs = _lexical_candidates(query, candidates)
+    if fast is not None:
+        _count("lexical_fast_path")
+        return select_relevant(fast, k)
+    with metrics.span("retrieval.embed"):
+        vector = get_cached_embeddings().embed_query(query)
+    with metrics.span("retrieval.vector"):
+        results = vs.search(vector, candidates)
+    return select_relevant(_fuse(results, lexical_docs, candidates), k)
+
+
+async def asearch_lego_info(query: str, k: int = 4) -> List[Document]:
+    """search_lego_info 의 비동기 버전 (임베딩은 비동기 호출, 백엔드 검색은 스레드에서 실행)"""
+    vs = await asyncio.to_thread(get_vectorstore)
+    candidates = k * 3
+    with metrics.span("retrieval.lexical"):
+        fast, lexical_docs = _lexical_candidates(query, candidates)
+    if fast is not None:
+        _count("lexical_fast_path")
+        return select_relevant(fast, k)
+    with metrics.span("retrieval.embed"):
+        vector = await get_cached_embeddings().aembed_query(query)
+    with metrics.span("retrieval.vector"):
+        results = await asyncio.to_thread(vs.search, vector, candidates)
+    return select_relevant(_fuse(results, lexical_docs, candidates), k)
+
+
+def get_static_knowledge(max_tokens: int) -> str:
+    """
+    지식 문서 전체를 프롬프트용 텍스트로 합친다. (프롬프트 prefix 캐시용 고정 블록)
+
+    - 파일명 순, 파일 안에서는 색인 순서 그대로 → 색인이 바뀌지 않는 한 바이트 단위로 같은 텍스트
+    - 전체가 max_tokens 를 넘거나 색인이 없으면 "" (이때는 질의별 RAG 검색 결과를 사용)
+    """
+    global _static_knowledge
+    get_vectorstore()
+    lexical = _lexical
+    if lexical is None or max_tokens <= 0:
+        return ""
+    cached = _static_knowledge
+    if cached is None or cached[0] is not lexical:
+        order = sorted(range(len(lexical.ids)), key=lambda i: lexical.metadatas[i].get("source", ""))
+        docs = [Document(page_content=lexical.texts[i], metadata=lexical.metadatas[i]) for i in order]
+        text = format_retrieved_context(docs)
+        cached = (lexical, text, count_tokens(text))
+        _static_knowledge = cached
+    return cached[1] if cached[2] <= max_tokens else ""
+
 
+def format_retrieved_context(docs: List[Document], max_tokens: Optional[int] = None) -> str:
+    """
+    검색 문서를 프롬프트용 텍스트로 합친다.
 
-def format_retrieved_context(docs: List[Document]) -> str:
+    - 각 문서 앞에 [파일명 > 섹션 경로] 출처 표시
+    - max_tokens 를 주면 그 안에서 순서대로 채우고, 넘치는 문서는 잘라내거나 생략
+    """
     if not docs:
         return ""
-    parts = []
+    parts: List[str] = []
+    remaining = max_tokens
     for doc in docs:
         src = doc.metadata.get("source", "")
-        parts.append(f"[{src}]\n{doc.page_content}")
+        section = doc.metadata.get("section", "")
+        part = f"[{src} > {section}]\n{doc.page_content}" if section else f"[{src}]\n{doc.page_content}"
+        if remaining is not None:
+            cost = count_tokens(part) + (2 if parts else 0)
+            if cost > remaining:
+                # 남은 예산이 너무 적으면 반쪽짜리 문서를 넣지 않고 종료
+                if remaining >= MIN_TRUNCATED_TOKENS:
+                    parts.append(truncate_to_tokens(part, remaining))
+                break
+            remaining -= cost
+        parts.append(part)
     return "\n\n".join(parts)
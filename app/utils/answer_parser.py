@@ -0,0 +1,243 @@
+"""
+최종 답변 파서 ('5. 브릭/부품 제안' 섹션 분리 + 표 행 추출을 한 번에)
+
+    parsed = parse_answer(answer)
+    parsed["before"], parsed["header"], parsed["rows"], parsed["after"], parsed["format"]
+
+- 답변을 줄 단위로 한 번만 훑으면서 섹션 헤더 → 표 헤더 → 행 → 다음 섹션 경계를 찾는다.
+  (정규식은 모듈 로드 시 한 번만 컴파일, 눈에 보이는 '\\n' 줄 제거도 같은 루프에서 처리)
+- 섹션이 없으면 header 는 "" 이고 before 에 정리된 전체 답변이 들어간다.
+
+표 형식 (format):
+- standard: | 부품 종류 | 부품 번호 | 부품 이름 | 이미지 | 설명 및 용도 | (현재 Refiner 프롬프트 형식)
+- named: 열이 빠졌거나 순서/이름이 조금 달라도 '번호' 열이 있으면 열 이름으로 해석
+- usage_first_4 / type_first_detail_3: 예전 프롬프트의 레거시 3~4열 형식
+
+회귀/처리량 확인: python -m benchmarks.run --stages parse (benchmarks/corpus/ 의 답변 모음)
+"""
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PART_NUM_PATTERN = re.compile(r"\b(\d{3,6}[a-zA-Z]?)\b")
+
+# "5. 브릭/부품 제안" (## / ** 접두, "5)" 표기, "브릭 / 부품" 띄어쓰기 허용)
+_SECTION_HEADER_RE = re.compile(r"[ \t]*(#*)[ \t]*\**[ \t]*5[ \t]*[.)][ \t]*(?:브릭[ \t]*[/·]?[ \t]*)?부품[ \t]*제안")
+# 다음 섹션 경계: "6. ..." 같은 번호 줄, 번호 붙은 마크다운 제목(## 6. / **6.),
+# 또는 섹션 헤더와 같거나 높은 수준의 #제목 (더 낮은 수준의 소제목은 섹션 안으로 본다)
+_NUMBERED_LINE_RE = re.compile(r"[ \t]*\d+\.\s")
+_NUMBERED_HEADING_RE = re.compile(r"[ \t]*(?:#+|\*\*)[ \t]*\d+[ \t]*[.)]")
+_HEADING_RE = re.compile(r"[ \t]*(#+)[ \t]")
+# 표 구분선 (| --- | :---: |)
+_SEPARATOR_RE = re.compile(r"[\s|:-]*[-:][\s|:-]*")
+# 한 칸에 여러 번호를 넣은 경우 ("3001, 3003")
+_MULTI_NUM_RE = re.compile(r"\d{3,6}[a-zA-Z]?(?:[ \t]*[,/][ \t]*\d{3,6}[a-zA-Z]?)+")
+_NUM_SPLIT_RE = re.compile(r"[ \t]*[,/][ \t]*")
+
+# 형식별 최소 칸 수 (이보다 짧은 행은 버림)
+_MIN_CELLS = {"standard": 3, "named": 2, "usage_first_4": 4, "type_first_detail_3": 3}
+
+
+def _cells(line: str) -> List[str]:
+    return [c.strip() for c in line.strip().strip("|").split("|")]
+
+
+def _find(cells: List[str], keyword: str, default: int) -> int:
+    for i, c in enumerate(cells):
+        if keyword in c:
+            return i
+    return default
+
+
+def _table_layout(cells: List[str]) -> Tuple[str, Dict[str, int]]:
+    """표 헤더 칸으로 형식과 열 위치 결정 (-1 은 해당 열 없음)"""
+    n_cols = len(cells)
+    text = " ".join(cells)
+
+    if (
+        "부품 종류" in text
+        and "부품 번호" in text
+        and "부품 이름" in text
+        and "이미지" in text
+        and ("설명" in text or "용도" in text)
+    ):
+        return "standard", {
+            "type": _find(cells, "부품 종류", 0),
+            "num": _find(cells, "부품 번호", 1 if n_cols > 1 else 0),
+            "desc": _find(cells, "설명", n_cols - 1),
+            "usage": -1,
+            "detail": -1,
+        }
+    if n_cols >= 4 and "용도" in cells[0] and "부품 번호" in text:
+        return "usage_first_4", {"type": 1, "num": 2, "desc": 3, "usage": 0, "detail": -1}
+    if n_cols >= 3 and "상세" in cells[1]:
+        return "type_first_detail_3", {"type": 0, "num": -1, "desc": 2, "usage": -1, "detail": 1}
+
+    num_idx = _find(cells, "번호", -1)
+    if num_idx >= 0:
+        desc_idx = _find(cells, "설명", -1)
+        if desc_idx < 0:
+            desc_idx = _find(cells, "용도", -1)
+        return "named", {
+            "type": _find(cells, "종류", -1),
+            "num": num_idx,
+            "desc": desc_idx,
+            "usage": -1,
+            "detail": -1,
+        }
+
+    if n_cols >= 4:
+        return "usage_first_4", {"type": 1, "num": 2, "desc": 3, "usage": 0, "detail": -1}
+    return "type_first_detail_3", {"type": 0, "num": -1, "desc": 2, "usage": -1, "detail": 1}
+
+
+def _cell(cells: List[str], idx: int) -> str:
+    return cells[idx] if 0 <= idx < len(cells) else ""
+
+
+def _append_rows(rows: List[Dict[str, Any]], cells: List[str], fmt: str, layout: Dict[str, int]) -> None:
+    part_type = _cell(cells, layout["type"])
+    description = _cell(cells, layout["desc"]) or _cell(cells, layout["usage"])
+
+    if layout["detail"] >= 0:
+        m = PART_NUM_PATTERN.search(_cell(cells, layout["detail"]))
+        part_num = m.group(1) if m else ""
+    else:
+        part_num = _cell(cells, layout["num"])
+
+    # "3001, 3003" → 번호마다 한 행 (프롬프트 규칙 위반이지만 부품은 살린다)
+    if fmt in ("standard", "named") and _MULTI_NUM_RE.fullmatch(part_num):
+        for num in _NUM_SPLIT_RE.split(part_num):
+            rows.append({"part_type": part_type, "part_num": num, "description": description})
+        return
+
+    # URL이 설명에 들어온 경우는 후처리에서 제거하므로 여기서는 그대로 둠
+    rows.append({"part_type": part_type, "part_num": part_num, "description": description})
+
+
+def parse_answer(answer: str) -> Dict[str, Any]:
+    """
+    최종 답변을 한 번 훑어 {"before", "header", "rows", "after", "format"} 반환.
+
+    - before/after: 섹션 앞/뒤 텍스트 (눈에 보이는 '\\n' 줄 제거)
+    - header: "5. 브릭/부품 제안" 헤더 줄 (섹션이 없으면 "")
+    - rows: [{"part_type", "part_num", "description"}, ...]
+    - format: 표 형식 (표가 없으면 None)
+    """
+    before: List[str] = []
+    after: List[str] = []
+    rows: List[Dict[str, Any]] = []
+    header = ""
+    header_level = 0
+    fmt: Optional[str] = None
+    layout: Dict[str, int] = {}
+    header_cells: List[str] = []
+    last_cells: Optional[List[str]] = None  # 직전 데이터 행 (바로 뒤에 구분선이 오면 새 표의 헤더)
+    last_added = 0
+    state = 0  # 0: 섹션 전, 1: 섹션 안, 2: 섹션 뒤
+
+    for line in answer.splitlines():
+        if line.strip() == r"\n":
+            continue
+
+        if state == 2:
+            after.append(line)
+            continue
+
+        if state == 0:
+            if "제안" in line:
+                m = _SECTION_HEADER_RE.match(line)
+                if m:
+                    header = line
+                    header_level = len(m.group(1))
+                    state = 1
+                    continue
+            before.append(line)
+            continue
+
+        # --- 섹션 안 ---
+        if "|" not in line:
+            if _NUMBERED_LINE_RE.match(line) or _NUMBERED_HEADING_RE.match(line):
+                state = 2
+                after.append(line)
+                continue
+            m = _HEADING_RE.match(line)
+            if m and header_level and len(m.group(1)) <= header_level:
+                state = 2
+                after.append(line)
+            continue
+
+        if _SEPARATOR_RE.fullmatch(line):
+            if last_cells is not None and fmt is not None:
+                # 섹션 안에 표가 하나 더 시작됨 → 직전 행은 데이터가 아니라 헤더
+                del rows[len(rows) - last_added:]
+                header_cells = last_cells
+                fmt, layout = _table_layout(header_cells)
+            last_cells = None
+            continue
+
+        cells = _cells(line)
+        if fmt is None:
+            header_cells = cells
+            fmt, layout = _table_layout(cells)
+            last_cells = None
+            continue
+
+        last_cells = None
+        if cells == header_cells or len(cells) < _MIN_CELLS[fmt] or not any(cells):
+            continue
+        count = len(rows)
+        _append_rows(rows, cells, fmt, layout)
+        last_cells = cells
+        last_added = len(rows) - count
+
+    if not header:
+        logger.info("[answer_parser] '브릭/부품 제안' 섹션 헤더를 찾지 못했습니다.")
+    elif fmt is None:
+        logger.warning("[answer_parser] 브릭/부품 제안 섹션에서 테이블 헤더를 찾지 못했습니다.")
+    else:
+        logger.info("[answer_parser] 브릭/부품 표 파싱: format=%s, 열=%s, 행 수=%d", fmt, header_cells, len(rows))
+
+    return {
+        "before": "\n".join(before),
+        "header": header,
+        "rows": rows,
+        "after": "\n".join(after),
+        "format": fmt,
+    }
+
+
+def split_part_num(type_raw: str, num_raw: str) -> Tuple[str, str, str]:
+    """
+    part_type, part_num 두 칸을 같이 보고
+    - 첫 번째로 발견된 3~6자리(+알파벳) 토큰을 부품 번호로 사용 (부품 번호 칸 우선)
+    - 해당 번호는 원 문자열에서 제거하고 남은 텍스트는 색상/기타 정보로 반환
+    반환: (part_num, 번호를 뺀 part_type, 추가 정보)
+    """
+    num_raw = num_raw.strip()
+    type_raw = type_raw.strip()
+
+    # 대부분의 행: 부품 번호 칸이 번호 하나뿐
+    if PART_NUM_PATTERN.fullmatch(num_raw):
+        part_num, num_left = num_raw, ""
+    else:
+        found = PART_NUM_PATTERN.findall(num_raw)
+        part_num = found[0] if found else ""
+        num_left = PART_NUM_PATTERN.sub("", num_raw).strip(" ,") if found else num_raw
+
+    if any(ch.isdigit() for ch in type_raw):
+        found = PART_NUM_PATTERN.findall(type_raw)
+        if found:
+            part_num = part_num or found[0]
+            type_raw = PART_NUM_PATTERN.sub("", type_raw).strip(" ,")
+
+    if not part_num:
+        return "", type_raw, num_raw
+
+    type_raw = type_raw.strip(" ,")
+    num_left = num_left.strip(" ,")
+    # 남은 건 색상/수량 등의 추가 정보로 쓰기
+    extra = " ".join([s for s in [type_raw, num_left] if s]).strip()
+    return part_num, type_raw, extra
@@ -1,10 +1,33 @@
 import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 
 # 현재 작업 폴더(.env) 로드
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# 기본 LLM temperature (기존 동작 유지)
+DEFAULT_TEMPERATURE = 0.7
+
+# ------------------------------------------------------------
+# 프로세스 전역 클라이언트 레지스트리
+#  - 배포명/temperature/max_tokens 조합마다 클라이언트 1개만 생성해서 재사용
+#  - 모든 클라이언트가 keep-alive 커넥션 풀(httpx.Client) 하나를 공유
+#    → 그래프 실행마다 TLS 핸드셰이크를 반복하지 않음
+#  - Streamlit 세션(스레드) 여러 개가 동시에 접근해도 안전하도록 Lock 사용
+# ------------------------------------------------------------
+_registry_lock = threading.RLock()
+_llm_registry: Dict[Tuple[str, float, Optional[int]], AzureChatOpenAI] = {}
+_embeddings_registry: Dict[str, AzureOpenAIEmbeddings] = {}
+_http_client: Optional[httpx.Client] = None
+
 
 def _get_azure_base() -> tuple[str, str, str]:
     """기본 Azure OpenAI 설정(AOAI_ENDPOINT, AOAI_API_KEY, AOAI_API_VERSION) 가져오기"""
@@ -26,15 +49,55 @@ def _get_env(name: str) -> str | None:
     return value.strip() if value else None
 
 
-def get_llm(model_preference: str | None = None) -> AzureChatOpenAI:
+def get_int_env(name: str, default: int) -> int:
+    """정수 환경변수 가져오기 (잘못된 값이면 기본값)"""
+    value = _get_env(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("[config] %s 값이 정수가 아닙니다: %s (기본값 %d 사용)", name, value, default)
+        return default
+
+
+def get_float_env(name: str, default: float) -> float:
+    """실수 환경변수 가져오기 (잘못된 값이면 기본값)"""
+    value = _get_env(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("[config] %s 값이 숫자가 아닙니다: %s (기본값 %s 사용)", name, value, default)
+        return default
+
+
+def get_http_client() -> httpx.Client:
     """
-    Azure OpenAI LLM 생성
+    Azure OpenAI 호출에 공유할 keep-alive HTTP 커넥션 풀
 
-    - model_preference=None  -> AOAI_DEPLOY_GPT4O_MINI 사용 (기본: gpt-4.1-mini)
-    - model_preference="gpt4o" -> AOAI_DEPLOY_GPT4O 사용 (기본: gpt-4.1)
+    - AOAI_MAX_CONNECTIONS (기본 20): 최대 동시 커넥션 수
+    - AOAI_MAX_KEEPALIVE (기본 10): 유지할 idle 커넥션 수
+    - AOAI_KEEPALIVE_EXPIRY (기본 60초): idle 커넥션 유지 시간
     """
-    endpoint, api_key, api_version = _get_azure_base()
+    global _http_client
+    with _registry_lock:
+        if _http_client is None:
+            limits = httpx.Limits(
+                max_connections=get_int_env("AOAI_MAX_CONNECTIONS", 20),
+                max_keepalive_connections=get_int_env("AOAI_MAX_KEEPALIVE", 10),
+                keepalive_expiry=float(get_int_env("AOAI_KEEPALIVE_EXPIRY", 60)),
+            )
+            _http_client = httpx.Client(
+                limits=limits,
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            )
+        return _http_client
+
 
+def _resolve_chat_deployment(model_preference: str | None) -> str:
+    """model_preference 에 맞는 Chat 배포명 결정"""
     if model_preference == "gpt4o":
         # 고성능 모델 우선, 없으면 mini fallback
         deployment = _get_env("AOAI_DEPLOY_GPT4O") or _get_env("AOAI_DEPLOY_GPT4O_MINI")
@@ -47,25 +110,52 @@ def get_llm(model_preference: str | None = None) -> AzureChatOpenAI:
             "LLM 배포명이 설정되지 않았습니다.\n"
             "AOAI_DEPLOY_GPT4O_MINI 또는 AOAI_DEPLOY_GPT4O 를 확인하세요."
         )
+    return deployment
 
-    return AzureChatOpenAI(
-        azure_endpoint=endpoint,
-        azure_deployment=deployment,
-        openai_api_key=api_key,
-        api_version=api_version,
-        temperature=0.7,
-    )
 
-
-def get_embeddings(embed_preference: str | None = None) -> AzureOpenAIEmbeddings:
+def get_llm(
+    model_preference: str | None = None,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_tokens: int | None = None,
+) -> AzureChatOpenAI:
     """
-    Azure OpenAI 임베딩 모델 생성
+    Azure OpenAI LLM 가져오기 (프로세스 전역 레지스트리에서 재사용)
 
-    - embed_preference="large" -> AOAI_DEPLOY_EMBED_3_LARGE 강제
-    - 그 외 -> SMALL/ADA/3_LARGE 순으로 fallback
+    - model_preference=None  -> AOAI_DEPLOY_GPT4O_MINI 사용 (기본: gpt-4.1-mini)
+    - model_preference="gpt4o" -> AOAI_DEPLOY_GPT4O 사용 (기본: gpt-4.1)
+    - max_tokens: 응답 최대 토큰 수 (None 이면 제한 없음)
+    - 같은 배포명/temperature/max_tokens 조합이면 같은 클라이언트 인스턴스를 반환
     """
-    endpoint, api_key, api_version = _get_azure_base()
+    deployment = _resolve_chat_deployment(model_preference)
+    key = (deployment, float(temperature), max_tokens or None)
 
+    with _registry_lock:
+        llm = _llm_registry.get(key)
+        if llm is None:
+            endpoint, api_key, api_version = _get_azure_base()
+            llm = AzureChatOpenAI(
+                azure_endpoint=endpoint,
+                azure_deployment=deployment,
+                openai_api_key=api_key,
+                api_version=api_version,
+                temperature=temperature,
+                max_tokens=max_tokens or None,
+                http_client=get_http_client(),
+                # 스트리밍 응답에도 토큰 사용량(usage_metadata)을 포함
+                stream_usage=True,
+            )
+            _llm_registry[key] = llm
+            logger.info(
+                "[config] LLM 클라이언트 생성: deployment=%s, temperature=%s, max_tokens=%s",
+                deployment,
+                temperature,
+                max_tokens or "-",
+            )
+        return llm
+
+
+def _resolve_embed_deployment(embed_preference: str | None) -> str:
+    """embed_preference 에 맞는 임베딩 배포명 결정"""
     if embed_preference == "large" and _get_env("AOAI_DEPLOY_EMBED_3_LARGE"):
         deployment = _get_env("AOAI_DEPLOY_EMBED_3_LARGE")
     else:
@@ -80,10 +170,92 @@ def get_embeddings(embed_preference: str | None = None) -> AzureOpenAIEmbeddings
             "임베딩 배포명이 설정되지 않았습니다.\n"
             "AOAI_DEPLOY_EMBED_3_LARGE (또는 SMALL/ADA)을 확인하세요."
         )
+    return deployment
+
+
+def get_embeddings(embed_preference: str | None = None) -> AzureOpenAIEmbeddings:
+    """
+    Azure OpenAI 임베딩 모델 가져오기 (프로세스 전역 레지스트리에서 재사용)
+
+    - embed_preference="large" -> AOAI_DEPLOY_EMBED_3_LARGE 강제
+    - 그 외 -> SMALL/ADA/3_LARGE 순으로 fallback
+    """
+    deployment = _resolve_embed_deployment(embed_preference)
+
+    with _registry_lock:
+        embeddings = _embeddings_registry.get(deployment)
+        if embeddings is None:
+            endpoint, api_key, api_version = _get_azure_base()
+            embeddings = AzureOpenAIEmbeddings(
+                azure_endpoint=endpoint,
+                azure_deployment=deployment,
+                openai_api_key=api_key,
+                api_version=api_version,
+                http_client=get_http_client(),
+            )
+            _embeddings_registry[deployment] = embeddings
+            logger.info("[config] 임베딩 클라이언트 생성: deployment=%s", deployment)
+        return embeddings
+
+
+# ------------------------------------------------------------
+# 워밍업 / 헬스체크 훅
+# ------------------------------------------------------------
+def warmup_clients(
+    model_preferences: Iterable[str | None] = (None,),
+    include_embeddings: bool = True,
+    ping: bool = False,
+) -> Dict[str, Any]:
+    """
+    앱 시작 시 클라이언트를 미리 만들어 둔다.
+
+    - ping=True 이면 실제로 아주 짧은 요청을 보내 커넥션 풀에 TLS 연결까지 열어둔다.
+    - 반환값은 check_clients_health() 결과와 같다.
+    """
+    for pref in model_preferences:
+        get_llm(pref)
+    if include_embeddings:
+        get_embeddings()
+    return check_clients_health(ping=ping)
+
+
+def check_clients_health(ping: bool = False) -> Dict[str, Any]:
+    """
+    레지스트리에 등록된 클라이언트 상태 확인.
+
+    - ping=False: 등록 여부만 반환 (네트워크 호출 없음)
+    - ping=True : 클라이언트마다 최소 요청을 보내 지연시간/오류를 함께 반환
+    """
+    with _registry_lock:
+        llms = dict(_llm_registry)
+        embeddings = dict(_embeddings_registry)
+
+    result: Dict[str, Any] = {"ok": True, "llm": {}, "embeddings": {}}
+
+    for (deployment, temperature, max_tokens), llm in llms.items():
+        name = f"{deployment}@{temperature}" + (f"/max{max_tokens}" if max_tokens else "")
+        entry: Dict[str, Any] = {"registered": True}
+        if ping:
+            entry.update(_ping(lambda: llm.bind(max_tokens=1).invoke("ping")))
+            result["ok"] = result["ok"] and entry["ok"]
+        result["llm"][name] = entry
+
+    for deployment, emb in embeddings.items():
+        entry = {"registered": True}
+        if ping:
+            entry.update(_ping(lambda: emb.embed_query("ping")))
+            result["ok"] = result["ok"] and entry["ok"]
+        result["embeddings"][deployment] = entry
+
+    return result
+
 
-    return AzureOpenAIEmbeddings(
-        azure_endpoint=endpoint,
-        azure_deployment=deployment,
-        openai_api_key=api_key,
-        api_version=api_version,
-    )
+def _ping(call) -> Dict[str, Any]:
+    """헬스체크용 호출 1회 실행 후 지연시간/오류 정리"""
+    started = time.perf_counter()
+    try:
+        call()
+    except Exception as e:
+        logger.warning("[config] 클라이언트 헬스체크 실패: %s", e)
+        return {"ok": False, "error": str(e), "latency_ms": (time.perf_counter() - started) * 1000}
+    return {"ok": True, "latency_ms": (time.perf_counter() - started) * 1000}
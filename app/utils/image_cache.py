@@ -0,0 +1,398 @@
+import io
+import os
+import time
+import json
+import base64
+import hashlib
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+import requests
+
+from utils.config import get_float_env, get_int_env
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_IMAGE_DIR = os.path.join(BASE_DIR, "cache", "images")
+
+# 실패한 URL 은 이 시간 동안 다시 내려받지 않음 (디스크에는 저장하지 않음)
+FAILURE_TTL = 10 * 60
+
+
+class ImageCache:
+    """
+    부품 이미지 썸네일 캐시 (디스크 + 메모리 LRU).
+
+    - 원본 이미지를 한 번만 내려받아 작은 썸네일(기본 최대 80px)로 줄여 저장
+    - 파일 이름은 썸네일 내용의 sha256 (content-addressed) → 같은 이미지는 URL 이 달라도 한 파일
+    - URL → 파일 매핑과 마지막 사용 시각은 SQLite 인덱스에 기록하고,
+      전체 크기가 max_bytes 를 넘으면 오래 안 쓴 것부터 삭제
+    - 표에는 data URI 로 넣으므로 반복 렌더링 시 브라우저가 CDN 에 이미지를 요청하지 않음
+    - Pillow 가 없으면 원본 그대로 저장 (크기 축소만 생략)
+    - 여러 스레드에서 동시에 사용해도 안전 (같은 URL 동시 요청은 한 번만 내려받음)
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_IMAGE_DIR,
+        max_bytes: int = 50 * 1024 * 1024,
+        thumb_size: int = 80,
+        memory_size: int = 512,
+        timeout: float = 10.0,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.thumb_size = thumb_size
+        self.memory_size = memory_size
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._failures: Dict[str, float] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.downloads = 0
+        self.failures = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                mime TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "ImageCache":
+        """
+        환경변수 기반 생성
+
+        - LEGO_IMAGE_CACHE_DIR (기본 app/cache/images)
+        - LEGO_IMAGE_CACHE_MAX_MB (기본 50)
+        - LEGO_IMAGE_THUMB_SIZE (기본 80, 썸네일 긴 변 px)
+        """
+        return cls(
+            directory=(os.getenv("LEGO_IMAGE_CACHE_DIR") or "").strip() or DEFAULT_IMAGE_DIR,
+            max_bytes=int(get_float_env("LEGO_IMAGE_CACHE_MAX_MB", 50) * 1024 * 1024),
+            thumb_size=get_int_env("LEGO_IMAGE_THUMB_SIZE", 80),
+        )
+
+    # --------------------------------------------------------
+    # 조회
+    # --------------------------------------------------------
+    def data_uri(self, url: str) -> Optional[str]:
+        """
+        URL 이미지의 썸네일 data URI. 없으면 내려받아 저장.
+        내려받기/변환에 실패하면 None (호출 측에서 원본 URL 로 대체).
+        """
+        url = (url or "").strip()
+        if not url:
+            return None
+
+        with self._lock:
+            cached = self._memory.get(url)
+            if cached is not None:
+                self._memory.move_to_end(url)
+                self.hits += 1
+                return cached
+            failed_at = self._failures.get(url)
+            if failed_at is not None and time.time() - failed_at < FAILURE_TTL:
+                return None
+            event = self._inflight.get(url)
+            owner = event is None
+            if owner:
+                event = self._inflight[url] = threading.Event()
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                return self._memory.get(url)
+
+        try:
+            uri = self._load_from_disk(url)
+            if uri is None:
+                uri = self._download(url)
+            if uri is not None:
+                with self._lock:
+                    self._remember(url, uri)
+            return uri
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+            event.set()
+
+    def data_uris(self, urls: Iterable[str], max_workers: int = 4) -> Dict[str, Optional[str]]:
+        """여러 URL 을 (병렬로) 조회해 {url: data URI 또는 None} 반환"""
+        unique = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+        if not unique:
+            return {}
+        workers = min(max_workers, len(unique))
+        if workers <= 1:
+            return {url: self.data_uri(url) for url in unique}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-cache") as pool:
+            return dict(zip(unique, pool.map(self.data_uri, unique)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images").fetchone()
+            files = self._conn.execute("SELECT COUNT(DISTINCT digest) FROM images").fetchone()[0]
+            return {
+                "urls": count,
+                "files": files,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "memory_size": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "downloads": self.downloads,
+                "failures": self.failures,
+                "evictions": self.evictions,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for (digest,) in self._conn.execute("SELECT DISTINCT digest FROM images").fetchall():
+                self._remove_file(digest)
+            self._conn.execute("DELETE FROM images")
+            self._conn.commit()
+            self._memory.clear()
+            self._failures.clear()
+
+    # --------------------------------------------------------
+    # 내부 유틸
+    # --------------------------------------------------------
+    def _file_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _load_from_disk(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = None
+            try:
+                row = self._conn.execute("SELECT digest, mime FROM images WHERE url = ?", (url,)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE images SET last_used = ? WHERE url = ?", (time.time(), url))
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                # 인덱스 DB 잠김 / 읽기 전용 / 디스크 가득 참 → 조회된 행이 있으면 그대로 사용, 없으면 내려받기
+                logger.warning("[ImageCache] 이미지 인덱스 조회/갱신 실패: %s (%s)", url, e)
+                self._rollback()
+            if row is None:
+                self.misses += 1
+                return None
+        try:
+            with open(self._file_path(row[0]), "rb") as f:
+                data = f.read()
+        except OSError:
+            # 인덱스만 남고 파일이 지워진 경우 → 다시 내려받기
+            with self._lock:
+                try:
+                    self._conn.execute("DELETE FROM images WHERE url = ?", (url,))
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning("[ImageCache] 이미지 인덱스 정리 실패: %s (%s)", url, e)
+                    self._rollback()
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return _to_data_uri(row[1], data)
+
+    def _download(self, url: str) -> Optional[str]:
+        try:
+            resp = self.session.get(url, timeout=self.timeout)
+            resp.raise_for_status()
+            data, mime = _make_thumbnail(resp.content, self.thumb_size)
+        except Exception as e:
+            logger.info("[ImageCache] 이미지 캐시 실패 → 원본 URL 사용: %s (%s)", url, e)
+            with self._lock:
+                self.failures += 1
+                self._failures[url] = time.time()
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._file_path(digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                # 디스크 가득 참 / 읽기 전용 볼륨 등 → 저장 없이 메모리 결과만 반환
+                logger.warning("[ImageCache] 이미지 디스크 저장 실패 → 캐시 없이 사용: %s (%s)", url, e)
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                with self._lock:
+                    self.downloads += 1
+                return _to_data_uri(mime, data)
+
+        with self._lock:
+            self.downloads += 1
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO images (url, digest, mime, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (url, digest, mime, len(data), time.time()),
+                )
+                self._conn.commit()
+                self._evict()
+            except sqlite3.Error as e:
+                # 인덱스 DB 잠김 / 읽기 전용 / 디스크 가득 참 → 인덱스 없이 메모리 결과만 반환
+                logger.warning("[ImageCache] 이미지 인덱스 저장 실패 → 캐시 없이 사용: %s (%s)", url, e)
+                self._rollback()
+        return _to_data_uri(mime, data)
+
+    def _rollback(self) -> None:
+        """(lock 보유 상태) 실패한 트랜잭션 정리 (롤백도 실패하면 무시)"""
+        try:
+            self._conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self) -> None:
+        """(lock 보유 상태) 파일 전체 크기가 max_bytes 이하가 될 때까지 오래 안 쓴 이미지 삭제"""
+        rows = self._conn.execute(
+            "SELECT digest, MAX(size), MAX(last_used) AS used FROM images GROUP BY digest ORDER BY used"
+        ).fetchall()
+        total = sum(size for _, size, _ in rows)
+        for digest, size, _ in rows:
+            if total <= self.max_bytes:
+                break
+            urls = [u for (u,) in self._conn.execute("SELECT url FROM images WHERE digest = ?", (digest,))]
+            self._conn.execute("DELETE FROM images WHERE digest = ?", (digest,))
+            for url in urls:
+                self._memory.pop(url, None)
+            self._remove_file(digest)
+            total -= size
+            self.evictions += 1
+        self._conn.commit()
+
+    def _remove_file(self, digest: str) -> None:
+        try:
+            os.remove(self._file_path(digest))
+        except OSError:
+            pass
+
+    def _remember(self, url: str, uri: str) -> None:
+        self._memory[url] = uri
+        self._memory.move_to_end(url)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+def _make_thumbnail(data: bytes, size: int) -> Tuple[bytes, str]:
+    """원본 이미지 → (썸네일 바이트, MIME). Pillow 가 없으면 원본 그대로."""
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return data, _guess_mime(data)
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail((size, size))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        out = io.BytesIO()
+        if features.check("webp"):
+            img.save(out, format="WEBP", quality=80, method=4)
+            return out.getvalue(), "image/webp"
+        img.save(out, format="PNG", optimize=True)
+        return out.getvalue(), "image/png"
+
+
+def _guess_mime(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def _to_data_uri(mime: str, data: bytes) -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+# ------------------------------------------------------------
+# 프로세스 공유 인스턴스
+# ------------------------------------------------------------
+_image_cache: Optional[ImageCache] = None
+_image_cache_loaded = False
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> Optional[ImageCache]:
+    """
+    프로세스 공유 이미지 캐시 (비활성 시 None → 표에 원본 URL 사용)
+
+    - LEGO_IMAGE_CACHE: on(기본) | off
+    """
+    global _image_cache, _image_cache_loaded
+    with _image_cache_lock:
+        if not _image_cache_loaded:
+            enabled = (os.getenv("LEGO_IMAGE_CACHE") or "on").strip().lower() not in ("off", "0", "false", "none")
+            if enabled:
+                try:
+                    _image_cache = ImageCache.from_env()
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning("[ImageCache] 이미지 캐시를 열 수 없어 원본 URL 을 사용합니다: %s", e)
+                    _image_cache = None
+            _image_cache_loaded = True
+        return _image_cache
+
+
+def reset_image_cache(cache: Optional[ImageCache] = None) -> None:
+    """공유 인스턴스 교체 (None 이면 다음 호출 때 환경변수로 다시 생성)"""
+    global _image_cache, _image_cache_loaded
+    with _image_cache_lock:
+        _image_cache = cache
+        _image_cache_loaded = cache is not None
+
+
+# ------------------------------------------------------------
+# CLI
+#   cd app && python -m utils.image_cache stats | clear
+# ------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="부품 이미지 썸네일 캐시 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="캐시 통계 출력")
+    sub.add_parser("clear", help="모든 썸네일 삭제")
+    args = parser.parse_args(argv)
+
+    cache = ImageCache.from_env()
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), ensure_ascii=False, indent=2))
+    elif args.command == "clear":
+        cache.clear()
+        print("이미지 캐시를 비웠습니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+경량 트레이싱/메트릭 (프로세스 내 레지스트리, 외부 의존성 없음)
+
+    from utils import metrics
+
+    with metrics.span("agent.llm", role="DESIGN"):
+        ...
+    metrics.inc("lego_llm_tokens_total", 120, role="DESIGN", type="input")
+
+- span(name, **labels): 구간 소요 시간을 lego_span_seconds{span=name, ...} 히스토그램에 기록
+  (예외로 끝나면 lego_span_errors_total 도 증가)
+- inc(name, value, **labels) / observe(name, value, **labels): 카운터 / 히스토그램
+- render_prometheus(): Prometheus text format (API 의 GET /metrics)
+- 파일 exporter: LEGO_METRICS_FILE 을 지정하면 주기적으로 같은 내용을 파일에 기록
+  (Streamlit 처럼 scrape 엔드포인트가 없는 프로세스용, node_exporter textfile collector 로 수집)
+
+환경변수:
+- LEGO_METRICS: on | off(기본)
+- LEGO_METRICS_FILE: 파일 exporter 경로 (기본 없음)
+- LEGO_METRICS_FLUSH_INTERVAL (기본 15초): 파일 기록 주기
+
+비활성 상태에서는 span() 이 공유 no-op 객체를 돌려주고 inc()/observe() 는 바로 반환하므로
+계측 지점마다 함수 호출 1회 정도의 비용만 든다.
+"""
+import os
+import time
+import atexit
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SPAN_METRIC = "lego_span_seconds"
+SPAN_ERRORS_METRIC = "lego_span_errors_total"
+
+# 초 단위 기본 버킷 (Rebrickable 요청 ~ LLM 호출까지 포괄)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 알려진 메트릭 설명 (# HELP 줄)
+METRIC_HELP: Dict[str, str] = {
+    SPAN_METRIC: "Duration of traced spans in seconds",
+    SPAN_ERRORS_METRIC: "Spans that ended with an exception",
+    "lego_llm_calls_total": "LLM calls per agent role",
+    "lego_llm_tokens_total": "LLM tokens per agent role and type (input/output)",
+    "lego_llm_ttft_seconds": "Time to first LLM token per agent role",
+    "lego_prompt_tokens_total": "Prompt tokens (system + user) sent per agent role after budgeting",
+    "lego_prompt_tokens_saved_total": "Prompt tokens removed by the prompt budget (dedupe/compress/truncate) per role",
+    "lego_semantic_cache_total": "Semantic cache lookups per role and result (hit/miss)",
+    "lego_brick_table_first_paint_seconds": "Time from job start to the first (placeholder) brick table HTML",
+    "lego_rebrickable_requests_total": "Rebrickable HTTP responses by status",
+    "lego_rebrickable_throttle_wait_seconds": "Time spent waiting on the Rebrickable token bucket",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """카운터/히스토그램 저장소 (스레드 안전)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 으로 내보내기 좋은 형태 (헬스체크/벤치마크용)"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {"labels": dict(key), "count": h.count, "sum": round(h.total, 6)}
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(round(h.total, 6))}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class _Span:
+    """활성 상태의 span (with 블록 시간 측정)"""
+
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name: str, labels: Dict[str, Any]) -> None:
+        self.name = name
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        elapsed = time.perf_counter() - self.started
+        _registry.observe(SPAN_METRIC, elapsed, span=self.name, **self.labels)
+        if exc_type is not None:
+            _registry.inc(SPAN_ERRORS_METRIC, span=self.name, **self.labels)
+        logger.debug("[metrics] %s %s %.1fms", self.name, self.labels, elapsed * 1000)
+
+
+class _NoopSpan:
+    """비활성 상태에서 공유하는 no-op span"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+_registry = MetricsRegistry()
+_enabled = (os.getenv("LEGO_METRICS") or "off").strip().lower() in ("on", "1", "true", "yes")
+_exporter: Optional["FileExporter"] = None
+_exporter_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    """런타임에 계측 켜기/끄기 (벤치마크 등)"""
+    global _enabled
+    _enabled = enabled
+    if enabled:
+        _start_file_exporter()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def span(name: str, **labels: Any) -> Any:
+    """구간 시간 측정 컨텍스트 매니저 (비활성 시 no-op)"""
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, labels)
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    if _enabled:
+        _registry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    if _enabled:
+        _registry.observe(name, value, **labels)
+
+
+def render_prometheus() -> str:
+    return _registry.render_prometheus()
+
+
+# ------------------------------------------------------------
+# 파일 exporter
+# ------------------------------------------------------------
+class FileExporter:
+    """레지스트리 내용을 주기적으로 파일에 기록 (임시 파일에 쓴 뒤 교체 → 읽는 쪽이 반쯤 쓴 파일을 보지 않음)"""
+
+    def __init__(self, path: str, interval: float) -> None:
+        self.path = path
+        self.interval = max(interval, 1.0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics-exporter", daemon=True)
+
+    def start(self) -> "FileExporter":
+        self._thread.start()
+        atexit.register(self.flush)
+        logger.info("[metrics] 파일 exporter 시작: %s (%.0f초마다)", self.path, self.interval)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
+
+    def flush(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(_registry.render_prometheus())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("[metrics] 메트릭 파일 기록 실패: %s (%s)", self.path, e)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+def _start_file_exporter() -> None:
+    global _exporter
+    path = (os.getenv("LEGO_METRICS_FILE") or "").strip()
+    if not path:
+        return
+    with _exporter_lock:
+        if _exporter is None:
+            try:
+                interval = float(os.getenv("LEGO_METRICS_FLUSH_INTERVAL") or 15)
+            except ValueError:
+                interval = 15.0
+            _exporter = FileExporter(path, interval).start()
+
+
+if _enabled:
+    _start_file_exporter()
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Iterable, List
+
+from utils.config import get_float_env, get_int_env
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, "cache", "rebrickable_parts.sqlite3")
+
+# 자주 쓰이는 기본 부품 (브릭/플레이트/타일/슬로프/테크닉 등)
+COMMON_PART_NUMS: List[str] = [
+    # 브릭
+    "3001", "3002", "3003", "3004", "3005", "3008", "3009", "3010", "3622", "2456",
+    # 플레이트
+    "3020", "3021", "3022", "3023", "3024", "3031", "3032", "3034", "3035", "3036",
+    "3460", "3666", "3710", "3795", "3958", "3030", "3832", "2445", "4477", "3623",
+    # 타일
+    "3068b", "3069b", "3070b", "2431", "6636", "3065", "87079", "4162",
+    # 슬로프/지붕
+    "3039", "3040", "3037", "3038", "3045", "3298", "3665", "3660", "54200", "85984",
+    # 베이스플레이트
+    "3811", "3867", "626",
+    # 라운드/디테일
+    "4073", "3062b", "6141", "98138", "4032", "3941", "6143", "2412b",
+    # 창문/문/기타
+    "60592", "60593", "60594", "60596", "60601", "60616", "4274", "4085", "2420", "3176",
+    # 테크닉 빔/브릭/핀/축
+    "32523", "32524", "32525", "32316", "32449", "41239", "32278", "32526", "32140",
+    "3700", "3701", "3702", "3703", "3894", "3895", "2780", "6558", "43093", "4519",
+    "3705", "32073", "3706", "3707", "3737", "32062", "3713", "4265c", "32054", "32123",
+    # 기어
+    "3647", "3648", "3649", "32269", "32270", "94925", "6589", "4716", "3650c", "32072",
+    # 미니피겨/브래킷
+    "973", "3815", "3626c", "99781", "99780", "44728",
+]
+
+
+class PartCache:
+    """
+    Rebrickable 파트 조회 결과 영구 캐시 (SQLite + LRU 메모리 앞단).
+
+    - 조회 성공(positive)과 없는 부품(negative)을 서로 다른 TTL 로 저장
+    - 메모리 LRU 는 크기가 제한되어 있고, 디스크(SQLite)는 컨테이너 재시작 후에도 유지
+    - 여러 스레드에서 동시에 사용해도 안전
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        positive_ttl: float = 30 * 24 * 3600,
+        negative_ttl: float = 24 * 3600,
+        memory_size: int = 1024,
+    ) -> None:
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS part_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            # 디스크를 못 쓰는 환경이면 메모리 캐시만 사용
+            logger.warning("[PartCache] SQLite 캐시를 열 수 없습니다: %s (%s)", path, e)
+            self._conn = None
+
+    @classmethod
+    def from_env(cls) -> "PartCache":
+        """
+        환경변수 기반 생성
+
+        - REBRICKABLE_CACHE_PATH (기본 app/cache/rebrickable_parts.sqlite3)
+        - REBRICKABLE_CACHE_TTL (기본 30일, 초)
+        - REBRICKABLE_NEGATIVE_TTL (기본 1일, 초)
+        - REBRICKABLE_CACHE_MEMORY (기본 1024개)
+        """
+        return cls(
+            path=(os.getenv("REBRICKABLE_CACHE_PATH") or "").strip() or DEFAULT_CACHE_PATH,
+            positive_ttl=get_float_env("REBRICKABLE_CACHE_TTL", 30 * 24 * 3600),
+            negative_ttl=get_float_env("REBRICKABLE_NEGATIVE_TTL", 24 * 3600),
+            memory_size=get_int_env("REBRICKABLE_CACHE_MEMORY", 1024),
+        )
+
+    # --------------------------------------------------------
+    # 조회 / 저장
+    # --------------------------------------------------------
+    def lookup(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        (found, value) 반환.
+
+        - found=False: 캐시에 없음 → 네트워크 조회 필요
+        - found=True, value=None: 없는 부품으로 캐시됨 (negative)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._count_hit(entry[1])
+                return True, entry[1]
+
+            row = None
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM part_cache WHERE key = ?", (key,)
+                ).fetchone()
+
+            if row is None or row[1] <= now:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return False, None
+
+            value = json.loads(row[0]) if row[0] is not None else None
+            self._remember(key, row[1], value)
+            self._count_hit(value)
+            return True, value
+
+    def store(self, key: str, value: Optional[Dict[str, Any]]) -> None:
+        """value=None 이면 negative 결과로 저장"""
+        self.store_many([(key, value)])
+
+    def store_many(self, items: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> None:
+        now = time.time()
+        rows = []
+        with self._lock:
+            for key, value in items:
+                ttl = self.positive_ttl if value is not None else self.negative_ttl
+                expires_at = now + ttl
+                self._remember(key, expires_at, value)
+                rows.append(
+                    (key, json.dumps(value, ensure_ascii=False) if value is not None else None, expires_at)
+                )
+            if self._conn is not None and rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO part_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """만료된 디스크 항목 삭제. 삭제 건수 반환."""
+        with self._lock:
+            if self._conn is None:
+                return 0
+            cur = self._conn.execute("DELETE FROM part_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk_size = 0
+            if self._conn is not None:
+                disk_size = self._conn.execute("SELECT COUNT(*) FROM part_cache").fetchone()[0]
+            return {
+                "memory_size": len(self._memory),
+                "disk_size": disk_size,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+            }
+
+    # --------------------------------------------------------
+    # 내부 유틸 (lock 보유 상태에서 호출)
+    # --------------------------------------------------------
+    def _remember(self, key: str, expires_at: float, value: Optional[Dict[str, Any]]) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _count_hit(self, value: Optional[Dict[str, Any]]) -> None:
+        if value is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+
+
+# ------------------------------------------------------------
+# 캐시 미리 채우기 (CLI)
+#   cd app && python -m utils.part_cache prewarm [--file part_nums.txt]
+# ------------------------------------------------------------
+def _read_part_nums(path: Optional[str]) -> List[str]:
+    if not path:
+        return list(COMMON_PART_NUMS)
+    with open(path, "r", encoding="utf-8") as f:
+        nums = [ln.split(",")[0].strip() for ln in f if ln.strip() and not ln.startswith("#")]
+    # CSV 헤더(part_num) 제외
+    return [n for n in nums if n and n != "part_num"]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from dotenv import load_dotenv
+
+    from utils.rebrickable_client import RebrickableClient
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Rebrickable 파트 캐시 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    prewarm = sub.add_parser("prewarm", help="자주 쓰는 부품을 미리 캐시에 적재")
+    prewarm.add_argument("--file", help="부품 번호 목록 파일 (한 줄에 하나, 또는 parts.csv)")
+    sub.add_parser("stats", help="캐시 통계 출력")
+    sub.add_parser("purge", help="만료된 항목 삭제")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "prewarm":
+        client = RebrickableClient()
+        part_nums = _read_part_nums(args.file)
+        loaded = client.prewarm_cache(part_nums)
+        print(f"prewarm 완료: 요청 {len(part_nums)}건, 적재 {loaded}건")
+    elif args.command == "stats":
+        print(json.dumps(PartCache.from_env().stats(), ensure_ascii=False, indent=2))
+    elif args.command == "purge":
+        print(f"삭제된 항목: {PartCache.from_env().purge_expired()}건")
+
+
+if __name__ == "__main__":
+    main()
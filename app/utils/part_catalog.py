@@ -0,0 +1,399 @@
+import os
+import re
+import csv
+import gzip
+import json
+import math
+import bisect
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Set, Tuple, Iterator
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CATALOG_PATH = os.path.join(BASE_DIR, "cache", "parts_catalog.sqlite3")
+
+# 한국어 힌트 → Rebrickable 영문 부품명 용어 (긴 단어부터 매칭)
+KOREAN_TERMS: Dict[str, str] = {
+    "베이스플레이트": "baseplate",
+    "미니피겨": "minifig",
+    "플레이트": "plate",
+    "브래킷": "bracket",
+    "테크닉": "technic",
+    "슬로프": "slope",
+    "타이어": "tire",
+    "라운드": "round",
+    "실린더": "cylinder",
+    "브릭": "brick",
+    "블록": "brick",
+    "타일": "tile",
+    "경사": "slope",
+    "기어": "gear",
+    "액슬": "axle",
+    "힌지": "hinge",
+    "아치": "arch",
+    "창문": "window",
+    "바퀴": "wheel",
+    "원형": "round",
+    "둥근": "round",
+    "지붕": "roof",
+    "울타리": "fence",
+    "빔": "beam",
+    "핀": "pin",
+    "축": "axle",
+    "문": "door",
+    "콘": "cone",
+}
+
+# 한국어 색상 단어 (검색어에서 제거)
+KOREAN_COLORS = (
+    "흰색", "하얀", "검정", "검은", "빨간", "빨강", "파란", "파랑", "노란", "노랑",
+    "초록", "녹색", "회색", "갈색", "주황", "분홍", "보라", "투명", "연회색", "진회색",
+)
+
+DIM_PATTERN = re.compile(r"(\d+(?:/\d+)?)\s*[xX×]\s*(\d+(?:/\d+)?)(?:\s*[xX×]\s*(\d+(?:/\d+)?))?")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _singular(token: str) -> str:
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def _dims_tokens(text: str) -> Tuple[str, List[str]]:
+    """'2 x 4', '2x4x3' 같은 치수를 '2x4' 토큰으로 바꾸고, 치수를 뺀 나머지 텍스트도 반환"""
+    dims = ["x".join(g for g in m.groups() if g) for m in DIM_PATTERN.finditer(text)]
+    return DIM_PATTERN.sub(" ", text), dims
+
+
+def tokenize_name(text: str) -> List[str]:
+    """영문 부품명/카테고리명 토큰화 (소문자 + 치수 토큰 + 단수형)"""
+    rest, dims = _dims_tokens((text or "").lower())
+    return dims + [_singular(t) for t in WORD_PATTERN.findall(rest)]
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"#{token}#"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _open_csv(path: str) -> Iterator[Dict[str, str]]:
+    """Rebrickable 덤프(csv 또는 csv.gz) 읽기"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+# ------------------------------------------------------------
+# 적재 (오프라인)
+# ------------------------------------------------------------
+def ingest_catalog(
+    parts_csv: str,
+    categories_csv: Optional[str] = None,
+    colors_csv: Optional[str] = None,
+    db_path: str = DEFAULT_CATALOG_PATH,
+) -> Dict[str, int]:
+    """
+    Rebrickable 다운로드 덤프(parts.csv / part_categories.csv / colors.csv)를
+    로컬 SQLite 카탈로그로 적재한다. 기존 내용은 교체된다.
+    """
+    if db_path != ":memory:":
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(
+            """
+            DROP TABLE IF EXISTS parts;
+            DROP TABLE IF EXISTS part_categories;
+            DROP TABLE IF EXISTS colors;
+            CREATE TABLE parts (
+                part_num TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                part_cat_id INTEGER,
+                part_material TEXT,
+                part_img_url TEXT
+            );
+            CREATE TABLE part_categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+            CREATE TABLE colors (id INTEGER PRIMARY KEY, name TEXT NOT NULL, rgb TEXT, is_trans TEXT);
+            """
+        )
+
+        counts = {"parts": 0, "part_categories": 0, "colors": 0}
+
+        rows = (
+            (
+                r["part_num"].strip(),
+                r.get("name", "").strip(),
+                int(r["part_cat_id"]) if (r.get("part_cat_id") or "").strip().isdigit() else None,
+                (r.get("part_material") or "").strip(),
+                # 공식 parts.csv 에는 이미지 열이 없어 보통 빈 값 (이미지는 part_cache prewarm 으로 캐시에 적재)
+                (r.get("part_img_url") or "").strip(),
+            )
+            for r in _open_csv(parts_csv)
+            if (r.get("part_num") or "").strip()
+        )
+        conn.executemany("INSERT OR REPLACE INTO parts VALUES (?, ?, ?, ?, ?)", rows)
+        counts["parts"] = conn.execute("SELECT COUNT(*) FROM parts").fetchone()[0]
+
+        if categories_csv:
+            conn.executemany(
+                "INSERT OR REPLACE INTO part_categories VALUES (?, ?)",
+                ((int(r["id"]), r["name"].strip()) for r in _open_csv(categories_csv)),
+            )
+            counts["part_categories"] = conn.execute("SELECT COUNT(*) FROM part_categories").fetchone()[0]
+
+        if colors_csv:
+            conn.executemany(
+                "INSERT OR REPLACE INTO colors VALUES (?, ?, ?, ?)",
+                (
+                    (int(r["id"]), r["name"].strip(), r.get("rgb", ""), r.get("is_trans", ""))
+                    for r in _open_csv(colors_csv)
+                ),
+            )
+            counts["colors"] = conn.execute("SELECT COUNT(*) FROM colors").fetchone()[0]
+
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_parts_name ON parts (name COLLATE NOCASE)")
+        conn.commit()
+    finally:
+        conn.close()
+
+    logger.info("[PartCatalog] 카탈로그 적재 완료: %s (%s)", db_path, counts)
+    return counts
+
+
+# ------------------------------------------------------------
+# 조회 (메모리 인덱스)
+# ------------------------------------------------------------
+class PartCatalog:
+    """
+    로컬 부품 카탈로그 조회기.
+
+    SQLite 카탈로그를 한 번 읽어 메모리에 아래 인덱스를 만든다.
+    - exact: 부품 번호 → 레코드
+    - prefix: 정렬된 부품 번호 목록 (bisect) – "3069" → "3069b"
+    - token: 이름/카테고리 토큰 → 부품 번호 집합 (IDF 가중 점수)
+    - n-gram: 토큰의 문자 3-gram → 토큰 (오타/변형 단어 보정)
+    """
+
+    MIN_COVERAGE = 0.6
+
+    def __init__(self, db_path: str = DEFAULT_CATALOG_PATH) -> None:
+        self.db_path = db_path
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._exact: Dict[str, str] = {}
+        self._sorted_nums: List[str] = []
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._name_len: Dict[str, int] = {}
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        self._color_tokens: Set[str] = set()
+        self._load()
+
+    def _load(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            categories = dict(conn.execute("SELECT id, name FROM part_categories").fetchall())
+            for (name,) in conn.execute("SELECT name FROM colors"):
+                self._color_tokens.update(tokenize_name(name))
+
+            for part_num, name, cat_id, material, img_url in conn.execute(
+                "SELECT part_num, name, part_cat_id, part_material, part_img_url FROM parts"
+            ):
+                self._records[part_num] = {
+                    "part_num": part_num,
+                    "name": name,
+                    "part_cat_id": cat_id,
+                    "part_material": material,
+                    "part_img_url": img_url or None,
+                    "source": "catalog",
+                }
+                self._exact[part_num.lower()] = part_num
+
+                name_tokens = tokenize_name(name)
+                self._name_len[part_num] = len(name_tokens)
+                tokens = set(name_tokens) | set(tokenize_name(categories.get(cat_id, "")))
+                for token in tokens:
+                    self._postings[token].add(part_num)
+        finally:
+            conn.close()
+
+        # 색상 단어가 부품명 핵심어와 겹치면(예: 'light') 제거 대상에서 뺌
+        self._color_tokens -= {"brick", "plate", "tile", "light"}
+        self._sorted_nums = sorted(self._exact)
+        for token in self._postings:
+            for gram in _trigrams(token):
+                self._trigram_index[gram].add(token)
+
+        logger.info(
+            "[PartCatalog] 카탈로그 로드: %d parts, %d tokens (%s)",
+            len(self._records),
+            len(self._postings),
+            self.db_path,
+        )
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    # --------------------------------------------------------
+    # 공개 메서드
+    # --------------------------------------------------------
+    def get(self, part_num: str) -> Optional[Dict[str, Any]]:
+        """정확한 부품 번호 조회 (대소문자 무시)"""
+        key = self._exact.get((part_num or "").strip().lower())
+        return self._records.get(key) if key else None
+
+    def get_by_prefix(self, prefix: str) -> Optional[Dict[str, Any]]:
+        """
+        번호 접두어로 조회 – "3069" → "3069b" 처럼 알파벳 접미사만 다른 경우.
+        가장 짧은(기본형) 번호를 고른다.
+        """
+        prefix = (prefix or "").strip().lower()
+        if not prefix:
+            return None
+        idx = bisect.bisect_left(self._sorted_nums, prefix)
+        best: Optional[str] = None
+        while idx < len(self._sorted_nums) and self._sorted_nums[idx].startswith(prefix):
+            candidate = self._sorted_nums[idx]
+            suffix = candidate[len(prefix) :]
+            if suffix.isalpha() and (best is None or len(candidate) < len(best)):
+                best = candidate
+            idx += 1
+        return self._records[self._exact[best]] if best else None
+
+    def search(self, query: str) -> Optional[Dict[str, Any]]:
+        """자유 텍스트(한/영)로 가장 잘 맞는 부품 1개 검색"""
+        part_num = self._search_cached(" ".join((query or "").split()))
+        return self._records.get(part_num) if part_num else None
+
+    # --------------------------------------------------------
+    # 내부 검색 로직
+    # --------------------------------------------------------
+    def query_tokens(self, query: str) -> List[str]:
+        text = (query or "").lower()
+        for color in KOREAN_COLORS:
+            text = text.replace(color, " ")
+        for ko, en in sorted(KOREAN_TERMS.items(), key=lambda kv: -len(kv[0])):
+            if ko in text:
+                text = text.replace(ko, f" {en} ")
+
+        tokens: List[str] = []
+        for token in tokenize_name(text):
+            if token in self._color_tokens:
+                continue
+            if token not in self._postings and not token[0].isdigit():
+                token = self._closest_token(token) or token
+            if token in self._postings and token not in tokens:
+                tokens.append(token)
+        return tokens
+
+    def _closest_token(self, token: str) -> Optional[str]:
+        """3-gram 자카드 유사도로 사전에 있는 가장 가까운 토큰 찾기"""
+        grams = _trigrams(token)
+        scores: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigram_index.get(gram, ()):
+                scores[candidate] += 1
+        best, best_score = None, 0.0
+        for candidate, shared in scores.items():
+            jaccard = shared / (len(grams) + len(_trigrams(candidate)) - shared)
+            if jaccard > best_score:
+                best, best_score = candidate, jaccard
+        return best if best_score >= 0.5 else None
+
+    @lru_cache(maxsize=4096)
+    def _search_cached(self, query: str) -> Optional[str]:
+        tokens = self.query_tokens(query)
+        if not tokens:
+            return None
+
+        n = len(self._records)
+        idf = {t: math.log(1 + n / len(self._postings[t])) for t in tokens}
+        total = sum(idf.values())
+
+        # 치수 토큰이 있으면 반드시 일치해야 함
+        dims = [t for t in tokens if t[0].isdigit() and "x" in t]
+        if dims:
+            candidates = set.intersection(*(self._postings[t] for t in dims))
+        else:
+            # 가장 희귀한 토큰 2개의 후보만 점수 계산
+            rare = sorted(tokens, key=lambda t: len(self._postings[t]))[:2]
+            candidates = set().union(*(self._postings[t] for t in rare))
+
+        best: Optional[str] = None
+        best_key: Tuple[float, int, int] = (0.0, 0, 0)
+        for part_num in candidates:
+            matched = sum(idf[t] for t in tokens if part_num in self._postings[t])
+            coverage = matched / total
+            # 커버리지 높은 순 → 이름이 짧은(기본형) 순 → 번호가 짧은 순
+            key = (coverage, -self._name_len[part_num], -len(part_num))
+            if best is None or key > best_key:
+                best, best_key = part_num, key
+
+        if best is None or best_key[0] < self.MIN_COVERAGE:
+            return None
+        return best
+
+
+_catalog: Optional[PartCatalog] = None
+_catalog_loaded = False
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[PartCatalog]:
+    """
+    프로세스 공유 카탈로그. 적재된 카탈로그 파일이 없으면 None.
+
+    - REBRICKABLE_CATALOG_PATH (기본 app/cache/parts_catalog.sqlite3)
+    """
+    global _catalog, _catalog_loaded
+    with _catalog_lock:
+        if not _catalog_loaded:
+            path = (os.getenv("REBRICKABLE_CATALOG_PATH") or "").strip() or DEFAULT_CATALOG_PATH
+            if os.path.exists(path):
+                try:
+                    _catalog = PartCatalog(path)
+                except sqlite3.Error as e:
+                    logger.warning("[PartCatalog] 카탈로그를 열 수 없습니다: %s (%s)", path, e)
+            _catalog_loaded = True
+        return _catalog
+
+
+# ------------------------------------------------------------
+# CLI
+#   cd app && python -m utils.part_catalog ingest --parts parts.csv.gz \
+#       --categories part_categories.csv.gz --colors colors.csv.gz
+#   cd app && python -m utils.part_catalog search "흰색 2x4 브릭"
+# ------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Rebrickable 부품 카탈로그 (오프라인)")
+    parser.add_argument("--db", default=None, help="카탈로그 SQLite 경로")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Rebrickable CSV 덤프 적재")
+    ingest.add_argument("--parts", required=True, help="parts.csv(.gz)")
+    ingest.add_argument("--categories", help="part_categories.csv(.gz)")
+    ingest.add_argument("--colors", help="colors.csv(.gz)")
+
+    search = sub.add_parser("search", help="카탈로그 검색")
+    search.add_argument("query")
+
+    args = parser.parse_args(argv)
+    db_path = args.db or (os.getenv("REBRICKABLE_CATALOG_PATH") or "").strip() or DEFAULT_CATALOG_PATH
+
+    if args.command == "ingest":
+        counts = ingest_catalog(args.parts, args.categories, args.colors, db_path=db_path)
+        print(json.dumps(counts, ensure_ascii=False))
+    elif args.command == "search":
+        catalog = PartCatalog(db_path)
+        query = args.query
+        result = catalog.get(query) or catalog.get_by_prefix(query) or catalog.search(query)
+        print(json.dumps({"tokens": catalog.query_tokens(query), "result": result}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
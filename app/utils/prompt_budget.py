@@ -0,0 +1,169 @@
+"""
+에이전트 프롬프트 토큰 예산 (섹션 우선순위 기반 압축)
+
+    sections = [
+        PromptSection("설계 초안", draft, priority=0, min_tokens=400),
+        PromptSection("참고 지식", context, priority=2, empty="추가 참고 지식이 없습니다."),
+    ]
+    text, report = fit_prompt(intro, sections, budget=3000, fixed_tokens=count_tokens(system_prompt))
+
+- 예산은 system + user 메시지 본문 토큰 수 (utils.tokens.count_tokens, 오프라인 토크나이저) 기준
+- 예산 안이면 그대로 렌더링하고, 넘치면 아래 순서로 예산에 들어올 때까지 줄인다.
+    1) dedupe   : 더 중요한 섹션에 이미 나온 줄(공백 무시, MIN_DEDUPE_CHARS 이상)을 뒤 섹션에서 제거
+    2) compress : 줄 끝 공백, 연속 빈 줄, 마크다운 강조(**), 줄 안의 연속 공백 정리
+    3) truncate : priority 값이 큰(덜 중요한) 섹션부터 줄임 (min_tokens 까지, keep=True 는 자르지 않음)
+                  마크다운 제목(#)이 여러 개인 섹션은 제목은 모두 남기고 각 블록 본문을 같은 비율로 잘라
+                  뒤쪽 항목(예: 설계 초안의 '브릭/부품 제안')이 통째로 빠지지 않게 한다.
+- report: {"budget", "tokens_before", "tokens_after", "saved", "steps", "sections"} – 실행별 절감량 기록용
+"""
+import re
+import logging
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from utils.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# 이보다 짧은 줄("## 개요", "---", "- 소형" 등)은 중복이어도 구조 유지를 위해 남김
+MIN_DEDUPE_CHARS = 20
+TRUNCATED_SUFFIX = "\n…(이하 생략)"
+BLOCK_SUFFIX = " …"
+OMITTED_TEXT = "(토큰 예산 초과로 생략)"
+
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_INNER_SPACES_RE = re.compile(r"(?<=\S)[ \t]{2,}")
+_HEADING_LINE_RE = re.compile(r"^[ \t]*#+[ \t]", re.MULTILINE)
+
+
+class PromptSection(NamedTuple):
+    """user 메시지의 '## 제목' 섹션 1개"""
+
+    title: str
+    text: str
+    priority: int = 0  # 작을수록 중요 (예산이 모자라면 큰 값부터 줄임)
+    empty: str = ""  # 내용이 없을 때 대신 넣을 문구
+    min_tokens: int = 0  # 잘라도 이만큼은 남김
+    keep: bool = False  # True 면 자르지 않음 (사용자 입력 등)
+
+
+def render_prompt(intro: str, sections: List[PromptSection]) -> str:
+    """intro + '## 제목\\n내용' 섹션들을 빈 줄로 이어 붙임"""
+    parts = [f"## {s.title}\n{s.text if s.text.strip() else s.empty}" for s in sections]
+    return intro + "\n\n".join(parts)
+
+
+def _dedupe(sections: List[PromptSection]) -> List[PromptSection]:
+    seen = set()
+    result: List[PromptSection] = list(sections)
+    for idx in sorted(range(len(sections)), key=lambda i: sections[i].priority):
+        kept: List[str] = []
+        for line in sections[idx].text.splitlines():
+            key = " ".join(line.split())
+            if len(key) >= MIN_DEDUPE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        result[idx] = sections[idx]._replace(text="\n".join(kept))
+    return result
+
+
+def _compress_text(text: str) -> str:
+    lines = [_INNER_SPACES_RE.sub(" ", line.rstrip()).replace("**", "") for line in text.splitlines()]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _compress(sections: List[PromptSection]) -> List[PromptSection]:
+    return [s._replace(text=_compress_text(s.text)) for s in sections]
+
+
+def _truncate_text(text: str, target: int) -> str:
+    """text 를 target 토큰 안으로 줄임 (제목 블록이 여러 개면 블록별로 같은 비율로)"""
+    starts = [m.start() for m in _HEADING_LINE_RE.finditer(text)]
+    if len(starts) < 2:
+        return truncate_to_tokens(text, target, suffix=TRUNCATED_SUFFIX)
+
+    if starts[0] > 0:
+        starts.insert(0, 0)
+    blocks = [text[a:b].rstrip("\n") for a, b in zip(starts, starts[1:] + [len(text)])]
+    ratio = target / max(count_tokens(text), 1)
+    parts: List[str] = []
+    for block in blocks:
+        title, _, body = block.partition("\n")
+        if body.endswith(BLOCK_SUFFIX):
+            body = body[: -len(BLOCK_SUFFIX)]
+        body_tokens = count_tokens(body)
+        if body_tokens:
+            body = truncate_to_tokens(body, int(body_tokens * ratio), suffix=BLOCK_SUFFIX)
+        parts.append(f"{title}\n{body}" if body else title)
+    result = "\n\n".join(parts)
+    # 제목만으로도 넘치면 뒤에서 자름
+    if count_tokens(result) > target:
+        result = truncate_to_tokens(result, target, suffix=TRUNCATED_SUFFIX)
+    return result
+
+
+def fit_prompt(
+    intro: str,
+    sections: List[PromptSection],
+    budget: int,
+    fixed_tokens: int = 0,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    섹션들을 예산 안으로 줄여 렌더링한 user 메시지와 report 반환.
+
+    - budget: system + user 전체 토큰 예산 (0 이하면 제한 없음)
+    - fixed_tokens: user 메시지 밖에서 이미 쓰는 토큰 (system prompt)
+    """
+
+    def total(current: List[PromptSection]) -> int:
+        return fixed_tokens + count_tokens(render_prompt(intro, current))
+
+    tokens_before = total(sections)
+    steps: List[str] = []
+    current = sections
+
+    if budget > 0 and tokens_before > budget:
+        for name, step in (("dedupe", _dedupe), ("compress", _compress)):
+            current = step(current)
+            steps.append(name)
+            if total(current) <= budget:
+                break
+
+        if total(current) > budget:
+            steps.append("truncate")
+            current = list(current)
+            for idx in sorted(range(len(current)), key=lambda i: -current[i].priority):
+                section = current[idx]
+                if section.keep:
+                    continue
+                # 섹션 경계에서 토큰이 합쳐지는 차이가 있어 몇 번 다시 맞춤
+                for _ in range(3):
+                    over = total(current) - budget
+                    tokens = count_tokens(current[idx].text)
+                    if over <= 0 or tokens <= section.min_tokens:
+                        break
+                    target = max(tokens - over, section.min_tokens)
+                    text = _truncate_text(current[idx].text, target)
+                    current[idx] = section._replace(text=text, empty=OMITTED_TEXT)
+                if total(current) <= budget:
+                    break
+
+    text = render_prompt(intro, current)
+    tokens_after = fixed_tokens + count_tokens(text)
+    if budget > 0 and tokens_after > budget:
+        logger.warning(
+            "[prompt_budget] 최소 보존 분량만으로도 예산 초과: %d > %d (min_tokens/keep 섹션 확인)",
+            tokens_after,
+            budget,
+        )
+
+    report = {
+        "budget": budget,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "saved": tokens_before - tokens_after,
+        "steps": steps,
+        "sections": {s.title: count_tokens(s.text) for s in current},
+    }
+    return text, report
@@ -1,13 +1,51 @@
 import os
 import logging
 import time
-from typing import Optional, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Callable
 
 import requests
 
+from utils import metrics
+from utils.config import get_float_env, get_int_env
+from utils.part_cache import PartCache
+from utils.part_catalog import get_catalog
+
 logger = logging.getLogger(__name__)
 
 
+class TokenBucket:
+    """
+    스레드 안전한 토큰 버킷 rate limiter.
+
+    - rate: 초당 충전되는 토큰 수 (평균 호출 속도)
+    - capacity: 버킷 최대 크기 (순간적으로 허용되는 burst 크기)
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """토큰 1개를 얻을 때까지 대기. 실제로 기다린 시간(초)을 반환."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
 class RebrickableClient:
     """
     Rebrickable API 간단 클라이언트.
@@ -18,12 +56,19 @@ class RebrickableClient:
 
     BASE_URL = "https://rebrickable.com/api/v3/lego"
 
-    # 너무 과한 호출 방지를 위한 최소 간격(초) – 1초 권장
+    # 평균 호출 간격(초) – Rebrickable 권장 1초
     MIN_INTERVAL = 1.0
+    # 순간 허용 burst 크기 (Rebrickable 은 평균 1회/초 이내라면 짧은 burst 허용)
+    BURST = 3
+
+    # 영구 파트 캐시 (SQLite + LRU, 프로세스 전체 공유) – get_cache() 로 접근
+    _part_cache: Optional[PartCache] = None
+    _cache_lock = threading.Lock()
+    _inflight: Dict[str, threading.Event] = {}
 
-    # 아주 단순한 메모리 캐시 (프로세스 살아있는 동안만 유지)
-    _part_cache: Dict[str, Dict[str, Any]] = {}
-    _last_call_ts: float = 0.0
+    # 모든 인스턴스/스레드가 공유하는 rate limiter
+    _limiter: Optional[TokenBucket] = None
+    _limiter_lock = threading.Lock()
 
     def __init__(self) -> None:
         self.api_key = os.getenv("REBRICKABLE_API_KEY", "").strip()
@@ -32,7 +77,38 @@ class RebrickableClient:
                 "[RebrickableClient] REBRICKABLE_API_KEY 환경 변수가 설정되지 않았습니다."
             )
 
+        api_base = os.getenv("REBRICKABLE_API_BASE", "").strip().rstrip("/")
+        self.base_url = f"{api_base}/lego" if api_base else self.BASE_URL
+
+        self.max_workers = max(1, get_int_env("REBRICKABLE_MAX_WORKERS", 4))
         self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def get_limiter(cls) -> TokenBucket:
+        """
+        프로세스 공유 토큰 버킷.
+
+        - REBRICKABLE_RATE_PER_SEC (기본 1 / MIN_INTERVAL)
+        - REBRICKABLE_BURST (기본 BURST)
+        """
+        with cls._limiter_lock:
+            if cls._limiter is None:
+                cls._limiter = TokenBucket(
+                    rate=get_float_env("REBRICKABLE_RATE_PER_SEC", 1.0 / cls.MIN_INTERVAL),
+                    capacity=get_float_env("REBRICKABLE_BURST", cls.BURST),
+                )
+            return cls._limiter
+
+    @classmethod
+    def get_cache(cls) -> PartCache:
+        """프로세스 공유 파트 캐시 (환경변수 REBRICKABLE_CACHE_* 로 설정)."""
+        with cls._cache_lock:
+            if cls._part_cache is None:
+                cls._part_cache = PartCache.from_env()
+            return cls._part_cache
 
     # --------------------------------------------------------
     # 내부 유틸
@@ -43,31 +119,92 @@ class RebrickableClient:
         }
 
     def _throttle(self) -> None:
-        """연속 호출 시 1초 간격을 맞추기 위한 간단한 rate limit."""
-        now = time.time()
-        elapsed = now - self._last_call_ts
-        if elapsed < self.MIN_INTERVAL:
-            time.sleep(self.MIN_INTERVAL - elapsed)
-        self._last_call_ts = time.time()
+        """공유 토큰 버킷으로 호출 속도 제한 (평균 1회/초, 짧은 burst 허용)."""
+        waited = self.get_limiter().acquire()
+        metrics.observe("lego_rebrickable_throttle_wait_seconds", waited, reason="rate_limit")
+
+    def _cached(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Tuple[Optional[Dict[str, Any]], bool]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        캐시 조회 후 없으면 fetch 실행.
+
+        - fetch 는 (data, definitive) 를 반환. definitive=True 인데 data 가 없으면
+          "없는 부품"으로 negative 캐시에 저장 (네트워크 오류 등은 저장하지 않음)
+        - 같은 키를 여러 스레드가 동시에 요청하면 한 번만 호출하고 나머지는 결과를 기다린다.
+        """
+        cache = self.get_cache()
+
+        with self._cache_lock:
+            found, value = cache.lookup(cache_key)
+            if found:
+                return value
+            event = self._inflight.get(cache_key)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._inflight[cache_key] = event
+
+        if not owner:
+            event.wait()
+            found, value = cache.lookup(cache_key)
+            # 선행 요청이 실패한 경우 → 결과 없음으로 처리
+            return value if found else None
+
+        try:
+            data, definitive = fetch()
+            if data or definitive:
+                cache.store(cache_key, data or None)
+            return data or None
+        finally:
+            with self._cache_lock:
+                self._inflight.pop(cache_key, None)
+            event.set()
 
     def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """공통 GET 호출 래퍼."""
+        return self._request(url, params)[0]
+
+    def _request(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        GET 호출 후 (JSON, definitive) 반환.
+        definitive 는 서버가 확정 응답(200/404)을 준 경우에만 True.
+        """
         if not self.api_key:
             logger.warning("[RebrickableClient] API Key 미설정 상태에서 _get 호출: %s", url)
-            return None
-
-        self._throttle()
-
-        try:
-            resp = self.session.get(
-                url,
-                headers=self._headers(),
-                params=params or {},
-                timeout=10,
-            )
-        except Exception as e:
-            logger.exception("[RebrickableClient] 요청 예외: %s (%s)", url, e)
-            return None
+            return None, False
+
+        for attempt in range(2):
+            self._throttle()
+
+            try:
+                with metrics.span("rebrickable.request"):
+                    resp = self.session.get(
+                        url,
+                        headers=self._headers(),
+                        params=params or {},
+                        timeout=10,
+                    )
+            except Exception as e:
+                metrics.inc("lego_rebrickable_requests_total", status="error")
+                logger.exception("[RebrickableClient] 요청 예외: %s (%s)", url, e)
+                return None, False
+            metrics.inc("lego_rebrickable_requests_total", status=str(resp.status_code))
+
+            # 429 (Too Many Requests) 는 Retry-After 만큼 쉬고 한 번만 재시도
+            if resp.status_code == 429 and attempt == 0:
+                retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+                logger.info("[RebrickableClient] 429 응답 → %.1f초 후 재시도: %s", retry_after, url)
+                time.sleep(retry_after)
+                metrics.observe("lego_rebrickable_throttle_wait_seconds", retry_after, reason="retry_after")
+                continue
+            break
 
         if resp.status_code != 200:
             logger.info(
@@ -76,13 +213,13 @@ class RebrickableClient:
                 resp.status_code,
                 resp.text[:200],
             )
-            return None
+            return None, resp.status_code == 404
 
         try:
-            return resp.json()
+            return resp.json(), True
         except Exception as e:
             logger.exception("[RebrickableClient] JSON 파싱 실패: %s (%s)", url, e)
-            return None
+            return None, False
 
     # --------------------------------------------------------
     # 공개 메서드
@@ -99,15 +236,8 @@ class RebrickableClient:
         if not part_num or part_num in ("-", "0"):
             return None
 
-        # 캐시 먼저 확인
-        if part_num in self._part_cache:
-            return self._part_cache[part_num]
-
-        url = f"{self.BASE_URL}/parts/{part_num}/"
-        data = self._get(url)
-        if data:
-            self._part_cache[part_num] = data
-        return data
+        url = f"{self.base_url}/parts/{part_num}/"
+        return self._cached(part_num, lambda: self._request(url))
 
     def search_part_by_text(self, query: str) -> Optional[Dict[str, Any]]:
         """
@@ -118,26 +248,20 @@ class RebrickableClient:
         if not query or query in ("-",):
             return None
 
-        cache_key = f"search::{query}"
-        if cache_key in self._part_cache:
-            return self._part_cache[cache_key]
-
-        url = f"{self.BASE_URL}/parts/"
+        url = f"{self.base_url}/parts/"
         params = {
             "search": query,
             "page_size": 1,  # 가장 잘 맞는 1개만
         }
-        data = self._get(url, params=params)
-        if not data:
-            return None
 
-        results = data.get("results") or []
-        if not results:
-            return None
+        def fetch() -> Tuple[Optional[Dict[str, Any]], bool]:
+            data, definitive = self._request(url, params=params)
+            if not data:
+                return None, definitive
+            results = data.get("results") or []
+            return (results[0] if results else None), True
 
-        part = results[0]
-        self._part_cache[cache_key] = part
-        return part
+        return self._cached(f"search::{query}", fetch)
 
     def resolve_part(
         self,
@@ -147,15 +271,24 @@ class RebrickableClient:
         """
         파트 번호와 힌트 텍스트를 함께 사용해 파트를 찾는다.
 
+        0순위: 로컬 부품 카탈로그(utils/part_catalog.py)가 적재되어 있으면 번호 정확 일치만 조회 (네트워크 없음)
         1순위: part_num 으로 정확 조회 (/parts/{part_num}/)
+               → 404 로 확정 실패하면 카탈로그 접두어 일치("3069" → "3069b") 시도
+                 (오래된 카탈로그에 없을 뿐인 올바른 번호가 다른 변형 부품으로 바뀌지 않도록 HTTP 뒤에 둠)
         2순위: part_num 을 검색어로 사용해 검색 (/parts/?search=part_num)
               → BrickLink 번호 등 외부 ID인 경우 Rebrickable이 매핑해줄 수 있음
-        3순위: hint_text (부품 이름/용도/사이즈 등) 으로 검색
+        3순위: hint_text (부품 이름/용도/사이즈 등) 으로 로컬 카탈로그 검색 → 없으면 HTTP 검색
         모두 실패하면 None 반환.
         """
         part_num = (part_num or "").strip()
         hint_text = (hint_text or "").strip()
 
+        # 0) 로컬 카탈로그 번호 일치 (적재된 경우에만)
+        if part_num and part_num not in ("-", "0"):
+            data = self._resolve_from_catalog(part_num=part_num)
+            if data:
+                return data
+
         # 1) 번호 우선 (정확 조회)
         if part_num and part_num not in ("-", "0"):
             data = self.get_part_by_num(part_num)
@@ -166,6 +299,12 @@ class RebrickableClient:
                     data.get("name"),
                 )
                 return data
+            # 없는 번호로 확정(404 → negative 캐시)된 경우에만 접미사 변형 허용
+            found, _ = self.get_cache().lookup(part_num)
+            if found:
+                data = self._resolve_from_catalog(part_num=part_num, prefix=True)
+                if data:
+                    return data
 
         # 2) 번호가 Rebrickable 기본 ID가 아니더라도,
         #    search=part_num 로 한번 더 시도 (BrickLink 번호 등 매핑용)
@@ -179,9 +318,9 @@ class RebrickableClient:
                 )
                 return data
 
-        # 3) 번호가 없거나 실패 → 힌트 텍스트 검색
+        # 3) 번호가 없거나 실패 → 힌트 텍스트 검색 (로컬 카탈로그 → HTTP)
         if hint_text:
-            data = self.search_part_by_text(hint_text)
+            data = self._resolve_from_catalog(hint_text=hint_text) or self.search_part_by_text(hint_text)
             if data:
                 logger.debug(
                     "[RebrickableClient] 텍스트 검색으로 파트 식별 성공: '%s' -> %s",
@@ -196,3 +335,141 @@ class RebrickableClient:
             hint_text,
         )
         return None
+
+    def _resolve_from_catalog(
+        self,
+        part_num: str = "",
+        hint_text: str = "",
+        prefix: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        로컬 카탈로그로 부품 식별 (part_num: 번호 정확 일치, prefix=True 면 접두어 일치, hint_text: 텍스트 검색).
+        네트워크 호출은 하지 않는다. 캐시에 상세 정보가 있으면 그것을 쓰고, 없으면 카탈로그 레코드를 그대로 반환
+        (Rebrickable parts.csv 에는 이미지 열이 없으므로 이미지는 prewarm_cache 로 캐시에 채워 둔 경우에만 표시).
+        카탈로그가 없거나 찾지 못하면 None (→ HTTP 조회로 넘어감).
+        """
+        catalog = get_catalog()
+        if catalog is None:
+            return None
+
+        if part_num:
+            record = catalog.get_by_prefix(part_num) if prefix else catalog.get(part_num)
+        else:
+            record = catalog.search(hint_text)
+        if record is None:
+            return None
+
+        logger.debug(
+            "[RebrickableClient] 카탈로그로 파트 식별 성공: part_num='%s', hint_text='%s' -> %s",
+            part_num,
+            hint_text,
+            record["part_num"],
+        )
+        found, cached = self.get_cache().lookup(record["part_num"])
+        if found and cached:
+            return cached
+        return dict(record)
+
+    def is_known_missing(self, part_num: Optional[str], hint_text: Optional[str]) -> bool:
+        """
+        resolve_part 가 None 을 반환한 조합이 확정 실패인지 (resolve_part 가 거치는 HTTP 조회가 모두 negative 캐시).
+        False 면 네트워크 오류/타임아웃/429 등 일시적 실패가 섞여 있어 다시 조회할 가치가 있음.
+        """
+        part_num = (part_num or "").strip()
+        hint_text = (hint_text or "").strip()
+        keys: List[str] = []
+        if part_num and part_num not in ("-", "0"):
+            keys += [part_num, f"search::{part_num}"]
+        if hint_text:
+            keys.append(f"search::{hint_text}")
+        cache = self.get_cache()
+        return all(cache.lookup(key)[0] for key in keys)
+
+    def prewarm_cache(self, part_nums: List[str], chunk_size: int = 100) -> int:
+        """
+        부품 번호 목록을 일괄 조회(/parts/?part_nums=...)해서 캐시에 미리 적재.
+        목록에 있었지만 응답에 없는 번호는 negative 로 저장한다. 적재한 positive 건수 반환.
+        """
+        nums = list(dict.fromkeys(n.strip() for n in part_nums if n and n.strip()))
+        cache = self.get_cache()
+        loaded = 0
+
+        for i in range(0, len(nums), chunk_size):
+            chunk = nums[i : i + chunk_size]
+            params: Optional[Dict[str, Any]] = {
+                "part_nums": ",".join(chunk),
+                "page_size": chunk_size,
+            }
+            url: Optional[str] = f"{self.base_url}/parts/"
+            found: Dict[str, Dict[str, Any]] = {}
+            complete = True
+
+            # 페이지네이션(next) 따라가며 수집
+            while url:
+                data, _ = self._request(url, params=params)
+                if not data:
+                    complete = False
+                    break
+                for part in data.get("results") or []:
+                    found[part.get("part_num", "")] = part
+                url, params = data.get("next"), None
+
+            entries: List[Tuple[str, Optional[Dict[str, Any]]]] = list(found.items())
+            if complete:
+                entries += [(n, None) for n in chunk if n not in found]
+            cache.store_many(entries)
+            loaded += len(found)
+            logger.info("[RebrickableClient] prewarm %d/%d (적재 %d건)", min(i + chunk_size, len(nums)), len(nums), loaded)
+
+        return loaded
+
+    def resolve_parts(
+        self,
+        items: List[Tuple[Optional[str], Optional[str]]],
+        max_workers: Optional[int] = None,
+        on_resolved: Optional[Callable[[Tuple[str, str], Optional[Dict[str, Any]]], None]] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        (part_num, hint_text) 목록을 한 번에 조회한다. 결과는 입력 순서와 같다.
+
+        - 동일한 (번호, 힌트) 조합은 네트워크 호출 전에 하나로 합침
+        - 제한된 크기의 스레드 풀에서 병렬 조회
+          (실제 호출 속도는 공유 토큰 버킷이 제한하므로 Rebrickable 제한을 넘지 않음)
+        - on_resolved((번호, 힌트), 결과) 를 주면 조합 하나가 끝날 때마다 (조회 스레드에서) 호출
+          → 점진 렌더링용
+        """
+        keys = [((num or "").strip(), (hint or "").strip()) for num, hint in items]
+        unique_keys = list(dict.fromkeys(keys))
+        if not unique_keys:
+            return []
+
+        def resolve(key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+            data = self.resolve_part(*key)
+            if on_resolved is not None:
+                on_resolved(key, data)
+            return data
+
+        workers = min(max_workers or self.max_workers, len(unique_keys))
+        if workers <= 1:
+            resolved = {key: resolve(key) for key in unique_keys}
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rebrickable") as pool:
+                results = pool.map(resolve, unique_keys)
+                resolved = dict(zip(unique_keys, results))
+
+        logger.info(
+            "[RebrickableClient] 일괄 조회 완료: 요청 %d건, 고유 %d건, workers=%d",
+            len(keys),
+            len(unique_keys),
+            workers,
+        )
+        return [resolved[key] for key in keys]
+
+
+def _parse_retry_after(value: Optional[str]) -> float:
+    """Retry-After 헤더(초) 파싱. 없거나 이상하면 1초, 최대 5초."""
+    try:
+        seconds = float(value) if value else 1.0
+    except ValueError:
+        seconds = 1.0
+    return min(max(seconds, 0.0), 5.0)
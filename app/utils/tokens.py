@@ -0,0 +1,79 @@
+"""
+프롬프트 토큰 수 계산 유틸
+
+- tiktoken 이 있으면 실제 토크나이저(o200k_base, gpt-4o 계열)로 계산
+- 없거나 인코딩 파일을 받을 수 없으면 글자 수 기반 근사치 사용
+  (영문/숫자 약 4글자당 1토큰, 한글 등 비 ASCII 약 1.5글자당 1토큰 – 실제보다 약간 많게 잡음)
+"""
+import math
+import logging
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "o200k_base"
+
+_encoder: Any = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder() -> Any:
+    global _encoder, _encoder_loaded
+    with _encoder_lock:
+        if not _encoder_loaded:
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception as e:
+                logger.info("[tokens] tiktoken 을 사용할 수 없어 근사치로 계산합니다: %s", e)
+                _encoder = None
+            _encoder_loaded = True
+        return _encoder
+
+
+def _estimate_tokens(text: str) -> int:
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 4 + other_chars / 1.5)
+
+
+def count_tokens(text: str) -> int:
+    """텍스트 토큰 수"""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return _estimate_tokens(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = " …") -> str:
+    """max_tokens 안에 들어가도록 뒤를 자른다 (잘렸으면 suffix 추가)"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    encoder = _get_encoder()
+    budget = max(max_tokens - count_tokens(suffix), 0)
+    if encoder is not None:
+        # 한글 한 글자가 여러 토큰으로 나뉘는 경우 잘린 바이트가 � 로 남으므로 제거
+        return encoder.decode(encoder.encode(text, disallowed_special=())[:budget]).rstrip("\ufffd") + suffix
+
+    # 근사치 모드: 이진 탐색으로 들어가는 최대 길이 찾기
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _estimate_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + suffix
+
+
+def get_encoding_name() -> Optional[str]:
+    """사용 중인 인코딩 이름 (근사치 모드면 None)"""
+    return DEFAULT_ENCODING if _get_encoder() is not None else None
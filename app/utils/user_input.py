@@ -0,0 +1,38 @@
+from typing import Any, Dict, Tuple
+
+GOAL_HEADER = "[창작 목표]"
+INFO_HEADER = "[전반 정보]"
+
+
+def build_user_input(goal: str, sidebar_state: Dict[str, Any]) -> str:
+    """창작 목표 + 사이드바 설정을 에이전트 입력 텍스트 하나로 합친다."""
+    lines = [
+        GOAL_HEADER,
+        goal.strip() or "미입력",
+        "",
+        INFO_HEADER,
+        f"- 규모: {sidebar_state.get('scale', '')}",
+        f"- 용도: {sidebar_state.get('usage', '')}",
+        f"- 난이도 선호: {sidebar_state.get('difficulty', '')}",
+        "",
+        "[보유 색상/테마]",
+        sidebar_state.get("colors", "").strip() or "미입력",
+        "",
+        "[보유 브릭/부품 정보]",
+        sidebar_state.get("parts", "").strip() or "미입력",
+        "",
+        "[제약 조건 / 추가 요청]",
+        sidebar_state.get("constraints", "").strip() or "미입력",
+    ]
+    return "\n".join(lines)
+
+
+def split_user_input(user_input: str) -> Tuple[str, str]:
+    """
+    build_user_input 결과 → (창작 목표, 나머지 구조화 필드 텍스트)
+    형식이 다르면 (전체, 전체) – 목표만 따로 볼 수 없으므로 전체가 같아야 같은 요청으로 본다.
+    """
+    head, sep, rest = user_input.partition(f"\n\n{INFO_HEADER}\n")
+    if not sep or not head.startswith(f"{GOAL_HEADER}\n"):
+        return user_input, user_input
+    return head[len(GOAL_HEADER) + 1 :].strip(), f"{INFO_HEADER}\n{rest}"
@@ -1,19 +1,83 @@
+import time
+import hashlib
+import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
 
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
-from utils.config import get_llm
+from langchain_core.runnables import RunnableConfig
+from utils import metrics
+from utils.config import get_int_env
+from utils.prompt_budget import PromptSection, fit_prompt
+from utils.tokens import count_tokens
+from utils.user_input import split_user_input
 from workflow.state import LegoState, AgentRole
-from retrieval.vector_store import search_lego_info, format_retrieved_context
+from workflow.model_routing import ModelRouter, get_model_router, model_name
+from retrieval.vector_store import (
+    search_lego_info,
+    asearch_lego_info,
+    format_retrieved_context,
+    get_cached_embeddings,
+    get_static_knowledge,
+)
+from workflow.semantic_cache import get_semantic_cache, get_similarity_threshold
+
+logger = logging.getLogger(__name__)
+
+# 지식 문서 전체를 system 메시지에 넣었을 때 user 메시지의 참고 지식 섹션 문구
+STATIC_KNOWLEDGE_NOTE = "system 메시지의 '레고 참고 지식' 전체를 참고하세요."
+
+
+def get_prompt_budget(role: str, default: int) -> int:
+    """역할별 프롬프트 토큰 예산 (LEGO_PROMPT_BUDGET_<ROLE>, 0 이면 제한 없음)"""
+    return get_int_env(f"LEGO_PROMPT_BUDGET_{role}", default)
+
+
+def get_prompt_layout() -> Dict[str, int]:
+    """
+    메시지 배치 설정 (BaseLegoAgent._static_knowledge 참고)
+    - static_knowledge_max_tokens: LEGO_STATIC_KNOWLEDGE_MAX_TOKENS (기본 1500, 0 이면 지식 문서 전체를 넣지 않음)
+    - cache_min_tokens: LEGO_PROMPT_CACHE_MIN_TOKENS (기본 1024, Azure OpenAI 프롬프트 캐시 최소 길이)
+    """
+    return {
+        "static_knowledge_max_tokens": get_int_env("LEGO_STATIC_KNOWLEDGE_MAX_TOKENS", 1500),
+        "cache_min_tokens": get_int_env("LEGO_PROMPT_CACHE_MIN_TOKENS", 1024),
+    }
 
 
 class BaseLegoAgent(ABC):
     """공통 로직을 담는 레고 에이전트 베이스 클래스"""
 
-    def __init__(self, role: str, k: int = 4):
+    # 유사 요청 캐시 임계값 (cosine). None 이면 캐시를 쓰지 않고 항상 LLM 호출
+    SEMANTIC_CACHE_THRESHOLD: Optional[float] = None
+    # RAG 컨텍스트 최대 토큰 수 (LEGO_CONTEXT_BUDGET_<ROLE> 로 덮어쓰기)
+    CONTEXT_TOKEN_BUDGET: int = 600
+    # system + user 메시지 전체 토큰 예산 (LEGO_PROMPT_BUDGET_<ROLE> 로 덮어쓰기, 0 이면 제한 없음)
+    PROMPT_TOKEN_BUDGET: int = 0
+    # user 메시지 첫머리 지시문 (뒤에 build_prompt_sections 의 섹션들이 붙음)
+    PROMPT_INTRO: str = ""
+
+    def __init__(
+        self,
+        role: str,
+        k: int = 4,
+        llm: Optional[BaseChatModel] = None,
+        router: Optional[ModelRouter] = None,
+    ):
         self.role = role
         self.k = k
-        self.llm = get_llm()
+        # llm 을 주면 항상 그 모델 사용 (테스트/벤치마크), 아니면 실행마다 역할/입력에 맞춰 라우팅
+        self.llm = llm
+        self.router = router if router is not None else get_model_router()
+
+    def select_llm(self, state: LegoState) -> Tuple[BaseChatModel, str]:
+        """이번 실행에 쓸 LLM 과 tier (fixed: 주입된 모델)"""
+        if self.llm is not None:
+            return self.llm, "fixed"
+        llm, route = self.router.select(self.role, state.get("user_input", ""))
+        return llm, route.tier
 
     # --- 추상 메서드 (각 에이전트에서 구현) ---
 
@@ -22,47 +86,195 @@ class BaseLegoAgent(ABC):
         ...
 
     @abstractmethod
-    def build_user_message(self, state: LegoState, context: str) -> str:
+    def build_prompt_sections(self, state: LegoState, context: str) -> List[PromptSection]:
+        """user 메시지 섹션 목록 (priority 가 큰 섹션부터 예산에 맞춰 줄어듦)"""
         ...
 
     # --- 공통 메인 진입점 ---
 
-    def run(self, state: LegoState) -> LegoState:
-        """RAG 검색 → 메시지 구성 → LLM 호출 → 상태 업데이트"""
-        messages = state.get("messages", [])
+    def run(self, state: LegoState, config: Optional[RunnableConfig] = None) -> LegoState:
+        """유사 요청 캐시 확인 → RAG 검색 → 메시지 구성 → LLM 호출(스트리밍) → 상태 업데이트
 
-        # 1) RAG 검색
-        query = self._build_search_query(state)
-        docs = search_lego_info(query=query, k=self.k) if query else []
-        context = format_retrieved_context(docs)
+        config 는 LangGraph 가 넘겨주는 실행 설정. LLM 호출에 그대로 전달해야
+        graph.stream(stream_mode="messages") 로 토큰이 바깥까지 전달된다.
+        """
+        with metrics.span("agent.run", role=self.role):
+            # 1) 유사 요청 캐시 (적중하면 검색/프롬프트 구성/LLM 호출 모두 생략)
+            with metrics.span("agent.semantic_cache", role=self.role):
+                cache_vector = self._semantic_vector(state)
+                cache_key, answer = self._semantic_check(state, cache_vector)
+            if answer is not None:
+                return self._cached_state(state, answer)
 
-        # docs/contexts 저장
-        docs_dict = state.get("docs", {})
-        docs_dict[self.role] = [d.page_content for d in docs] if docs else []
+            # 2) RAG 검색 (그래프 진입 시 미리 가져온 결과가 있으면 재사용)
+            with metrics.span("agent.retrieval", role=self.role):
+                docs = self._prefetched_docs(state)
+                if docs is None:
+                    query = self.search_query(state)
+                    docs = search_lego_info(query=query, k=self.k) if query else []
 
-        ctx_dict = state.get("contexts", {})
-        ctx_dict[self.role] = context
+            # 3) LLM 메시지 구성 → 호출 (토큰 스트리밍 – 청크를 이어 붙여 최종 응답 구성)
+            llm_messages, context, timing = self._prepare_llm_call(state, docs)
+            llm, tier = self.select_llm(state)
+            resp = None
+            started = time.perf_counter()
+            with metrics.span("agent.llm", role=self.role, tier=tier):
+                for chunk in llm.stream(llm_messages, config=config):
+                    resp = self._add_chunk(resp, chunk, started, tier, timing)
+            answer = self._finish_llm_call(llm, tier, resp, started, timing, cache_vector, cache_key)
+
+            # 4) 상태 업데이트
+            return self._update_state(state, answer, docs, context, timing)
+
+    async def arun(
+        self,
+        state: LegoState,
+        config: Optional[RunnableConfig] = None,
+        prefetch: Optional[Callable[[], Awaitable[List[Document]]]] = None,
+    ) -> LegoState:
+        """run 의 비동기 버전 (비동기 임베딩/RAG 검색 + LLM astream, 나머지 단계는 run 과 같은 헬퍼 사용)
+
+        prefetch: 그래프의 동시 검색 시작 함수 (이 역할의 검색 Task 반환).
+                  유사 요청 캐시에 적중하지 않은 경우에만 호출하므로 적중 시에는 검색이 전혀 일어나지 않음
+        """
+        with metrics.span("agent.run", role=self.role):
+            with metrics.span("agent.semantic_cache", role=self.role):
+                cache_vector = await self._asemantic_vector(state)
+                cache_key, answer = self._semantic_check(state, cache_vector)
+            if answer is not None:
+                return self._cached_state(state, answer)
+
+            with metrics.span("agent.retrieval", role=self.role):
+                docs = self._prefetched_docs(state)
+                if docs is None and prefetch is not None:
+                    docs = (await prefetch())[: self.k]
+                if docs is None:
+                    query = self.search_query(state)
+                    docs = await asearch_lego_info(query=query, k=self.k) if query else []
+
+            llm_messages, context, timing = self._prepare_llm_call(state, docs)
+            llm, tier = self.select_llm(state)
+            resp = None
+            started = time.perf_counter()
+            with metrics.span("agent.llm", role=self.role, tier=tier):
+                async for chunk in llm.astream(llm_messages, config=config):
+                    resp = self._add_chunk(resp, chunk, started, tier, timing)
+            answer = self._finish_llm_call(llm, tier, resp, started, timing, cache_vector, cache_key)
+
+            return self._update_state(state, answer, docs, context, timing)
+
+    # --- run / arun 공통 단계 ---
+
+    def _cached_state(self, state: LegoState, answer: str) -> LegoState:
+        """유사 요청 캐시 적중 시 상태 업데이트 (검색하지 않았으므로 docs/context 는 비움)"""
+        return self._update_state(state, answer, [], "", {"cached": True})
+
+    def _prepare_llm_call(
+        self, state: LegoState, docs: List[Document]
+    ) -> Tuple[List[BaseMessage], str, Dict[str, Any]]:
+        """LLM 입력 메시지 구성 + timing 초기값 → (메시지, RAG 컨텍스트, timing)"""
+        with metrics.span("agent.prompt", role=self.role):
+            llm_messages, context, prompt = self._build_llm_messages(state, docs)
+        timing: Dict[str, Any] = {
+            "cached": False,
+            "prompt_tokens": prompt["tokens_after"],
+            "prompt_tokens_saved": prompt["saved"],
+        }
+        return llm_messages, context, timing
+
+    def _add_chunk(self, resp: Any, chunk: Any, started: float, tier: str, timing: Dict[str, Any]) -> Any:
+        """스트리밍 청크 누적 (첫 청크에서 TTFT 기록)"""
+        if resp is None:
+            timing["ttft_sec"] = time.perf_counter() - started
+            metrics.observe("lego_llm_ttft_seconds", timing["ttft_sec"], role=self.role, tier=tier)
+            return chunk
+        return resp + chunk
+
+    def _finish_llm_call(
+        self,
+        llm: BaseChatModel,
+        tier: str,
+        resp: Any,
+        started: float,
+        timing: Dict[str, Any],
+        cache_vector: Optional[List[float]],
+        cache_key: str,
+    ) -> str:
+        """LLM 호출 마무리: timing/사용량 집계 + 유사 요청 캐시 저장 → 응답 텍스트"""
+        timing.update(model=model_name(llm), tier=tier, llm_sec=time.perf_counter() - started)
+        answer = self._message_text(resp)
+        self._record_usage(resp, timing)
+        self._semantic_store(cache_vector, cache_key, answer)
+        return answer
+
+    def _build_llm_messages(
+        self, state: LegoState, docs: List[Document]
+    ) -> Tuple[List[BaseMessage], str, Dict[str, Any]]:
+        """검색 문서로 컨텍스트를 만들고 프롬프트 예산 안에서 LLM 입력 메시지 구성
+
+        메시지는 바뀌지 않는 부분이 앞에 오도록 배치 (Azure OpenAI 프롬프트 prefix 캐시):
+          system = 역할 프롬프트(형식 규칙 포함) [+ 지식 문서 전체]  ← 요청마다 바이트 단위로 동일
+          user   = 고정 지시문(PROMPT_INTRO) + 요청별 섹션(사용자 입력, 앞 단계 결과, RAG 검색 결과)
+        지식 문서 전체를 넣은 역할은 RAG 검색을 하지 않는다. (search_query 참고)
 
-        # 2) LLM 메시지 구성
-        sys_prompt = self.get_system_prompt()
-        user_content = self.build_user_message(state, context)
+        반환: (메시지, RAG 컨텍스트, 예산 report – utils.prompt_budget.fit_prompt 참고)
+        """
+        static_knowledge = self._static_knowledge()
+        if static_knowledge:
+            context = ""
+            sys_prompt = f"{self.get_system_prompt()}\n\n## 레고 참고 지식\n{static_knowledge}"
+            sections = self.build_prompt_sections(state, STATIC_KNOWLEDGE_NOTE)
+        else:
+            context = format_retrieved_context(docs, max_tokens=self._context_budget())
+            sys_prompt = self.get_system_prompt()
+            sections = self.build_prompt_sections(state, context)
+        user_content, report = fit_prompt(
+            self.PROMPT_INTRO,
+            sections,
+            budget=self._prompt_budget(),
+            fixed_tokens=count_tokens(sys_prompt),
+        )
+        if report["saved"]:
+            logger.info(
+                "[%s] 프롬프트 예산 적용: %d → %d 토큰 (예산 %d, %s)",
+                self.role,
+                report["tokens_before"],
+                report["tokens_after"],
+                report["budget"],
+                "+".join(report["steps"]),
+            )
 
         llm_messages: List[BaseMessage] = [
             SystemMessage(content=sys_prompt),
             HumanMessage(content=user_content),
         ]
+        return llm_messages, context, report
+
+    def _update_state(
+        self,
+        state: LegoState,
+        answer: str,
+        docs: List[Document],
+        context: str,
+        timing: Optional[Dict[str, Any]] = None,
+    ) -> LegoState:
+        """docs/contexts 저장 + 메시지 로그 추가 (필요 시 하위 클래스에서 확장)
 
-        # 3) LLM 호출
-        resp = self.llm.invoke(llm_messages)
-        answer = resp.content if isinstance(resp, AIMessage) or hasattr(resp, "content") else str(resp)
+        timing: LLM 호출 정보 (model, tier, llm_sec, ttft_sec, cached, prompt_tokens[_saved]) → 메시지의 "timing" 으로 기록
+        """
+        docs_dict = state.get("docs", {})
+        docs_dict[self.role] = [d.page_content for d in docs] if docs else []
+
+        ctx_dict = state.get("contexts", {})
+        ctx_dict[self.role] = context
 
-        # 4) 상태 업데이트 (메시지 로그 추가)
-        new_messages = messages.copy()
+        new_messages = state.get("messages", []).copy()
         new_messages.append(
             {
                 "role": self.role,
                 "korean_role": AgentRole.to_korean(self.role),
                 "content": answer,
+                "timing": timing or {},
             }
         )
 
@@ -76,6 +288,151 @@ class BaseLegoAgent(ABC):
 
     # --- 내부 유틸 ---
 
+    @staticmethod
+    def _message_text(resp: Any) -> str:
+        """LLM 응답(메시지/청크)에서 텍스트만 추출"""
+        if resp is None:
+            return ""
+        if isinstance(resp, AIMessage) or hasattr(resp, "content"):
+            content = resp.content
+            if isinstance(content, list):
+                return "".join(c.get("text", "") if isinstance(c, dict) else str(c) for c in content)
+            return content
+        return str(resp)
+
+    def _record_usage(self, resp: Any, timing: Dict[str, Any]) -> None:
+        """LLM 응답의 usage_metadata 로 호출/토큰 수 집계 (스트리밍은 마지막 청크에 실려 옴) + 역할별 지연 로그
+
+        프롬프트 예산 지표(보낸 토큰/절감 토큰)도 실제로 LLM 을 호출한 경우에만 여기서 집계
+        """
+        tier = timing.get("tier", "")
+        metrics.inc("lego_llm_calls_total", role=self.role, tier=tier)
+        metrics.inc("lego_prompt_tokens_total", timing.get("prompt_tokens", 0), role=self.role)
+        if timing.get("prompt_tokens_saved"):
+            metrics.inc("lego_prompt_tokens_saved_total", timing["prompt_tokens_saved"], role=self.role)
+        usage = getattr(resp, "usage_metadata", None) or {}
+        for kind in ("input", "output"):
+            tokens = usage.get(f"{kind}_tokens")
+            if tokens:
+                timing[f"{kind}_tokens"] = tokens
+                metrics.inc("lego_llm_tokens_total", tokens, role=self.role, type=kind, tier=tier)
+        # 프롬프트 prefix 캐시에서 읽은 입력 토큰 (input 토큰에 포함된 값)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        timing["cached_input_tokens"] = cached_tokens
+        if cached_tokens:
+            metrics.inc("lego_llm_tokens_total", cached_tokens, role=self.role, type="cached_input", tier=tier)
+        logger.info(
+            "[%s] LLM 응답: model=%s, tier=%s, %.2fs (TTFT %.2fs), tokens in=%s (cached=%s) out=%s",
+            self.role,
+            timing.get("model"),
+            tier,
+            timing.get("llm_sec", 0.0),
+            timing.get("ttft_sec", 0.0),
+            usage.get("input_tokens", "-"),
+            cached_tokens,
+            usage.get("output_tokens", "-"),
+        )
+
+    def _context_budget(self) -> int:
+        return get_int_env(f"LEGO_CONTEXT_BUDGET_{self.role}", self.CONTEXT_TOKEN_BUDGET)
+
+    def _prompt_budget(self) -> int:
+        return get_prompt_budget(self.role, self.PROMPT_TOKEN_BUDGET)
+
+    def _static_knowledge(self) -> str:
+        """
+        system 메시지에 넣을 지식 문서 전체 ("" 이면 질의별 RAG 검색 결과 사용)
+
+        - 지식 문서 전체가 static_knowledge_max_tokens 이하이고
+        - 역할 프롬프트와 합친 고정 prefix 가 cache_min_tokens 이상일 때만 사용
+          (캐시가 안 되는 길이면 토큰만 늘어나므로)
+        """
+        layout = get_prompt_layout()
+        knowledge = get_static_knowledge(layout["static_knowledge_max_tokens"])
+        if not knowledge:
+            return ""
+        if count_tokens(self.get_system_prompt()) + count_tokens(knowledge) < layout["cache_min_tokens"]:
+            return ""
+        return knowledge
+
+    # --- 유사 요청 캐시 ---
+
+    def _semantic_threshold(self) -> Optional[float]:
+        if get_semantic_cache() is None:
+            return None
+        return get_similarity_threshold(self.role, self.SEMANTIC_CACHE_THRESHOLD)
+
+    def _semantic_cache_text(self, state: LegoState) -> str:
+        """유사도 비교 기준 텍스트: 자유 입력인 창작 목표만 (템플릿 문구가 유사도를 부풀리지 않도록)"""
+        return split_user_input(state.get("user_input", ""))[0]
+
+    def _semantic_cache_key(self, state: LegoState) -> str:
+        """
+        유사도와 별개로 정확히 같아야 하는 부분: 구조화 필드(규모/용도/난이도/색상/부품/제약)와
+        앞 에이전트 응답 (설계 생성의 실제 입력은 방금 만든 요구사항 분석 결과이므로)
+        """
+        parts = [split_user_input(state.get("user_input", ""))[1]]
+        parts += [m.get("content", "") for m in state.get("messages", [])]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _semantic_vector(self, state: LegoState) -> Optional[List[float]]:
+        text = self._semantic_cache_text(state)
+        if self._semantic_threshold() is None or not text:
+            return None
+        try:
+            return get_cached_embeddings().embed_query(text)
+        except Exception as e:
+            logger.warning("[%s] 유사 요청 캐시용 임베딩 실패: %s", self.role, e)
+            return None
+
+    async def _asemantic_vector(self, state: LegoState) -> Optional[List[float]]:
+        text = self._semantic_cache_text(state)
+        if self._semantic_threshold() is None or not text:
+            return None
+        try:
+            return await get_cached_embeddings().aembed_query(text)
+        except Exception as e:
+            logger.warning("[%s] 유사 요청 캐시용 임베딩 실패: %s", self.role, e)
+            return None
+
+    def _semantic_check(self, state: LegoState, vector: Optional[List[float]]) -> Tuple[str, Optional[str]]:
+        """(캐시 키, 적중한 응답 또는 None) – 캐시를 쓰지 않으면 ("", None)"""
+        if vector is None:
+            return "", None
+        key = self._semantic_cache_key(state)
+        return key, self._semantic_lookup(vector, key)
+
+    def _semantic_lookup(self, vector: Optional[List[float]], key: str) -> Optional[str]:
+        threshold = self._semantic_threshold()
+        cache = get_semantic_cache()
+        if vector is None or threshold is None or cache is None:
+            return None
+        hit = cache.lookup(self.role, vector, threshold, key)
+        metrics.inc("lego_semantic_cache_total", role=self.role, result="miss" if hit is None else "hit")
+        if hit is None:
+            return None
+        answer, score = hit
+        logger.info("[%s] 유사 요청 캐시 적중: similarity=%.4f (threshold=%.2f)", self.role, score, threshold)
+        return answer
+
+    def _semantic_store(self, vector: Optional[List[float]], key: str, answer: str) -> None:
+        cache = get_semantic_cache()
+        if vector is not None and cache is not None and answer:
+            cache.add(self.role, vector, answer, key)
+
+    def _prefetched_docs(self, state: LegoState) -> Optional[List[Document]]:
+        """그래프 진입 시 미리 가져온 RAG 결과 (없으면 None)"""
+        prefetched = state.get("prefetched") or {}
+        if self.role not in prefetched:
+            return None
+        return prefetched[self.role][: self.k]
+
+    def search_query(self, state: LegoState) -> str:
+        """이번 실행의 RAG 검색 쿼리 (지식 문서 전체를 system 메시지에 넣는 역할은 "" – 검색 생략)"""
+        if self._static_knowledge():
+            return ""
+        return self._build_search_query(state)
+
     def _build_search_query(self, state: LegoState) -> str:
         """RAG 검색 쿼리 기본 구현 (필요 시 하위 클래스에서 override)"""
         return state.get("user_input", "")
@@ -1,18 +1,33 @@
+from typing import List, Optional
+
+from langchain_core.language_models import BaseChatModel
+
 from workflow.agents.base_agent import BaseLegoAgent
+from workflow.model_routing import ModelRouter
 from workflow.state import LegoState, AgentRole
 from utils.prompt import DESIGN_AGENT_PROMPT
+from utils.prompt_budget import PromptSection
 
 
 class DesignAgent(BaseLegoAgent):
     """레고 설계 생성 에이전트"""
 
-    def __init__(self, k: int = 4):
-        super().__init__(role=AgentRole.DESIGN, k=k)
+    CONTEXT_TOKEN_BUDGET = 900
+    PROMPT_TOKEN_BUDGET = 1600
+    PROMPT_INTRO = (
+        "아래는 사용자의 레고 창작 요구사항과, 레고 관련 참고 지식입니다.\n"
+        "이 정보를 기반으로 레고 설계 초안을 작성하세요.\n\n"
+    )
+    # 표현만 조금 다른 반복 요청은 이전 결과 재사용
+    SEMANTIC_CACHE_THRESHOLD = 0.98
+
+    def __init__(self, k: int = 4, llm: Optional[BaseChatModel] = None, router: Optional[ModelRouter] = None):
+        super().__init__(role=AgentRole.DESIGN, k=k, llm=llm, router=router)
 
     def get_system_prompt(self) -> str:
         return DESIGN_AGENT_PROMPT
 
-    def build_user_message(self, state: LegoState, context: str) -> str:
+    def build_prompt_sections(self, state: LegoState, context: str) -> List[PromptSection]:
         # 이전 요구사항 분석 결과를 messages에서 찾아 사용
         requirements_summary = ""
         for m in state.get("messages", []):
@@ -20,15 +35,15 @@ class DesignAgent(BaseLegoAgent):
                 requirements_summary = m.get("content", "")
                 break
 
-        user_input = state.get("user_input", "")
-
-        return (
-            "아래는 사용자의 레고 창작 요구사항과, 레고 관련 참고 지식입니다.\n"
-            "이 정보를 기반으로 레고 설계 초안을 작성하세요.\n\n"
-            "## 사용자 입력 원문\n"
-            f"{user_input}\n\n"
-            "## 요구사항 분석 결과\n"
-            f"{requirements_summary if requirements_summary else '요구사항 분석 결과가 없습니다.'}\n\n"
-            "## 참고 지식 (RAG 검색 결과)\n"
-            f"{context if context else '추가 참고 지식이 없습니다.'}"
-        )
+        # 원문은 요구사항 분석과 겹치는 줄이 많아 분석 결과 뒤 순위 (예산 초과 시 중복 줄부터 제거)
+        return [
+            PromptSection("사용자 입력 원문", state.get("user_input", ""), priority=1),
+            PromptSection(
+                "요구사항 분석 결과",
+                requirements_summary,
+                priority=0,
+                empty="요구사항 분석 결과가 없습니다.",
+                min_tokens=300,
+            ),
+            PromptSection("참고 지식 (RAG 검색 결과)", context, priority=2, empty="추가 참고 지식이 없습니다."),
+        ]
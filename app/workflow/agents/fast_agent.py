@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+
+from workflow.agents.base_agent import BaseLegoAgent
+from workflow.model_routing import ModelRouter
+from workflow.state import LegoState, AgentRole
+from utils.prompt import FAST_GUIDE_PROMPT
+from utils.prompt_budget import PromptSection
+
+
+class FastGuideAgent(BaseLegoAgent):
+    """요구사항 정리부터 최종 설계 가이드까지 LLM 1회 호출로 작성하는 에이전트 (빠른 모드)"""
+
+    CONTEXT_TOKEN_BUDGET = 900
+    PROMPT_TOKEN_BUDGET = 2000
+    PROMPT_INTRO = (
+        "다음은 사용자가 입력한 레고 창작 아이디어와 제약 조건, 레고 참고 지식입니다.\n"
+        "요구사항을 정리하고 이를 바탕으로 최종 레고 설계 가이드를 작성하세요.\n\n"
+    )
+
+    def __init__(self, k: int = 4, llm: Optional[BaseChatModel] = None, router: Optional[ModelRouter] = None):
+        super().__init__(role=AgentRole.FAST, k=k, llm=llm, router=router)
+
+    def get_system_prompt(self) -> str:
+        return FAST_GUIDE_PROMPT
+
+    def build_prompt_sections(self, state: LegoState, context: str) -> List[PromptSection]:
+        return [
+            PromptSection("사용자 입력", state.get("user_input", ""), priority=0, keep=True),
+            PromptSection("참고 지식 (RAG 검색 결과)", context, priority=1, empty="추가 참고 지식이 없습니다."),
+        ]
+
+    def _update_state(
+        self,
+        state: LegoState,
+        answer: str,
+        docs: List[Document],
+        context: str,
+        timing: Optional[Dict[str, Any]] = None,
+    ) -> LegoState:
+        new_state = super()._update_state(state, answer, docs, context, timing)
+        # 단일 호출 결과가 곧 최종 답변
+        if new_state.get("messages"):
+            new_state["final_answer"] = new_state["messages"][-1].get("content", "")
+        return new_state
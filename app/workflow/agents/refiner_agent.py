@@ -1,18 +1,32 @@
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+
 from workflow.agents.base_agent import BaseLegoAgent
+from workflow.model_routing import ModelRouter
 from workflow.state import LegoState, AgentRole
 from utils.prompt import REFINER_AGENT_PROMPT
+from utils.prompt_budget import PromptSection
 
 
 class RefinerAgent(BaseLegoAgent):
     """최종 설계 문서를 정리하는 에이전트"""
 
-    def __init__(self, k: int = 1):
-        super().__init__(role=AgentRole.REFINER, k=k)
+    CONTEXT_TOKEN_BUDGET = 400
+    PROMPT_TOKEN_BUDGET = 2800
+    PROMPT_INTRO = (
+        "다음은 레고 창작 요구사항 분석 결과와 설계 초안입니다.\n"
+        "이를 통합하여 최종 레고 설계 가이드를 작성하세요.\n\n"
+    )
+
+    def __init__(self, k: int = 1, llm: Optional[BaseChatModel] = None, router: Optional[ModelRouter] = None):
+        super().__init__(role=AgentRole.REFINER, k=k, llm=llm, router=router)
 
     def get_system_prompt(self) -> str:
         return REFINER_AGENT_PROMPT
 
-    def build_user_message(self, state: LegoState, context: str) -> str:
+    def build_prompt_sections(self, state: LegoState, context: str) -> List[PromptSection]:
         requirements_summary = ""
         design_draft = ""
         for m in state.get("messages", []):
@@ -21,20 +35,29 @@ class RefinerAgent(BaseLegoAgent):
             elif m.get("role") == AgentRole.DESIGN:
                 design_draft = m.get("content", "")
 
-        return (
-            "다음은 레고 창작 요구사항 분석 결과와 설계 초안입니다.\n"
-            "이를 통합하여 최종 레고 설계 가이드를 작성하세요.\n\n"
-            "## 요구사항 분석 결과\n"
-            f"{requirements_summary if requirements_summary else '요구사항 분석 결과가 없습니다.'}\n\n"
-            "## 설계 초안\n"
-            f"{design_draft if design_draft else '설계 초안이 없습니다.'}\n\n"
-            "## 참고 지식 (선택적)\n"
-            f"{context if context else '추가 참고 지식이 없습니다.'}"
-        )
-
-    def run(self, state: LegoState) -> LegoState:
-        # 기본 run으로 상태 업데이트
-        new_state = super().run(state)
+        # 예산 초과 시 참고 지식 → 요구사항 요약 → 설계 초안 순으로 줄임 (설계 초안이 최종 문서의 뼈대)
+        return [
+            PromptSection(
+                "요구사항 분석 결과",
+                requirements_summary,
+                priority=1,
+                empty="요구사항 분석 결과가 없습니다.",
+                min_tokens=150,
+            ),
+            PromptSection("설계 초안", design_draft, priority=0, empty="설계 초안이 없습니다.", min_tokens=800),
+            PromptSection("참고 지식 (선택적)", context, priority=2, empty="추가 참고 지식이 없습니다."),
+        ]
+
+    def _update_state(
+        self,
+        state: LegoState,
+        answer: str,
+        docs: List[Document],
+        context: str,
+        timing: Optional[Dict[str, Any]] = None,
+    ) -> LegoState:
+        # 기본 상태 업데이트
+        new_state = super()._update_state(state, answer, docs, context, timing)
         # 마지막 메시지를 final_answer로 저장
         if new_state.get("messages"):
             last = new_state["messages"][-1]
@@ -1,25 +1,34 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
 
 from workflow.agents.base_agent import BaseLegoAgent
+from workflow.model_routing import ModelRouter
 from workflow.state import LegoState, AgentRole
 from utils.prompt import REQUIREMENTS_ANALYZER_PROMPT
+from utils.prompt_budget import PromptSection
 
 
 class RequirementsAgent(BaseLegoAgent):
     """레고 요구사항 분석 에이전트"""
 
-    def __init__(self, k: int = 2):
-        super().__init__(role=AgentRole.REQUIREMENTS, k=k)
+    CONTEXT_TOKEN_BUDGET = 400
+    PROMPT_TOKEN_BUDGET = 1000
+    PROMPT_INTRO = (
+        "다음은 사용자가 입력한 레고 창작 아이디어와 제약 조건입니다.\n"
+        "이를 읽고 요구사항을 구조화하여 정리하세요.\n\n"
+    )
+    # 표현만 조금 다른 반복 요청은 이전 결과 재사용
+    SEMANTIC_CACHE_THRESHOLD = 0.97
+
+    def __init__(self, k: int = 2, llm: Optional[BaseChatModel] = None, router: Optional[ModelRouter] = None):
+        super().__init__(role=AgentRole.REQUIREMENTS, k=k, llm=llm, router=router)
 
     def get_system_prompt(self) -> str:
         return REQUIREMENTS_ANALYZER_PROMPT
 
-    def build_user_message(self, state: LegoState, context: str) -> str:
-        user_input = state.get("user_input", "")
-        return (
-            "다음은 사용자가 입력한 레고 창작 아이디어와 제약 조건입니다.\n"
-            "이를 읽고 요구사항을 구조화하여 정리하세요.\n\n"
-            f"## 사용자 입력\n{user_input}\n\n"
-            "## 참고용 레고 설계 지식 (있다면)\n"
-            f"{context if context else '추가 지식이 없습니다.'}"
-        )
+    def build_prompt_sections(self, state: LegoState, context: str) -> List[PromptSection]:
+        return [
+            PromptSection("사용자 입력", state.get("user_input", ""), priority=0, keep=True),
+            PromptSection("참고용 레고 설계 지식 (있다면)", context, priority=1, empty="추가 지식이 없습니다."),
+        ]
@@ -1,34 +1,119 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, END
 
-from workflow.state import LegoState
+from retrieval.vector_store import asearch_lego_info, get_knowledge_version
+from utils import metrics
+from utils.prompt import PROMPT_VERSIONS
+from workflow.state import LegoState, AgentRole
+from workflow.model_routing import ModelRouter, get_model_router, model_name
+from workflow.agents.base_agent import BaseLegoAgent, get_prompt_budget, get_prompt_layout
 from workflow.agents.requirements_agent import RequirementsAgent
 from workflow.agents.design_agent import DesignAgent
 from workflow.agents.refiner_agent import RefinerAgent
+from workflow.agents.fast_agent import FastGuideAgent
+
+# 파이프라인 종류: full = 3단계 (요구사항 분석 → 설계 생성 → 최종 정리), fast = LLM 1회 호출
+PIPELINE_FULL = "full"
+PIPELINE_FAST = "fast"
+PIPELINE_AUTO = "auto"
+PIPELINES = (PIPELINE_FULL, PIPELINE_FAST)
+
+# 파이프라인별 (역할, 에이전트 클래스) – 프롬프트 예산/모델 라우팅 요약에 사용
+PIPELINE_AGENTS: Dict[str, Tuple[Tuple[str, Type[BaseLegoAgent]], ...]] = {
+    PIPELINE_FULL: (
+        (AgentRole.REQUIREMENTS, RequirementsAgent),
+        (AgentRole.DESIGN, DesignAgent),
+        (AgentRole.REFINER, RefinerAgent),
+    ),
+    PIPELINE_FAST: ((AgentRole.FAST, FastGuideAgent),),
+}
+
+
+def start_rag_prefetch(state: LegoState, agents: List[BaseLegoAgent]) -> Dict[str, "asyncio.Task[List[Document]]"]:
+    """
+    에이전트별 RAG 검색을 동시에 시작한다. (역할 → 검색 Task)
+
+    - 검색어가 같은 에이전트끼리는 가장 큰 k 로 한 번만 검색하고 결과를 나눠 쓴다.
+    - 각 에이전트는 자신의 k 만큼만 잘라서 사용 (BaseLegoAgent._prefetched_docs)
+    """
+    by_query: Dict[str, int] = {}
+    for agent in agents:
+        query = agent.search_query(state)
+        if query:
+            by_query[query] = max(by_query.get(query, 0), agent.k)
+
+    tasks = {query: asyncio.ensure_future(asearch_lego_info(query=query, k=k)) for query, k in by_query.items()}
+
+    prefetch: Dict[str, "asyncio.Task[List[Document]]"] = {}
+    for agent in agents:
+        query = agent.search_query(state)
+        prefetch[agent.role] = tasks[query] if query else _completed([])
+    return prefetch
+
 
+def _completed(value: Any) -> "asyncio.Future[Any]":
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(value)
+    return future
 
-def _run_requirements(state: LegoState) -> LegoState:
-    agent = RequirementsAgent(k=2)
-    return agent.run(state)
 
+def create_lego_graph(llm: Optional[BaseChatModel] = None, router: Optional[ModelRouter] = None) -> StateGraph:
+    """레고 창작 Multi-Agent LangGraph 생성
 
-def _run_design(state: LegoState) -> LegoState:
-    agent = DesignAgent(k=4)
-    return agent.run(state)
+    - 에이전트 인스턴스는 그래프 컴파일 시 한 번만 만들고 모든 실행에서 재사용
+      (에이전트는 상태를 갖지 않으므로 여러 세션이 동시에 써도 안전)
+    - llm 을 주면 모든 에이전트가 해당 모델을 사용 (테스트/벤치마크용 fake 모델 주입)
+    - 그렇지 않으면 역할/입력별 모델 라우팅 (workflow.model_routing, router 로 교체 가능)
+    - invoke/stream(동기)과 ainvoke/astream(비동기) 모두 지원.
+      비동기 실행 시에는 요구사항 분석이 유사 요청 캐시에 적중하지 않으면 모든 에이전트의 RAG 검색을
+      동시에 시작하고, 요구사항 분석 LLM 호출과 나머지 검색을 겹쳐서 실행한다.
+    """
+    router = router if router is not None else get_model_router()
+    if llm is None:
+        # 라우팅에 쓰일 수 있는 클라이언트를 미리 생성 (첫 요청에서 생성 비용이 들지 않도록)
+        router.warmup(tuple(role for role, _ in PIPELINE_AGENTS[PIPELINE_FULL]))
+    requirements_agent = RequirementsAgent(k=2, llm=llm, router=router)
+    design_agent = DesignAgent(k=4, llm=llm, router=router)
+    refiner_agent = RefinerAgent(k=2, llm=llm, router=router)
+    agents: List[BaseLegoAgent] = [requirements_agent, design_agent, refiner_agent]
 
+    async def _arun_requirements(state: LegoState, config: RunnableConfig) -> LegoState:
+        prefetch: Dict[str, "asyncio.Task[List[Document]]"] = {}
 
-def _run_refiner(state: LegoState) -> LegoState:
-    agent = RefinerAgent(k=2)
-    return agent.run(state)
+        def _start_prefetch() -> "asyncio.Task[List[Document]]":
+            prefetch.update(start_rag_prefetch(state, agents))
+            return prefetch[requirements_agent.role]
 
+        # 요구사항 분석이 유사 요청 캐시에 적중하지 않으면 그때 모든 검색을 동시에 시작하고,
+        # 요구사항 분석 LLM 호출 동안 나머지 에이전트 검색이 계속 진행됨
+        new_state = await requirements_agent.arun(state, config, prefetch=_start_prefetch)
+        if not prefetch:
+            # 캐시 적중 → 이후 에이전트가 각자 캐시 확인 후 필요할 때만 검색
+            return new_state
 
-def create_lego_graph() -> StateGraph:
-    """레고 창작 Multi-Agent LangGraph 생성"""
+        with metrics.span("graph.prefetch_wait", phase="others"):
+            prefetched = {role: await task for role, task in prefetch.items()}
+        return {**new_state, "prefetched": prefetched}
 
     workflow = StateGraph(LegoState)
 
-    workflow.add_node("requirements_agent", _run_requirements)
-    workflow.add_node("design_agent", _run_design)
-    workflow.add_node("refiner_agent", _run_refiner)
+    workflow.add_node(
+        "requirements_agent",
+        RunnableLambda(requirements_agent.run, afunc=_arun_requirements, name="requirements_agent"),
+    )
+    workflow.add_node(
+        "design_agent",
+        RunnableLambda(design_agent.run, afunc=design_agent.arun, name="design_agent"),
+    )
+    workflow.add_node(
+        "refiner_agent",
+        RunnableLambda(refiner_agent.run, afunc=refiner_agent.arun, name="refiner_agent"),
+    )
 
     workflow.set_entry_point("requirements_agent")
     workflow.add_edge("requirements_agent", "design_agent")
@@ -36,3 +121,155 @@ def create_lego_graph() -> StateGraph:
     workflow.add_edge("refiner_agent", END)
 
     return workflow.compile()
+
+
+def create_lego_fast_graph(llm: Optional[BaseChatModel] = None, router: Optional[ModelRouter] = None) -> StateGraph:
+    """빠른 모드 LangGraph 생성 (소형·입문자 요청용, select_pipeline 참고)
+
+    - 요구사항 정리와 최종 가이드 작성을 한 프롬프트(FAST_GUIDE_PROMPT)로 묶어 LLM 1회 호출 + RAG 검색 1회
+    - 최종 답변 형식(특히 '5. 브릭/부품 제안' 표 규칙)은 3단계 파이프라인과 같아 후처리를 그대로 사용
+    - llm/router, invoke/stream/ainvoke/astream 지원은 create_lego_graph 와 같음
+    """
+    router = router if router is not None else get_model_router()
+    if llm is None:
+        router.warmup(tuple(role for role, _ in PIPELINE_AGENTS[PIPELINE_FAST]))
+    fast_agent = FastGuideAgent(k=4, llm=llm, router=router)
+
+    workflow = StateGraph(LegoState)
+    workflow.add_node(
+        "fast_agent",
+        RunnableLambda(fast_agent.run, afunc=fast_agent.arun, name="fast_agent"),
+    )
+    workflow.set_entry_point("fast_agent")
+    workflow.add_edge("fast_agent", END)
+
+    return workflow.compile()
+
+
+def create_pipeline_graph(
+    pipeline: str,
+    llm: Optional[BaseChatModel] = None,
+    router: Optional[ModelRouter] = None,
+) -> StateGraph:
+    """파이프라인 이름(full/fast)으로 그래프 생성"""
+    if pipeline == PIPELINE_FAST:
+        return create_lego_fast_graph(llm=llm, router=router)
+    return create_lego_graph(llm=llm, router=router)
+
+
+def select_pipeline(choice: str, fields: Dict[str, Any]) -> str:
+    """
+    사용자가 고른 파이프라인(full/fast/auto)을 full/fast 로 확정
+
+    auto: 규모가 '소형'이고 난이도가 '입문자'이면 fast (작고 쉬운 작품은 3단계 분석 없이도 충분),
+    그 외(중급/상급, 난이도 미지정 포함)에는 full. 알 수 없는 값도 auto 로 처리.
+    """
+    choice = (choice or PIPELINE_AUTO).strip().lower()
+    if choice in PIPELINES:
+        return choice
+    scale = str(fields.get("scale") or "")
+    difficulty = str(fields.get("difficulty") or "")
+    if scale.startswith("소형") and difficulty.startswith("입문"):
+        return PIPELINE_FAST
+    return PIPELINE_FULL
+
+
+def pipeline_signature(
+    llm: Optional[BaseChatModel] = None,
+    router: Optional[ModelRouter] = None,
+    pipeline: str = PIPELINE_FULL,
+) -> Dict[str, Any]:
+    """
+    파이프라인 결과에 영향을 주는 설정 요약 (결과 캐시 키에 사용)
+    - 프롬프트 버전/역할별 프롬프트 토큰 예산/메시지 배치(지식 문서 전체 포함 기준), 역할별 모델 라우팅(배포명/temperature/max_tokens/복잡도 규칙),
+      지식 문서 색인 버전, 파이프라인 종류(full/fast – 해당 파이프라인 역할만 포함)
+    - llm 을 주면 (모든 에이전트가 같은 모델) 그 모델의 배포명/temperature
+    """
+    roles = PIPELINE_AGENTS.get(pipeline, PIPELINE_AGENTS[PIPELINE_FULL])
+    if llm is not None:
+        models: Dict[str, Any] = {"deployment": model_name(llm), "temperature": getattr(llm, "temperature", None)}
+    else:
+        models = (router if router is not None else get_model_router()).describe(tuple(role for role, _ in roles))
+    return {
+        "pipeline": pipeline,
+        "prompts": PROMPT_VERSIONS,
+        "prompt_budgets": {role: get_prompt_budget(role, agent_cls.PROMPT_TOKEN_BUDGET) for role, agent_cls in roles},
+        "prompt_layout": get_prompt_layout(),
+        "models": models,
+        "knowledge": get_knowledge_version(),
+    }
+
+
+# 그래프 노드 이름 → 화면 표시용 이름
+NODE_LABELS: Dict[str, str] = {
+    "requirements_agent": "📘 요구사항 분석",
+    "design_agent": "📗 설계 생성",
+    "refiner_agent": "📙 최종 정리",
+}
+
+# 빠른 모드 그래프 노드 이름 → 화면 표시용 이름
+FAST_NODE_LABELS: Dict[str, str] = {
+    "fast_agent": "⚡ 빠른 설계 가이드",
+}
+
+PIPELINE_NODE_LABELS: Dict[str, Dict[str, str]] = {
+    PIPELINE_FULL: NODE_LABELS,
+    PIPELINE_FAST: FAST_NODE_LABELS,
+}
+
+
+def build_initial_state(user_input: str) -> LegoState:
+    """그래프 실행용 초기 상태"""
+    return {
+        "user_input": user_input,
+        "messages": [],
+        "docs": {},
+        "contexts": {},
+        "current_step": "START",
+        "prev_node": "",
+    }
+
+
+def stream_lego_graph(graph, initial_state: LegoState) -> Iterator[Dict[str, Any]]:
+    """
+    그래프를 스트리밍 모드로 실행하면서 이벤트를 순서대로 내보낸다.
+
+    - {"type": "token", "node": 노드 이름, "text": 토큰}: 에이전트 LLM 출력 토큰
+    - {"type": "node_end", "node": 노드 이름, "text": 노드 최종 응답, "timing": LLM 호출 정보}: 노드 실행 완료
+      (유사 요청 캐시 적중처럼 토큰 없이 끝난 노드도 text 로 응답을 받을 수 있음,
+       timing 은 model/tier/llm_sec/ttft_sec/cached)
+    - {"type": "final", "state": 최종 상태}: 마지막 이벤트
+    """
+    final_state: Dict[str, Any] = dict(initial_state)
+    for mode, payload in graph.stream(initial_state, stream_mode=["messages", "updates"]):
+        yield from _stream_events(mode, payload, final_state)
+    yield {"type": "final", "state": final_state}
+
+
+async def astream_lego_graph(graph, initial_state: LegoState) -> AsyncIterator[Dict[str, Any]]:
+    """stream_lego_graph 의 비동기 버전 (RAG 동시 prefetch 경로 사용)"""
+    final_state: Dict[str, Any] = dict(initial_state)
+    async for mode, payload in graph.astream(initial_state, stream_mode=["messages", "updates"]):
+        for event in _stream_events(mode, payload, final_state):
+            yield event
+    yield {"type": "final", "state": final_state}
+
+
+def _stream_events(mode: str, payload: Any, final_state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """LangGraph 스트림 출력 1건을 이벤트로 변환 (updates 는 final_state 에 누적)"""
+    if mode == "messages":
+        chunk, metadata = payload
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        if text:
+            yield {"type": "token", "node": metadata.get("langgraph_node", ""), "text": text}
+    elif mode == "updates":
+        for node, update in payload.items():
+            text = ""
+            timing: Dict[str, Any] = {}
+            if update:
+                final_state.update(update)
+                messages = update.get("messages") or []
+                if messages:
+                    text = messages[-1].get("content", "")
+                    timing = messages[-1].get("timing") or {}
+            yield {"type": "node_end", "node": node, "text": text, "timing": timing}
@@ -0,0 +1,152 @@
+"""
+에이전트 역할별 모델 라우팅 (배포 등급 / temperature / max_tokens)
+
+- 구조화된 요구사항 정리는 빠른 모델(fast = AOAI_DEPLOY_GPT4O_MINI),
+  설계/최종 정리는 입력이 복잡할 때만 고성능 모델(strong = AOAI_DEPLOY_GPT4O)을 사용
+- 역할별 기본값은 ROUTE_DEFAULTS, 환경변수로 덮어쓰기 (LEGO_CONTEXT_BUDGET_<ROLE> 와 같은 방식):
+    LEGO_MODEL_TIER_<ROLE>: fast | strong | auto
+    LEGO_TEMPERATURE_<ROLE>: temperature
+    LEGO_MAX_TOKENS_<ROLE>: 응답 최대 토큰 수 (0 이면 제한 없음)
+- auto: 입력 복잡도 규칙(is_complex_input)으로 결정
+    규모가 '대형'이거나 입력이 LEGO_COMPLEX_INPUT_CHARS(기본 600자) 이상이면 strong, 아니면 fast
+- LEGO_MODEL_ROUTING=off: 모든 역할이 예전처럼 fast 배포 + temperature 0.7
+- AOAI_DEPLOY_GPT4O 가 없으면 strong 도 mini 배포로 fallback (utils.config.get_llm)
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+
+from utils.config import DEFAULT_TEMPERATURE, get_float_env, get_int_env, get_llm
+from workflow.state import AgentRole
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+TIER_AUTO = "auto"
+_TIERS = (TIER_FAST, TIER_STRONG, TIER_AUTO)
+
+
+class ModelRoute(NamedTuple):
+    """역할 1개의 모델 설정 (tier 는 fast/strong, 설정값에서는 auto 도 가능)"""
+
+    tier: str
+    temperature: float
+    max_tokens: int  # 0 이면 제한 없음
+
+
+ROUTE_DEFAULTS: Dict[str, ModelRoute] = {
+    # 입력을 항목별로 정리하는 작업 → 빠른 모델 + 낮은 temperature
+    # (뒤 에이전트가 읽는 구조화 명세라 대형 요청에서 잘리지 않도록 응답 길이는 제한하지 않음)
+    AgentRole.REQUIREMENTS: ModelRoute(TIER_FAST, 0.2, 0),
+    # 창작 설계 / 부품 표를 포함한 최종 문서 → 복잡한 입력에서만 고성능 모델
+    AgentRole.DESIGN: ModelRoute(TIER_AUTO, DEFAULT_TEMPERATURE, 0),
+    AgentRole.REFINER: ModelRoute(TIER_AUTO, DEFAULT_TEMPERATURE, 0),
+    # 빠른 모드 (소형/입문자 요청용 단일 호출) → 빠른 모델
+    AgentRole.FAST: ModelRoute(TIER_FAST, DEFAULT_TEMPERATURE, 0),
+}
+
+# 예전 동작 (라우팅 끔): 모든 역할이 같은 배포/temperature
+_LEGACY_ROUTE = ModelRoute(TIER_FAST, DEFAULT_TEMPERATURE, 0)
+
+
+def routing_enabled() -> bool:
+    return (os.getenv("LEGO_MODEL_ROUTING") or "on").strip().lower() not in ("off", "0", "false", "no")
+
+
+def is_complex_input(user_input: str) -> bool:
+    """대형 규모이거나 긴 입력이면 복잡한 요청으로 본다 (build_user_input 형식 기준)"""
+    if "규모: 대형" in user_input:
+        return True
+    return len(user_input) >= get_int_env("LEGO_COMPLEX_INPUT_CHARS", 600)
+
+
+def get_route(role: str) -> ModelRoute:
+    """역할의 설정값 (auto 가 남아 있을 수 있음)"""
+    if not routing_enabled():
+        return _LEGACY_ROUTE
+    default = ROUTE_DEFAULTS.get(role, _LEGACY_ROUTE)
+    tier = (os.getenv(f"LEGO_MODEL_TIER_{role}") or default.tier).strip().lower()
+    return ModelRoute(
+        tier if tier in _TIERS else default.tier,
+        get_float_env(f"LEGO_TEMPERATURE_{role}", default.temperature),
+        max(get_int_env(f"LEGO_MAX_TOKENS_{role}", default.max_tokens), 0),
+    )
+
+
+def resolve_route(role: str, user_input: str) -> ModelRoute:
+    """입력에 맞춰 auto 를 fast/strong 으로 확정한 라우트"""
+    route = get_route(role)
+    if route.tier == TIER_AUTO:
+        route = route._replace(tier=TIER_STRONG if is_complex_input(user_input) else TIER_FAST)
+    return route
+
+
+def _default_factory(route: ModelRoute) -> BaseChatModel:
+    return get_llm(
+        "gpt4o" if route.tier == TIER_STRONG else None,
+        temperature=route.temperature,
+        max_tokens=route.max_tokens or None,
+    )
+
+
+def model_name(llm: Any) -> str:
+    """로그/메트릭용 모델 이름 (배포명, 없으면 클래스 이름)"""
+    return getattr(llm, "deployment_name", None) or type(llm).__name__
+
+
+class ModelRouter:
+    """역할 + 입력 → (LLM, 확정된 라우트)
+
+    factory 로 라우트별 모델을 만드는 방법을 바꿀 수 있다 (벤치마크의 fake 모델 주입 등).
+    기본 factory 는 utils.config.get_llm (프로세스 전역 레지스트리 재사용).
+    """
+
+    def __init__(self, factory: Optional[Callable[[ModelRoute], BaseChatModel]] = None) -> None:
+        self.factory = factory or _default_factory
+
+    def select(self, role: str, user_input: str) -> Tuple[BaseChatModel, ModelRoute]:
+        route = resolve_route(role, user_input)
+        return self.factory(route), route
+
+    def warmup(self, roles: Tuple[str, ...] = tuple(ROUTE_DEFAULTS)) -> None:
+        """역할별로 쓰일 수 있는 클라이언트를 미리 생성 (auto 는 fast/strong 둘 다)"""
+        for route in self._candidates(roles).values():
+            self.factory(route)
+
+    def describe(self, roles: Tuple[str, ...] = tuple(ROUTE_DEFAULTS)) -> Dict[str, Any]:
+        """결과 캐시 키/로그용 라우팅 설정 요약 (역할별 tier, 배포명, temperature, max_tokens)"""
+        summary: Dict[str, Any] = {"routing": routing_enabled()}
+        if any(get_route(role).tier == TIER_AUTO for role in roles):
+            summary["complex_input_chars"] = get_int_env("LEGO_COMPLEX_INPUT_CHARS", 600)
+        for role in roles:
+            route = get_route(role)
+            models = {
+                name: model_name(self.factory(candidate))
+                for name, candidate in self._candidates((role,)).items()
+            }
+            summary[role] = {**route._asdict(), "models": models}
+        return summary
+
+    @staticmethod
+    def _candidates(roles: Tuple[str, ...]) -> Dict[str, ModelRoute]:
+        candidates: Dict[str, ModelRoute] = {}
+        for role in roles:
+            route = get_route(role)
+            tiers = (TIER_FAST, TIER_STRONG) if route.tier == TIER_AUTO else (route.tier,)
+            for tier in tiers:
+                candidates[f"{role}:{tier}" if len(roles) > 1 else tier] = route._replace(tier=tier)
+        return candidates
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """프로세스 공유 라우터 (기본 factory)"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
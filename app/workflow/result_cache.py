@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.config import get_int_env
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, "cache", "design_results.sqlite3")
+
+
+def _normalize_input(user_input: str) -> str:
+    """캐시 키용 입력 정규화 (NFC + 줄 끝 공백/빈 줄 끝 정리)"""
+    text = unicodedata.normalize("NFC", user_input or "")
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def design_cache_key(user_input: str, signature: Dict[str, Any]) -> str:
+    """
+    파이프라인 결과 캐시 키.
+
+    build_user_input 결과 + 프롬프트 버전 + 모델 배포/temperature 등(signature)을
+    정렬된 JSON 으로 만든 뒤 SHA-256 해시.
+    """
+    payload = {"input": _normalize_input(user_input), "signature": signature}
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------------
+# 저장소 백엔드
+# ------------------------------------------------------------
+class CacheBackend(ABC):
+    """결과 캐시 저장소 인터페이스 (값은 JSON 직렬화 가능한 dict)"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def size(self) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """프로세스 메모리 LRU (크기 제한 + 항목별 만료 시각)"""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._items[key] = (time.time() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class DiskBackend(CacheBackend):
+    """SQLite 파일 저장소 (재시작 후에도 유지, 최근 사용 순으로 크기 제한)"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 1024) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS design_results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_design_results_accessed ON design_results (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM design_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM design_results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE design_results SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO design_results (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl, now),
+            )
+            # 만료 항목 정리 + 크기 초과분은 오래 안 쓴 순서로 제거
+            self._conn.execute("DELETE FROM design_results WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                """
+                DELETE FROM design_results WHERE key IN (
+                    SELECT key FROM design_results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM design_results").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM design_results")
+            self._conn.commit()
+
+
+# ------------------------------------------------------------
+# 결과 캐시
+# ------------------------------------------------------------
+class ResultCache:
+    """그래프 실행 결과(final_answer, messages) 캐시 + 통계"""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 24 * 3600) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning("[ResultCache] 캐시 조회 실패: %s", e)
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, state: Dict[str, Any]) -> None:
+        """그래프 최종 상태에서 재사용할 필드만 저장 (최종 답변이 없으면 저장하지 않음)"""
+        if not state.get("final_answer"):
+            return
+        value = {
+            "final_answer": state["final_answer"],
+            "messages": state.get("messages", []),
+            "cached_at": time.time(),
+        }
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning("[ResultCache] 캐시 저장 실패: %s", e)
+            return
+        with self._lock:
+            self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "size": self.backend.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_loaded = False
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    프로세스 공유 결과 캐시 (환경변수로 설정, 비활성 시 None)
+
+    - LEGO_RESULT_CACHE: memory(기본) | disk | off
+    - LEGO_RESULT_CACHE_TTL (기본 86400초)
+    - LEGO_RESULT_CACHE_SIZE (기본 memory 256 / disk 1024개)
+    - LEGO_RESULT_CACHE_PATH (disk 백엔드 파일, 기본 app/cache/design_results.sqlite3)
+    """
+    global _result_cache, _result_cache_loaded
+    with _result_cache_lock:
+        if _result_cache_loaded:
+            return _result_cache
+
+        kind = (os.getenv("LEGO_RESULT_CACHE") or "memory").strip().lower()
+        ttl = float(get_int_env("LEGO_RESULT_CACHE_TTL", 24 * 3600))
+        try:
+            if kind == "disk":
+                path = (os.getenv("LEGO_RESULT_CACHE_PATH") or "").strip() or DEFAULT_CACHE_PATH
+                backend: Optional[CacheBackend] = DiskBackend(path, get_int_env("LEGO_RESULT_CACHE_SIZE", 1024))
+            elif kind in ("off", "none", "0", "false"):
+                backend = None
+            else:
+                backend = MemoryBackend(get_int_env("LEGO_RESULT_CACHE_SIZE", 256))
+        except sqlite3.Error as e:
+            logger.warning("[ResultCache] 디스크 캐시를 열 수 없어 메모리 캐시 사용: %s", e)
+            backend = MemoryBackend(get_int_env("LEGO_RESULT_CACHE_SIZE", 256))
+
+        _result_cache = ResultCache(backend, ttl=ttl) if backend else None
+        _result_cache_loaded = True
+        return _result_cache
@@ -0,0 +1,137 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.config import get_int_env
+
+logger = logging.getLogger(__name__)
+
+
+class _RoleIndex:
+    """역할 하나의 캐시: 정규화된 float32 임베딩 행렬 + 정확 일치 키/응답 목록 (가득 차면 오래된 것부터 덮어씀)"""
+
+    def __init__(self, dim: int, max_entries: int) -> None:
+        self.matrix = np.zeros((max_entries, dim), dtype=np.float32)
+        self.answers: List[str] = [""] * max_entries
+        self.keys: List[str] = [""] * max_entries
+        self.stored_at = np.zeros(max_entries, dtype=np.float64)
+        self.size = 0
+        self.next_slot = 0
+
+
+class SemanticCache:
+    """
+    에이전트 중간 결과(요구사항 분석, 설계 초안) 유사도 캐시.
+
+    - 역할별로 NumPy 행렬을 따로 두고, 행렬곱 한 번으로 cosine top-1 을 찾는다.
+    - key(구조화 필드 등 정확히 같아야 하는 부분)가 같은 항목 중에서만 찾고,
+      유사도가 역할별 임계값 이상이면 이전 응답을 재사용 (LLM 호출 생략)
+    - TTL 이 지난 항목은 적중으로 치지 않는다.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 7 * 24 * 3600) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._indexes: Dict[str, _RoleIndex] = {}
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm > 0 else v
+
+    def lookup(self, role: str, vector: List[float], threshold: float, key: str = "") -> Optional[Tuple[str, float]]:
+        """(응답, 유사도) 또는 None (key 가 다른 항목은 후보에서 제외)"""
+        query = self._normalize(vector)
+        with self._lock:
+            index = self._indexes.get(role)
+            result: Optional[Tuple[str, float]] = None
+            if index is not None and index.size and index.matrix.shape[1] == query.shape[0]:
+                scores = index.matrix[: index.size] @ query
+                # 만료된 항목은 후보에서 제외
+                expired = index.stored_at[: index.size] < time.time() - self.ttl_seconds
+                scores[expired] = -1.0
+                mismatched = np.fromiter((k != key for k in index.keys[: index.size]), dtype=bool, count=index.size)
+                scores[mismatched] = -1.0
+                best = int(np.argmax(scores))
+                score = float(scores[best])
+                if score >= threshold:
+                    result = (index.answers[best], score)
+
+            counter = self.hits if result else self.misses
+            counter[role] = counter.get(role, 0) + 1
+            return result
+
+    def add(self, role: str, vector: List[float], answer: str, key: str = "") -> None:
+        v = self._normalize(vector)
+        with self._lock:
+            index = self._indexes.get(role)
+            if index is None or index.matrix.shape[1] != v.shape[0]:
+                index = _RoleIndex(v.shape[0], self.max_entries)
+                self._indexes[role] = index
+            slot = index.next_slot
+            index.matrix[slot] = v
+            index.answers[slot] = answer
+            index.keys[slot] = key
+            index.stored_at[slot] = time.time()
+            index.next_slot = (slot + 1) % self.max_entries
+            index.size = min(index.size + 1, self.max_entries)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            roles = set(self.hits) | set(self.misses) | set(self._indexes)
+            return {
+                role: {
+                    "size": self._indexes[role].size if role in self._indexes else 0,
+                    "hits": self.hits.get(role, 0),
+                    "misses": self.misses.get(role, 0),
+                }
+                for role in sorted(roles)
+            }
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_loaded = False
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    프로세스 공유 유사도 캐시 (비활성 시 None)
+
+    - LEGO_SEMANTIC_CACHE: off(기본) | on  (임계값 검증 전까지 기본 끔)
+    - LEGO_SEMANTIC_CACHE_SIZE (기본 512): 역할별 최대 항목 수
+    - LEGO_SEMANTIC_CACHE_TTL (기본 7일, 초)
+    """
+    global _semantic_cache, _semantic_cache_loaded
+    with _semantic_cache_lock:
+        if not _semantic_cache_loaded:
+            enabled = (os.getenv("LEGO_SEMANTIC_CACHE") or "off").strip().lower() not in ("off", "0", "false", "none")
+            if enabled:
+                _semantic_cache = SemanticCache(
+                    max_entries=get_int_env("LEGO_SEMANTIC_CACHE_SIZE", 512),
+                    ttl_seconds=float(get_int_env("LEGO_SEMANTIC_CACHE_TTL", 7 * 24 * 3600)),
+                )
+            _semantic_cache_loaded = True
+        return _semantic_cache
+
+
+def get_similarity_threshold(role: str, default: Optional[float]) -> Optional[float]:
+    """역할별 임계값 (LEGO_SEMANTIC_THRESHOLD_<ROLE> 로 덮어쓰기, 'off' 면 비활성)"""
+    value = (os.getenv(f"LEGO_SEMANTIC_THRESHOLD_{role}") or "").strip().lower()
+    if not value:
+        return default
+    if value in ("off", "none"):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("[SemanticCache] 임계값이 숫자가 아닙니다: %s=%s", role, value)
+        return default
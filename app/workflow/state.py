@@ -1,4 +1,4 @@
-from typing import Dict, List, TypedDict, Optional
+from typing import Any, Dict, List, TypedDict, Optional
 
 
 class AgentRole:
@@ -6,6 +6,7 @@ class AgentRole:
     REQUIREMENTS = "REQUIREMENTS"  # 요구사항 분석
     DESIGN = "DESIGN"              # 설계 생성
     REFINER = "REFINER"            # 최종 정리
+    FAST = "FAST"                  # 빠른 모드 (요구사항 정리 + 최종 가이드 1회 호출)
 
     @classmethod
     def to_korean(cls, role: str) -> str:
@@ -13,6 +14,7 @@ class AgentRole:
             cls.REQUIREMENTS: "요구사항 분석",
             cls.DESIGN: "설계 생성",
             cls.REFINER: "최종 정리",
+            cls.FAST: "빠른 설계 가이드",
         }
         return role_map.get(role, role)
 
@@ -30,6 +32,9 @@ class LegoState(TypedDict, total=False):
     docs: Dict[str, List[str]]
     contexts: Dict[str, str]
 
+    # 그래프 진입 시 미리 가져온 에이전트별 RAG 검색 결과 (비동기 실행 경로)
+    prefetched: Dict[str, List[Any]]
+
     # 최종 결과
     final_answer: str
 
@@ -0,0 +1,12 @@
+"""
+오프라인 성능 벤치마크 (Azure OpenAI / Rebrickable 없이 fake 모델과 mock 서버로 실행)
+
+    python -m benchmarks.run --output bench.json
+"""
+import os
+import sys
+
+# app/ 아래 모듈은 app 디렉터리를 기준으로 import 한다 (streamlit run app/main.py 와 동일)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
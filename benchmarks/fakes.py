@@ -0,0 +1,321 @@
+"""
+벤치마크용 fake 모델 (지연 시간 주입 가능)
+
+- LatencyChatModel : 역할(system prompt)별 고정 응답을 토큰 단위로 스트리밍, 첫 토큰/토큰 간 지연 설정
+                     (받은 프롬프트의 역할/토큰 수를 prompt_log 에 기록 – 프롬프트 예산 확인용,
+                      prompt_cache=True 면 Azure OpenAI 프롬프트 prefix 캐시를 흉내 내 cache_read 토큰 보고)
+- LatencyEmbeddings: 텍스트 해시 기반 결정적 벡터, 호출당 지연 + 호출 수 집계
+"""
+import os
+import re
+import time
+import hashlib
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from utils.prompt import REQUIREMENTS_ANALYZER_PROMPT, DESIGN_AGENT_PROMPT, REFINER_AGENT_PROMPT, FAST_GUIDE_PROMPT
+from utils.tokens import count_tokens
+
+# ------------------------------------------------------------
+# 고정 응답
+# ------------------------------------------------------------
+REQUIREMENTS_RESPONSE = (
+    "## 요구사항 요약\n"
+    "- 목표: 전시용 소형 창작물\n- 스케일: 소형 (16x16 베이스)\n- 난이도: 입문자\n"
+    "- 핵심 색상: 빨강, 흰색, 회색\n- 제약: 부품 수 200개 이하\n"
+)
+
+DESIGN_RESPONSE = (
+    "## 설계 초안\n"
+    "1. 16x16 베이스플레이트 위에 2x4 브릭으로 외벽을 엇갈려 쌓습니다.\n"
+    "2. 지붕은 경사 브릭과 타일로 마감합니다.\n"
+    "3. 창문 프레임과 투명 패널로 정면 디테일을 추가합니다.\n"
+) * 3
+
+# 실제 모델 응답 길이에 가까운 긴 응답 (프롬프트 예산 벤치마크용)
+# – 설계 초안이 요구사항 요약 줄을 그대로 다시 인용하는 경우가 많아 중복 줄 포함
+LONG_REQUIREMENTS_RESPONSE = (
+    "## 1. 작품 개요\n"
+    "빨간 지붕과 흰 벽을 가진 전시용 소형 주택으로, 정면 창문과 출입문 디테일을 살린 입문자용 창작물입니다.\n\n"
+    "## 2. 필수 조건\n"
+    "- 규모/크기: 16x16 베이스플레이트 안에서 완성되는 소형 작품\n"
+    "- 용도: 책상 위 전시용 (가끔 지붕을 열어 내부를 볼 수 있으면 좋음)\n"
+    "- 색상/테마: 빨강 지붕, 흰색 외벽, 회색 기초, 투명 창문\n"
+    "- 부품 종류: 기본 브릭, 플레이트, 경사 브릭, 타일 위주\n"
+    "- 높이/가로 제한: 높이 15cm 이하, 가로 13cm 이하\n\n"
+    "## 3. 기술적 요구\n"
+    "- 기어/모터/조명: 사용하지 않음 (추정: 입문자용이므로 단순 구조 선호)\n"
+    "- 안정성: 벽은 엇갈려 쌓아 들어 올려도 흔들리지 않도록 보강\n\n"
+    "## 4. 기타 제약/선호\n"
+    "- 부품 수 200개 이하, 조립 시간 1시간 이내\n"
+    "- 추정: 예산은 일반 클래식 박스 1~2개 수준\n"
+) * 2
+
+LONG_DESIGN_RESPONSE = (
+    "## 1. 전체 컨셉 요약\n"
+    "빨간 지붕과 흰 벽을 가진 전시용 소형 주택으로, 정면 창문과 출입문 디테일을 살린 입문자용 창작물입니다.\n\n"
+    "## 2. 구조 설계\n"
+    "- 규모/크기: 16x16 베이스플레이트 안에서 완성되는 소형 작품\n"
+    "- 색상/테마: 빨강 지붕, 흰색 외벽, 회색 기초, 투명 창문\n"
+    + "".join(
+        f"- 외벽 {i}단: 2x4 브릭과 1x2 브릭을 엇갈려 쌓고, 모서리는 2x2 브릭으로 묶어 흔들림을 줄입니다.\n"
+        for i in range(1, 17)
+    )
+    + "\n## 3. 조립 순서 가이드\n"
+    + "".join(
+        f"{i}단계: 바닥 플레이트 위에 {i}번째 층을 올리고 창문 프레임 위치를 확인한 뒤 타일로 마감합니다.\n"
+        for i in range(1, 25)
+    )
+    + "\n## 4. 브릭/부품 제안\n"
+    + "".join(f"- {t} {num} ({name}): {desc}\n" for t, num, name, desc in [
+        ("브릭", "3001", "Brick 2 x 4", "외벽 기본 구조"),
+        ("경사 브릭", "3039", "Slope 45 2 x 2", "지붕 경사"),
+        ("타일", "3069b", "Tile 1 x 2", "지붕 마감"),
+    ])
+    + "\n## 5. 확장/응용 아이디어\n"
+    "- 지붕 분리형 구조로 내부 가구 추가\n- 정원과 울타리를 더한 디오라마 확장\n"
+)
+
+# 브릭 표 행: (부품 종류, 부품 번호, 부품 이름, 설명) – 9로 시작하는 번호는 mock 서버에서 404
+_PART_ROWS = [
+    ("브릭", "3001", "Brick 2 x 4", "외벽 기본 구조"),
+    ("브릭", "3003", "Brick 2 x 2", "모서리 보강"),
+    ("브릭", "3004", "Brick 1 x 2", "창문 주변 마감"),
+    ("브릭", "3010", "Brick 1 x 4", "벽 상단 연결"),
+    ("플레이트", "3020", "Plate 2 x 4", "층 구분"),
+    ("플레이트", "3022", "Plate 2 x 2", "바닥 보강"),
+    ("플레이트", "3023", "Plate 1 x 2", "디테일 장식"),
+    ("타일", "3069b", "Tile 1 x 2", "지붕 마감"),
+    ("경사 브릭", "3039", "Slope 45 2 x 2", "지붕 경사"),
+    ("경사 브릭", "3040", "Slope 45 2 x 1", "지붕 끝 처리"),
+    ("창문", "60592", "Window 1 x 2 x 2", "정면 창문"),
+    ("투명 패널", "60601", "Glass for Window", "창문 유리"),
+    ("문", "60596", "Door Frame 1 x 4 x 6", "출입문 프레임"),
+    ("베이스플레이트", "3867", "Baseplate 16 x 16", "전체 바닥"),
+    ("테크닉 빔", "32524", "Technic Beam 1 x 7", "내부 보강"),
+    ("테크닉 핀", "2780", "Technic Pin", "빔 연결"),
+    ("기어", "3647", "Technic Gear 8 Tooth", "회전 장식"),
+    ("기어", "3648", "Technic Gear 24 Tooth", "감속 장치"),
+    ("축", "3705", "Technic Axle 4", "기어 축"),
+    ("라운드 브릭", "3062b", "Brick Round 1 x 1", "기둥 장식"),
+    ("잘못된 번호", "99999", "Unknown", "존재하지 않는 부품 (negative cache 확인용)"),
+    ("잘못된 번호", "98765", "Unknown", "존재하지 않는 부품"),
+    ("흰색 2x4 브릭", "", "", "번호 없이 텍스트 검색"),
+    ("회색 1x6 플레이트", "", "", "번호 없이 텍스트 검색"),
+    ("투명 1x1 라운드 플레이트", "", "", "번호 없이 텍스트 검색"),
+]
+
+
+def build_sample_answer(n_parts: int = 25) -> str:
+    """Refiner 최종 답변 형태의 샘플 (5. 브릭/부품 제안 표 포함)"""
+    rows = [_PART_ROWS[i % len(_PART_ROWS)] for i in range(n_parts)]
+    table = ["| 부품 종류 | 부품 번호 | 부품 이름 | 이미지 | 설명 및 용도 |", "| --- | --- | --- | --- | --- |"]
+    table += [f"| {t} | {num} | {name} |  | {desc} |" for t, num, name, desc in rows]
+    return (
+        "## 1. 작품 개요\n소형 전시용 빨간 지붕 집입니다.\n\n"
+        "## 2. 요구사항 정리\n- 소형, 입문자, 전시용\n\n"
+        "## 3. 구조 설계\n" + DESIGN_RESPONSE + "\n"
+        "## 4. 조립 순서\n1. 바닥\n2. 벽\n3. 지붕\n\n"
+        "## 5. 브릭/부품 제안\n" + "\n".join(table) + "\n\n"
+        "## 6. 추가 팁\n- 모서리는 엇갈려 쌓으세요.\n"
+    )
+
+
+SAMPLE_ANSWER = build_sample_answer()
+
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+_HISTORY_SIZE = 64
+
+
+def _split_tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+class LatencyChatModel(BaseChatModel):
+    """
+    system prompt 로 역할을 구분해 고정 응답을 돌려주는 fake 채팅 모델
+
+    - ttft: 첫 토큰까지 지연(초), token_delay: 토큰 사이 지연(초), prefill_per_1k: 입력 길이 비례 추가 지연
+    - 마지막 청크에 usage_metadata(대략적인 토큰 수)를 실어 보냄
+    """
+
+    ttft: float = 0.0
+    token_delay: float = 0.0
+    # 입력 1000 토큰당 첫 토큰 추가 지연(초) – 긴 프롬프트의 prefill 비용 흉내
+    prefill_per_1k: float = 0.0
+    requirements_answer: str = REQUIREMENTS_RESPONSE
+    design_answer: str = DESIGN_RESPONSE
+    refiner_answer: str = SAMPLE_ANSWER
+    calls: int = 0
+    # (역할, system + user 본문 토큰 수) – utils.tokens.count_tokens 기준 (프롬프트 예산과 같은 계산)
+    prompt_log: List[Tuple[str, int]] = Field(default_factory=list)
+    # 프롬프트 prefix 캐시 흉내: 최근 프롬프트와 앞부분이 CACHE_MIN_TOKENS 이상 같으면
+    # CACHE_BLOCK_TOKENS 단위로 cache_read 보고, 캐시된 토큰은 prefill 지연에서 제외
+    prompt_cache: bool = False
+    prompt_history: List[str] = Field(default_factory=list)
+    # 응답 앞에 요청별 메모 줄을 붙여 단계마다 다른 텍스트가 되게 함 (실제 모델처럼 앞 단계 결과가 요청마다 다름)
+    vary_responses: bool = False
+    # 로그/라우팅 요약에 표시되는 이름 (AzureChatOpenAI.deployment_name 과 같은 역할)
+    deployment_name: str = "benchmark-fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-latency-chat"
+
+    @staticmethod
+    def _role_for(messages: List[BaseMessage]) -> str:
+        # system 메시지 뒤에 지식 문서 전체가 붙을 수 있으므로 앞부분으로 비교
+        system = str(messages[0].content) if messages else ""
+        if system.startswith(REFINER_AGENT_PROMPT):
+            return "REFINER"
+        if system.startswith(FAST_GUIDE_PROMPT):
+            return "FAST"
+        if system.startswith(DESIGN_AGENT_PROMPT):
+            return "DESIGN"
+        if system.startswith(REQUIREMENTS_ANALYZER_PROMPT):
+            return "REQUIREMENTS"
+        return ""
+
+    def _cached_tokens(self, prompt: str) -> int:
+        """이전 프롬프트들과 가장 길게 겹치는 prefix 의 캐시 적중 토큰 수"""
+        common = max((len(os.path.commonprefix([prompt, old])) for old in self.prompt_history), default=0)
+        self.prompt_history.append(prompt)
+        del self.prompt_history[:-_HISTORY_SIZE]
+        tokens = count_tokens(prompt[:common])
+        if tokens < CACHE_MIN_TOKENS:
+            return 0
+        return CACHE_MIN_TOKENS + (tokens - CACHE_MIN_TOKENS) // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+
+    def _response_for(self, messages: List[BaseMessage]) -> Tuple[str, float, int]:
+        """(응답 텍스트, 첫 토큰까지 지연, 캐시 적중 입력 토큰) – 지연은 ttft + 캐시 안 된 입력의 prefill 시간"""
+        role = self._role_for(messages)
+        prompt_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        self.calls += 1
+        self.prompt_log.append((role, prompt_tokens))
+        cached = self._cached_tokens("\0".join(str(m.content) for m in messages)) if self.prompt_cache else 0
+        delay = self.ttft + self.prefill_per_1k * (prompt_tokens - cached) / 1000
+
+        if role in ("REFINER", "FAST"):
+            # 빠른 모드도 최종 가이드(같은 표 형식)를 바로 작성
+            text = self.refiner_answer
+        elif role == "DESIGN":
+            text = self.design_answer
+        elif role == "REQUIREMENTS":
+            text = self.requirements_answer
+        else:
+            text = "ok"
+        if self.vary_responses and role not in ("REFINER", "FAST"):
+            digest = hashlib.sha1(str(messages[-1].content).encode("utf-8")).hexdigest()[:12]
+            text = f"요청 메모: {digest}\n{text}"
+        return text, delay, cached
+
+    def _usage(self, messages: List[BaseMessage], tokens: List[str], cached: int = 0) -> dict:
+        input_tokens = sum(len(_split_tokens(str(m.content))) for m in messages)
+        usage = {"input_tokens": input_tokens, "output_tokens": len(tokens), "total_tokens": input_tokens + len(tokens)}
+        if cached:
+            usage["input_token_details"] = {"cache_read": cached}
+        return usage
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text, delay, cached = self._response_for(messages)
+        tokens = _split_tokens(text)
+        time.sleep(delay + self.token_delay * len(tokens))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, tokens, cached))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text, delay, cached = self._response_for(messages)
+        tokens = _split_tokens(text)
+        time.sleep(delay)
+        for i, token in enumerate(tokens):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        usage = self._usage(messages, tokens, cached)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        text, delay, cached = self._response_for(messages)
+        tokens = _split_tokens(text)
+        await asyncio.sleep(delay)
+        for i, token in enumerate(tokens):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        usage = self._usage(messages, tokens, cached)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+
+class LatencyEmbeddings(Embeddings):
+    """결정적 fake 임베딩 + 호출당 지연 + 호출 수 집계 (embed_documents 는 배치 1회를 1호출로 계산)"""
+
+    def __init__(self, size: int = 256, latency: float = 0.0) -> None:
+        self._base = DeterministicFakeEmbedding(size=size)
+        self.latency = latency
+        self.query_calls = 0
+        self.document_calls = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.document_calls += 1
+        time.sleep(self.latency)
+        return self._base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            self.query_calls += 1
+        time.sleep(self.latency)
+        return self._base.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with self._lock:
+            self.query_calls += 1
+        await asyncio.sleep(self.latency)
+        return self._base.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.document_calls += 1
+        await asyncio.sleep(self.latency)
+        return self._base.embed_documents(texts)
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.query_calls = 0
+            self.document_calls = 0
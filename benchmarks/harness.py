@@ -0,0 +1,128 @@
+"""
+벤치마크 측정 유틸
+
+- 지연 시간: p50/p95/p99/평균/최소/최대 (ms)
+- 처리량: 초당 실행 수
+- 메모리: tracemalloc 으로 별도 1회 실행한 Python 힙 최대 사용량(MB)
+"""
+import time
+import asyncio
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """선형 보간 백분위수 (sorted_values 는 오름차순)"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(samples: List[float], wall: float, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    values = sorted(samples)
+    result: Dict[str, Any] = {
+        "iterations": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "min_ms": round(values[0] * 1000, 3) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        "throughput_per_sec": round(len(values) / wall, 3) if wall > 0 else 0.0,
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def _peak_memory_mb(fn: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 3)
+
+
+def measure(
+    fn: Callable[[int], Any],
+    iterations: int,
+    warmup: int = 1,
+    setup: Optional[Callable[[int], Any]] = None,
+    track_memory: bool = True,
+) -> Dict[str, Any]:
+    """
+    fn(i) 를 iterations 번 순차 실행하며 측정.
+
+    - setup(i) 는 매 실행 전에 호출되고 측정 시간에서 제외 (캐시 초기화 등)
+    - 메모리는 측정 루프와 별도로 1회 더 실행해 구함 (tracemalloc 오버헤드가 지연 시간에 섞이지 않도록)
+    """
+    for i in range(warmup):
+        if setup:
+            setup(-1 - i)
+        fn(-1 - i)
+
+    samples: List[float] = []
+    wall_started = time.perf_counter()
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    wall = sum(samples) if setup else time.perf_counter() - wall_started
+
+    extra: Dict[str, Any] = {}
+    if track_memory:
+        if setup:
+            setup(iterations)
+        extra["peak_memory_mb"] = _peak_memory_mb(lambda: fn(iterations))
+    return summarize(samples, wall, extra)
+
+
+def measure_async(
+    fn: Callable[[int], Awaitable[Any]],
+    iterations: int,
+    concurrency: int = 1,
+    warmup: int = 1,
+    track_memory: bool = True,
+) -> Dict[str, Any]:
+    """
+    코루틴 fn(i) 를 최대 concurrency 개씩 동시에 실행하며 측정 (하나의 이벤트 루프에서 실행).
+
+    - 지연 시간은 요청별, 처리량은 전체 벽시계 시간 기준
+    """
+
+    async def _run() -> Dict[str, Any]:
+        for i in range(warmup):
+            await fn(-1 - i)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        samples: List[float] = []
+
+        async def _one(i: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                await fn(i)
+                samples.append(time.perf_counter() - started)
+
+        wall_started = time.perf_counter()
+        await asyncio.gather(*(_one(i) for i in range(iterations)))
+        wall = time.perf_counter() - wall_started
+
+        extra: Dict[str, Any] = {"concurrency": concurrency}
+        if track_memory:
+            tracemalloc.start()
+            try:
+                await fn(iterations)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            extra["peak_memory_mb"] = round(peak / (1024 * 1024), 3)
+        return summarize(samples, wall, extra)
+
+    return asyncio.run(_run())
@@ -0,0 +1,244 @@
+"""
+예전(단일 패스 파서 도입 전) 브릭 섹션 파서 사본 – 파서 벤치마크의 비교 기준
+
+app/main.py 에 있던 split_brick_section / parse_brick_rows_from_section 을 그대로 옮겨 둔 것
+(build_brick_view 의 섹션 정리 단계 포함). 앱에서는 쓰지 않는다.
+"""
+import re
+import logging
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def split_brick_section(answer: str) -> Tuple[str, str, str]:
+    """전체 답변에서 '5. 브릭/부품 제안' 섹션만 분리."""
+    pattern = r"^\s*(?:[#*]+\s*)?5\.\s*브릭\s*/?\s*부품\s*제안.*$"
+
+    match = re.search(pattern, answer, flags=re.MULTILINE)
+    if not match:
+        logger.info("[legacy_parser] '브릭/부품 제안' 섹션 헤더를 찾지 못했습니다.")
+        return answer, "", ""
+
+    header_start = match.start()
+    header_end = match.end()
+    logger.info(
+        "[legacy_parser] 브릭/부품 제안 헤더 위치: start=%d, end=%d",
+        header_start,
+        header_end,
+    )
+
+    rest = answer[header_end:]
+    next_sec_match = re.search(r"(?m)^\s*\d+\.\s", rest)
+    if next_sec_match:
+        section_end = header_end + next_sec_match.start()
+    else:
+        section_end = len(answer)
+
+    before = answer[:header_start]
+    brick_section = answer[header_start:section_end]
+    after = answer[section_end:]
+
+    logger.info(
+        "[legacy_parser] 브릭/부품 제안 섹션 분리 완료: before_len=%d, section_len=%d, after_len=%d",
+        len(before),
+        len(brick_section),
+        len(after),
+    )
+    return before, brick_section, after
+
+
+def _extract_first_part_num(text: str) -> str:
+    """설명 문자열에서 LEGO 파트 번호로 보이는 첫 숫자 뽑기 (3~6자리)."""
+    m = re.search(r"\b(\d{3,6})\b", text)
+    if not m:
+        return ""
+    return m.group(1)
+
+
+def parse_brick_rows_from_section(brick_section: str) -> List[Dict[str, Any]]:
+    """
+    브릭/부품 제안 섹션 텍스트에서 행(row) 리스트 추출.
+
+    새 표 형식 (우선 지원):
+      | 부품 종류 | 부품 번호 | 부품 이름 | 이미지 | 설명 및 용도 |
+
+    - 에이전트가 위 형식을 지키면 이 규칙으로 파싱
+    - 그렇지 않은 경우에는 기존(레거시) 3~4열 포맷으로 최대한 해석
+    """
+    lines = brick_section.splitlines()
+    if not lines:
+        return []
+
+    # 첫 줄은 보통 "5. 브릭/부품 제안" 헤더 → 내용에서 제외
+    content_lines = [ln for ln in lines[1:] if ln.strip()]
+    if not content_lines:
+        return []
+
+    # --- 헤더 행 찾기 ---
+    header_idx = None
+    for idx, line in enumerate(content_lines):
+        stripped = line.strip()
+        if "|" not in stripped:
+            continue
+        # 구분선(| --- | --- |)은 제외
+        sep_candidate = stripped.replace("|", "").strip()
+        if sep_candidate and set(sep_candidate) <= set("-: "):
+            continue
+        header_idx = idx
+        break
+
+    if header_idx is None:
+        logger.warning("[legacy_parser] 브릭/부품 제안 섹션에서 테이블 헤더를 찾지 못했습니다.")
+        return []
+
+    header_line = content_lines[header_idx].strip()
+    header_cells = [c.strip() for c in header_line.strip("|").split("|")]
+    n_cols = len(header_cells)
+    header_text = " ".join(header_cells)
+
+    logger.info("[legacy_parser] 브릭/부품 헤더: %s", header_cells)
+
+    # --- 새 표 형식인지 먼저 판별 ---
+    is_new_standard = (
+        any("부품 종류" in c for c in header_cells)
+        and any("부품 번호" in c for c in header_cells)
+        and any("부품 이름" in c for c in header_cells)
+        and any("이미지" in c for c in header_cells)
+        and ("설명" in header_text or "용도" in header_text)
+    )
+
+    rows: List[Dict[str, Any]] = []
+
+    if is_new_standard:
+        # ✅ 새 표 포맷: 부품 종류 / 부품 번호 / 부품 이름 / 이미지 / 설명 및 용도
+        logger.info("[legacy_parser] 새 표 형식(5열)으로 브릭 제안 파싱")
+
+        # 각 컬럼 인덱스 찾기 (혹시 순서가 바뀌어도 이름으로 찾도록)
+        def find_idx(keyword: str, default: int) -> int:
+            for i, c in enumerate(header_cells):
+                if keyword in c:
+                    return i
+            return default
+
+        idx_type = find_idx("부품 종류", 0)
+        idx_num = find_idx("부품 번호", 1 if n_cols > 1 else 0)
+        idx_desc = find_idx("설명", n_cols - 1)
+
+        for line in content_lines[header_idx + 1 :]:
+            stripped = line.strip()
+            if not stripped or "|" not in stripped:
+                continue
+
+            # 구분선 스킵
+            sep_candidate = stripped.replace("|", "").strip()
+            if sep_candidate and set(sep_candidate) <= set("-: "):
+                continue
+
+            cells = [c.strip() for c in stripped.strip("|").split("|")]
+            if len(cells) < 3:  # 최소 3개는 있어야 의미 있음
+                continue
+
+            # 인덱스 범위 방어
+            def safe_get(c_list, idx):
+                return c_list[idx] if 0 <= idx < len(c_list) else ""
+
+            part_type = safe_get(cells, idx_type)
+            part_num = safe_get(cells, idx_num)
+            description = safe_get(cells, idx_desc)
+
+            # URL이 설명에 들어온 경우는 후처리에서 제거하므로 여기서는 그대로 둠
+            rows.append(
+                {
+                    "part_type": part_type,
+                    "part_num": part_num,
+                    "description": description,
+                }
+            )
+
+        logger.info("[legacy_parser] 새 표 형식으로 파싱된 행 수: %d", len(rows))
+        return rows
+
+    # ------------------------------------------------------------
+    # 이하: 레거시 3~4열 포맷 (예전 규칙) → 기존 코드 최대한 유지
+    # ------------------------------------------------------------
+    logger.info("[legacy_parser] 레거시 표 형식으로 브릭 제안 파싱 시도")
+
+    # 첫 줄은 '5. 브릭/부품 제안' 헤더일 가능성이 크니 건너뜀
+    # 이미 content_lines 는 1줄 건너뛴 상태
+    # header_idx 이후가 실제 데이터
+    content_lines_after_header = content_lines
+    header_line = content_lines_after_header[header_idx].strip()
+    header_cells = [c.strip() for c in header_line.strip("|").split("|")]
+    n_cols = len(header_cells)
+    header_text = " ".join(header_cells)
+
+    # --- 포맷 판별 (기존 로직) ---
+    format_type = "type_first_detail_3"
+
+    if n_cols >= 4 and "용도" in header_cells[0] and "부품 번호" in header_text:
+        format_type = "usage_first_4"
+    elif n_cols == 3 and (
+        "상세 예시" in header_cells[1]
+        or "상세 설명" in header_cells[1]
+        or "상세 예시 및 부품 번호" in header_cells[1]
+    ):
+        format_type = "type_first_detail_3"
+    else:
+        if n_cols >= 3 and "상세" in header_cells[1]:
+            format_type = "type_first_detail_3"
+        elif n_cols >= 4:
+            format_type = "usage_first_4"
+
+    logger.info("[legacy_parser] 브릭/부품 제안 레거시 포맷 판별: %s", format_type)
+
+    def _extract_first_part_num(text: str) -> str:
+        m = re.search(r"\b(\d{3,6}[a-zA-Z]?)\b", text)
+        return m.group(1) if m else ""
+
+    for line in content_lines_after_header[header_idx + 1 :]:
+        stripped = line.strip()
+        if not stripped or "|" not in stripped:
+            continue
+        sep_candidate = stripped.replace("|", "").strip()
+        if sep_candidate and set(sep_candidate) <= set("-: "):
+            continue
+
+        cells = [c.strip() for c in stripped.strip("|").split("|")]
+
+        if format_type == "usage_first_4":
+            if len(cells) < 4:
+                continue
+            usage = cells[0]
+            part_type = cells[1]
+            part_num = cells[2]
+            description = cells[3] or usage
+        else:  # type_first_detail_3
+            if len(cells) < 3:
+                continue
+            part_type = cells[0]
+            detail = cells[1]
+            description = cells[2]
+            part_num = _extract_first_part_num(detail)
+
+        rows.append(
+            {
+                "part_type": part_type,
+                "part_num": part_num,
+                "description": description,
+            }
+        )
+
+    logger.info("[legacy_parser] 레거시 포맷으로 파싱된 행 수: %d", len(rows))
+    return rows
+
+
+def parse_answer_legacy(answer: str) -> List[Dict[str, Any]]:
+    """예전 build_brick_view 와 같은 순서로 섹션 분리 → '\\n' 줄 제거 → 표 파싱"""
+    _, brick_section, _ = split_brick_section(answer)
+    if not brick_section:
+        return []
+    section_lines = [ln for ln in brick_section.splitlines() if ln.strip() and ln.strip() != r"\n"]
+    if not section_lines:
+        return []
+    return parse_brick_rows_from_section("\n".join(section_lines))
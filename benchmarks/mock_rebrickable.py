@@ -0,0 +1,158 @@
+"""
+로컬 mock Rebrickable API 서버 (벤치마크/수동 확인용)
+
+- GET /api/v3/lego/parts/{part_num}/      : 9로 시작하는 번호는 404, 나머지는 가짜 부품 정보
+- GET /api/v3/lego/parts/?search=...      : 검색 결과 1건
+- GET /api/v3/lego/parts/?part_nums=a,b   : 일괄 조회 (prewarm)
+- GET /media/parts/{part_num}.png          : 가짜 부품 이미지 (part_img_url 이 가리킴, 이미지 캐시 확인용)
+- 모든 요청에 latency(초) 만큼 지연
+
+    with MockRebrickableServer(latency=0.05) as server:
+        os.environ["REBRICKABLE_API_BASE"] = server.api_base
+"""
+import io
+import json
+import time
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def _fake_part(part_num: str, media_base: str) -> Dict[str, Any]:
+    return {
+        "part_num": part_num,
+        "name": f"Mock Part {part_num}",
+        "part_img_url": f"{media_base}/media/parts/{part_num}.png",
+    }
+
+
+def _fake_image(part_num: str, width: int = 400, height: int = 300) -> bytes:
+    """부품 번호별로 색이 다른 PNG (CDN 원본 이미지 크기 정도)"""
+    from PIL import Image
+
+    seed = zlib.crc32(part_num.encode("utf-8"))
+    color = (seed & 0xFF, (seed >> 8) & 0xFF, (seed >> 16) & 0xFF)
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, format="PNG")
+    return out.getvalue()
+
+
+class MockRebrickableServer:
+    """스레드에서 동작하는 mock 서버 (with 문으로 시작/종료)"""
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.latency = latency
+        self.requests = 0
+        self.image_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_base(self) -> str:
+        """REBRICKABLE_API_BASE 에 넣을 값 (클라이언트가 /lego 를 붙임)"""
+        return f"{self.base_url}/api/v3"
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send_image(self, part_num: str) -> None:
+                payload = _fake_image(part_num)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send(self, status: int, body: Optional[Dict[str, Any]] = None) -> None:
+                payload = json.dumps(body or {}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                parts = [p for p in url.path.split("/") if p]
+                query = parse_qs(url.query)
+                is_image = parts[:2] == ["media", "parts"]
+
+                with server._lock:
+                    if is_image:
+                        server.image_requests += 1
+                    else:
+                        server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                # /media/parts/{part_num}.png
+                if is_image and len(parts) == 3:
+                    self._send_image(parts[2].rsplit(".", 1)[0])
+                    return
+
+                # /api/v3/lego/parts/{part_num}/
+                if len(parts) == 5 and parts[-2] == "parts":
+                    part_num = parts[-1]
+                    if part_num.startswith("9"):
+                        self._send(404, {"detail": "Not found."})
+                    else:
+                        self._send(200, _fake_part(part_num, server.base_url))
+                    return
+
+                # /api/v3/lego/parts/?part_nums= | ?search=
+                if "part_nums" in query:
+                    nums = [n for n in query["part_nums"][0].split(",") if n and not n.startswith("9")]
+                    results = [_fake_part(n, server.base_url) for n in nums]
+                    self._send(200, {"count": len(nums), "next": None, "results": results})
+                    return
+                if query.get("search", [""])[0]:
+                    self._send(200, {"count": 1, "next": None, "results": [_fake_part("3001", server.base_url)]})
+                    return
+                self._send(200, {"count": 0, "next": None, "results": []})
+
+        return Handler
+
+    def start(self) -> "MockRebrickableServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-rebrickable", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockRebrickableServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="mock Rebrickable API 서버")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="요청당 지연(초)")
+    args = parser.parse_args()
+
+    with MockRebrickableServer(latency=args.latency, port=args.port) as srv:
+        print(f"REBRICKABLE_API_BASE={srv.api_base}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,872 @@
+"""
+오프라인 end-to-end 벤치마크 실행기
+
+    python -m benchmarks.run                                  # 모든 단계, 결과 JSON 을 stdout 으로
+    python -m benchmarks.run --stages graph,brick_table --output bench.json
+    python -m benchmarks.run --llm-ttft 0.3 --llm-token-delay 0.01 --embed-latency 0.05
+
+- Azure OpenAI 대신 LatencyChatModel / LatencyEmbeddings, Rebrickable 대신 로컬 mock 서버 사용
+- 색인/캐시 파일은 모두 임시 디렉터리에 만들고 끝나면 삭제 (저장소의 app/cache, chroma_db 는 건드리지 않음)
+- 결과는 커밋 간 비교할 수 있도록 JSON 으로 출력 (단계별 p50/p95/p99, 처리량, 최대 메모리)
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+import benchmarks  # noqa: F401  (app 디렉터리를 sys.path 에 추가)
+from benchmarks.fakes import LatencyChatModel, LatencyEmbeddings, SAMPLE_ANSWER, build_sample_answer
+from benchmarks.harness import measure, measure_async, summarize
+from benchmarks.mock_rebrickable import MockRebrickableServer
+
+logger = logging.getLogger("benchmarks")
+
+GOALS = [
+    "빨간 지붕의 작은 집",
+    "기어로 움직이는 풍차",
+    "32x32 베이스플레이트 위 중세 성",
+    "파스텔 톤 카페 디오라마",
+    "테크닉 빔으로 만든 크레인",
+    "미니피겨용 2층 주택",
+]
+SCALES = ["소형", "중형", "대형"]
+
+RETRIEVAL_QUERIES = ["기어", "테크닉 빔", "32x32 베이스플레이트", "파스텔 색 조합", "창문 비율"]
+
+
+def _sidebar(scale: str) -> Dict[str, str]:
+    return {
+        "mode": "자유 창작",
+        "scale": scale,
+        "usage": "전시용",
+        "difficulty": "입문자",
+        "colors": "빨강, 흰색",
+        "parts": "",
+        "constraints": "",
+    }
+
+
+def _user_input(i: int) -> str:
+    """반복마다 다른 입력 (캐시 적중이 결과를 왜곡하지 않도록)"""
+    from utils.user_input import build_user_input
+
+    goal = GOALS[i % len(GOALS)]
+    return build_user_input(f"{goal} #{i}", _sidebar(SCALES[i % len(SCALES)]))
+
+
+def configure_environment(workdir: str, args: argparse.Namespace, api_base: str) -> None:
+    """app 모듈을 import 하기 전에 벤치마크용 환경변수 설정"""
+    os.environ.update(
+        {
+            # get_llm()/pipeline_signature() 가 요구하는 값 (실제 호출은 하지 않음)
+            "AOAI_ENDPOINT": "http://127.0.0.1:9",
+            "AOAI_API_KEY": "benchmark",
+            "AOAI_DEPLOY_GPT4O_MINI": "benchmark-mini",
+            "AOAI_DEPLOY_EMBED_3_SMALL": "benchmark-embed",
+            # 캐시는 단계별로 명시적으로 켜고 끈다
+            "LEGO_SEMANTIC_CACHE": "on" if args.semantic_cache else "off",
+            "LEGO_RESULT_CACHE": "off",
+            "LEGO_KNOWLEDGE_WATCH_INTERVAL": "0",
+            # Rebrickable → mock 서버, 카탈로그 없음, 캐시는 임시 파일
+            "REBRICKABLE_API_KEY": "benchmark",
+            "REBRICKABLE_API_BASE": api_base,
+            "REBRICKABLE_CATALOG_PATH": os.path.join(workdir, "no_catalog.sqlite3"),
+            "REBRICKABLE_CACHE_PATH": os.path.join(workdir, "parts.sqlite3"),
+            "LEGO_IMAGE_CACHE_DIR": os.path.join(workdir, "images"),
+            "REBRICKABLE_RATE_PER_SEC": str(args.rebrickable_rate),
+            "REBRICKABLE_BURST": str(args.rebrickable_burst),
+        }
+    )
+
+
+def _use_index(workdir: str, embeddings: LatencyEmbeddings, backend: str = "numpy", mode: str = "hybrid") -> None:
+    """임시 디렉터리의 색인으로 벡터스토어를 다시 연다"""
+    import retrieval.vector_store as vector_store
+
+    os.environ["LEGO_VECTOR_BACKEND"] = backend
+    os.environ["LEGO_RETRIEVAL_MODE"] = mode
+    vector_store.PERSIST_DIR = os.path.join(workdir, "chroma_db")
+    vector_store.NUMPY_INDEX_DIR = os.path.join(workdir, "numpy_index")
+    vector_store.reset_vectorstore(embeddings)
+    vector_store.get_vectorstore()
+
+
+# ------------------------------------------------------------
+# 단계별 벤치마크
+# ------------------------------------------------------------
+def bench_clients(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """공유 클라이언트 재사용(get_llm) vs 매 노드마다 새 AzureChatOpenAI 생성 (네트워크/TLS 비용 제외, 생성 비용만)"""
+    from langchain_openai import AzureChatOpenAI
+    from utils.config import get_llm, _get_azure_base
+
+    get_llm()
+    endpoint, api_key, api_version = _get_azure_base()
+
+    def new_client(_: int) -> None:
+        AzureChatOpenAI(
+            azure_endpoint=endpoint,
+            azure_deployment=os.environ["AOAI_DEPLOY_GPT4O_MINI"],
+            openai_api_key=api_key,
+            api_version=api_version,
+        )
+
+    n = ctx["iterations"] * 3  # 그래프 1회 = 노드 3개
+    return {
+        "registry_get_llm": measure(lambda _: get_llm(), n, track_memory=False),
+        "new_client_per_node": measure(new_client, n, track_memory=False),
+    }
+
+
+def bench_retrieval(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """백엔드(chroma/numpy) x 검색 방식(hybrid/vector) 별 search_lego_info 지연 시간과 임베딩 호출 수"""
+    import retrieval.vector_store as vector_store
+
+    results: Dict[str, Any] = {}
+    for backend in ("chroma", "numpy"):
+        for mode in ("hybrid", "vector"):
+            embeddings = LatencyEmbeddings(latency=ctx["embed_latency"])
+            started = time.perf_counter()
+            _use_index(ctx["workdir"], embeddings, backend=backend, mode=mode)
+            open_sec = time.perf_counter() - started
+
+            embeddings.reset_counts()
+            before = vector_store.get_retrieval_stats()
+            # 매 반복마다 질의 뒤에 번호를 붙여 임베딩 캐시 적중을 피함
+            stats = measure(
+                lambda i: vector_store.search_lego_info(f"{RETRIEVAL_QUERIES[i % len(RETRIEVAL_QUERIES)]} {i}", k=4),
+                ctx["iterations"],
+            )
+            stats["open_and_sync_ms"] = round(open_sec * 1000, 3)
+            stats["embed_query_calls"] = embeddings.query_calls
+            after = vector_store.get_retrieval_stats()
+            stats["retrieval_paths"] = {
+                name: after[name] - before[name] for name in ("vector", "hybrid", "lexical_fast_path")
+            }
+            results[f"{backend}_{mode}"] = stats
+    _use_index(ctx["workdir"], ctx["embeddings"])
+    return results
+
+
+def bench_context_size(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """고정 입력 세트에서 에이전트별 RAG 컨텍스트 토큰 수 (평균/최대)"""
+    from utils.tokens import count_tokens, get_encoding_name
+    from workflow.agents.requirements_agent import RequirementsAgent
+    from workflow.agents.design_agent import DesignAgent
+    from workflow.agents.refiner_agent import RefinerAgent
+    from retrieval.vector_store import search_lego_info
+    from utils.user_input import build_user_input
+    from workflow.graph import build_initial_state
+
+    llm = ctx["llm"]
+    agents = [RequirementsAgent(k=2, llm=llm), DesignAgent(k=4, llm=llm), RefinerAgent(k=2, llm=llm)]
+    per_role: Dict[str, List[int]] = {agent.role: [] for agent in agents}
+    for goal in GOALS:
+        for scale in SCALES:
+            state = build_initial_state(build_user_input(goal, _sidebar(scale)))
+            for agent in agents:
+                docs = search_lego_info(agent._build_search_query(state), k=agent.k)
+                _, context, _ = agent._build_llm_messages(state, docs)
+                per_role[agent.role].append(count_tokens(context))
+
+    result: Dict[str, Any] = {
+        role: {"mean_tokens": round(sum(v) / len(v), 1), "max_tokens": max(v)} for role, v in per_role.items()
+    }
+    result["inputs"] = len(GOALS) * len(SCALES)
+    result["tokenizer"] = get_encoding_name() or "estimate"
+    return result
+
+
+def bench_graph(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """그래프 전체: 동기 invoke / 비동기 ainvoke(RAG prefetch) / 동시 실행 처리량 / 스트리밍 TTFT / 실행당 임베딩 호출 수"""
+    from workflow.graph import create_lego_graph, build_initial_state, stream_lego_graph
+
+    graph = create_lego_graph(llm=ctx["llm"])
+    embeddings: LatencyEmbeddings = ctx["embeddings"]
+    iterations = ctx["iterations"]
+    results: Dict[str, Any] = {}
+
+    embeddings.reset_counts()
+    results["invoke_sync"] = measure(lambda i: graph.invoke(build_initial_state(_user_input(i))), iterations)
+    results["invoke_sync"]["embed_query_calls_per_run"] = round(embeddings.query_calls / (iterations + 2), 2)
+
+    embeddings.reset_counts()
+    results["ainvoke"] = measure_async(
+        lambda i: graph.ainvoke(build_initial_state(_user_input(10_000 + i))), iterations, concurrency=1
+    )
+    results["ainvoke"]["embed_query_calls_per_run"] = round(embeddings.query_calls / (iterations + 2), 2)
+
+    results["ainvoke_concurrent"] = measure_async(
+        lambda i: graph.ainvoke(build_initial_state(_user_input(20_000 + i))),
+        iterations,
+        concurrency=ctx["concurrency"],
+    )
+
+    # 스트리밍: 첫 토큰까지 시간(TTFT)과 전체 시간
+    ttft: List[float] = []
+    total: List[float] = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        first: Optional[float] = None
+        for event in stream_lego_graph(graph, build_initial_state(_user_input(30_000 + i))):
+            if first is None and event["type"] == "token":
+                first = time.perf_counter() - started
+        total.append(time.perf_counter() - started)
+        ttft.append(first if first is not None else total[-1])
+    results["stream_ttft"] = summarize(ttft, sum(total))
+    results["stream_total"] = summarize(total, sum(total))
+    return results
+
+
+def bench_prompt_budget(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    프롬프트 토큰 예산: 실제 길이에 가까운 긴 fake 응답으로 예산 없음 / 기본 예산 / 빡빡한 예산 비교
+    (tight = 예산 없이 받은 최대 토큰의 80%)
+    역할별 fake 모델이 받은 프롬프트 토큰(평균/최대)과 예산 준수 여부, 실행당 절감 토큰,
+    그래프 지연 (fake 모델은 --prefill-per-1k 만큼 입력 길이에 비례해 첫 토큰이 늦어짐)
+    """
+    from utils.tokens import get_encoding_name
+    from utils.user_input import build_user_input
+    from workflow.agents.base_agent import get_prompt_budget
+    from workflow.agents.requirements_agent import RequirementsAgent
+    from workflow.agents.design_agent import DesignAgent
+    from workflow.agents.refiner_agent import RefinerAgent
+    from workflow.graph import create_lego_graph, build_initial_state
+    from workflow.state import AgentRole
+    from benchmarks.fakes import LONG_REQUIREMENTS_RESPONSE, LONG_DESIGN_RESPONSE
+
+    base: LatencyChatModel = ctx["llm"]
+    llm = LatencyChatModel(
+        ttft=base.ttft,
+        token_delay=base.token_delay,
+        requirements_answer=LONG_REQUIREMENTS_RESPONSE,
+        design_answer=LONG_DESIGN_RESPONSE,
+        refiner_answer=base.refiner_answer,
+        prefill_per_1k=ctx["prefill_per_1k"],
+    )
+    graph = create_lego_graph(llm=llm)
+    defaults = {
+        AgentRole.REQUIREMENTS: RequirementsAgent.PROMPT_TOKEN_BUDGET,
+        AgentRole.DESIGN: DesignAgent.PROMPT_TOKEN_BUDGET,
+        AgentRole.REFINER: RefinerAgent.PROMPT_TOKEN_BUDGET,
+    }
+    variants = {
+        "unbounded": {role: 0 for role in defaults},
+        "default": dict(defaults),
+        "tight": {},
+    }
+    results: Dict[str, Any] = {"tokenizer": get_encoding_name() or "estimate"}
+
+    for variant, budgets in variants.items():
+        if variant == "tight":
+            budgets.update({role: int(results["unbounded"][role]["max_tokens"] * 0.8) for role in defaults})
+        env = {f"LEGO_PROMPT_BUDGET_{role}": str(budget) for role, budget in budgets.items()}
+        saved_env = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            llm.prompt_log.clear()
+            saved: List[int] = []
+            durations: List[float] = []
+            for i, (goal, scale) in enumerate((g, s) for g in GOALS for s in SCALES):
+                user_input = build_user_input(f"{goal} #{50_000 + i}", _sidebar(scale))
+                started = time.perf_counter()
+                state = graph.invoke(build_initial_state(user_input))
+                durations.append(time.perf_counter() - started)
+                saved.append(sum((m.get("timing") or {}).get("prompt_tokens_saved", 0) for m in state["messages"]))
+
+            stats = summarize(durations, sum(durations))
+            for role in defaults:
+                tokens = [n for r, n in llm.prompt_log if r == role]
+                budget = get_prompt_budget(role, 0)
+                stats[role] = {
+                    "budget": budget,
+                    "mean_tokens": round(sum(tokens) / len(tokens), 1),
+                    "max_tokens": max(tokens),
+                    "within_budget": budget <= 0 or max(tokens) <= budget,
+                }
+            stats["mean_tokens_saved_per_run"] = round(sum(saved) / len(saved), 1)
+            stats["mean_prompt_tokens_per_run"] = round(sum(n for _, n in llm.prompt_log) / len(durations), 1)
+            results[variant] = stats
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return results
+
+
+def _search_count(stats: Dict[str, Any]) -> int:
+    return stats["vector"] + stats["hybrid"] + stats["lexical_fast_path"]
+
+
+def bench_prefix_cache(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    프롬프트 prefix 캐시 친화 배치: 지식 문서 전체를 system 에 넣는 기본 배치 vs 질의별 RAG 결과만 쓰는 배치
+    (LEGO_STATIC_KNOWLEDGE_MAX_TOKENS=0). fake 모델이 Azure 프롬프트 캐시 규칙(1024토큰 이상, 128토큰 단위)을
+    흉내 내 역할별 입력/캐시 적중 토큰, 그래프 지연, 실행당 RAG 검색 수를 비교
+    """
+    from retrieval.vector_store import get_retrieval_stats
+    from utils.user_input import build_user_input
+    from workflow.graph import create_lego_graph, build_initial_state
+    from workflow.state import AgentRole
+
+    base: LatencyChatModel = ctx["llm"]
+    inputs = [(g, s) for g in GOALS for s in SCALES]
+    variants = {"static_prefix": {}, "rag_only": {"LEGO_STATIC_KNOWLEDGE_MAX_TOKENS": "0"}}
+    results: Dict[str, Any] = {}
+
+    for variant, env in variants.items():
+        saved_env = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            llm = LatencyChatModel(
+                ttft=base.ttft,
+                token_delay=base.token_delay,
+                refiner_answer=base.refiner_answer,
+                prefill_per_1k=ctx["prefill_per_1k"],
+                prompt_cache=True,
+                vary_responses=True,
+            )
+            graph = create_lego_graph(llm=llm)
+            per_role: Dict[str, Dict[str, List[int]]] = {}
+            durations: List[float] = []
+            searches_before = _search_count(get_retrieval_stats())
+            for i, (goal, scale) in enumerate(inputs):
+                user_input = build_user_input(f"{goal} #{60_000 + i}", _sidebar(scale))
+                started = time.perf_counter()
+                state = graph.invoke(build_initial_state(user_input))
+                durations.append(time.perf_counter() - started)
+                for message in state["messages"]:
+                    timing = message.get("timing") or {}
+                    role_stats = per_role.setdefault(message["role"], {"prompt": [], "cached": []})
+                    role_stats["prompt"].append(timing.get("prompt_tokens", 0))
+                    role_stats["cached"].append(timing.get("cached_input_tokens", 0))
+
+            stats = summarize(durations, sum(durations))
+            for role in (AgentRole.REQUIREMENTS, AgentRole.DESIGN, AgentRole.REFINER):
+                prompt, cached = per_role[role]["prompt"], per_role[role]["cached"]
+                stats[role] = {
+                    "mean_prompt_tokens": round(sum(prompt) / len(prompt), 1),
+                    "mean_cached_tokens": round(sum(cached) / len(cached), 1),
+                    "cached_ratio": round(sum(cached) / max(sum(prompt), 1), 3),
+                }
+            searches = _search_count(get_retrieval_stats()) - searches_before
+            stats["rag_searches_per_run"] = round(searches / len(inputs), 2)
+            results[variant] = stats
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return results
+
+
+def bench_routing(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    역할별 모델 라우팅: 모든 역할 strong vs 기본 라우팅(요구사항 fast, 설계/정리는 복잡한 입력만 strong)
+    소형/대형 입력별 전체 지연, 역할별 LLM 지연(p50), 역할별 tier (strong 은 fast 보다 --strong-slowdown 배 느린 fake 모델)
+    """
+    from utils.user_input import build_user_input
+    from workflow.graph import create_lego_graph, build_initial_state
+    from workflow.model_routing import ModelRouter, ROUTE_DEFAULTS
+
+    base: LatencyChatModel = ctx["llm"]
+    slowdown = ctx["strong_slowdown"]
+    models = {
+        "fast": LatencyChatModel(
+            ttft=base.ttft, token_delay=base.token_delay, refiner_answer=base.refiner_answer, deployment_name="fake-fast"
+        ),
+        "strong": LatencyChatModel(
+            ttft=base.ttft * slowdown,
+            token_delay=base.token_delay * slowdown,
+            refiner_answer=base.refiner_answer,
+            deployment_name="fake-strong",
+        ),
+    }
+    graph = create_lego_graph(router=ModelRouter(factory=lambda route: models[route.tier]))
+    iterations = max(3, ctx["iterations"] // 2)
+    variants = {
+        "all_strong": {f"LEGO_MODEL_TIER_{role}": "strong" for role in ROUTE_DEFAULTS},
+        "routed": {},
+    }
+    results: Dict[str, Any] = {"strong_slowdown": slowdown}
+
+    for variant, env in variants.items():
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            for scale in ("소형", "대형"):
+                totals: List[float] = []
+                per_role: Dict[str, List[float]] = {}
+                tiers: Dict[str, str] = {}
+                for i in range(iterations):
+                    user_input = build_user_input(f"{GOALS[i % len(GOALS)]} #{40_000 + i}", _sidebar(scale))
+                    started = time.perf_counter()
+                    state = graph.invoke(build_initial_state(user_input))
+                    totals.append(time.perf_counter() - started)
+                    for message in state["messages"]:
+                        timing = message.get("timing") or {}
+                        per_role.setdefault(message["role"], []).append(timing.get("llm_sec", 0.0))
+                        tiers[message["role"]] = timing.get("tier", "")
+                stats = summarize(totals, sum(totals))
+                stats["per_role_llm_p50_ms"] = {
+                    role: summarize(values, sum(values))["p50_ms"] for role, values in per_role.items()
+                }
+                stats["tiers"] = tiers
+                results[f"{variant}_{scale}"] = stats
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return results
+
+
+def bench_fast_mode(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    빠른 모드(LLM 1회 호출) vs 3단계 파이프라인: 소형/입문자 입력의 전체 지연, 첫 토큰/최종 가이드 첫 토큰 시간,
+    실행당 LLM 호출 수/RAG 검색 수/입력·출력 토큰, 최종 답변의 브릭 표 행 수 (같은 표 형식인지 확인)
+    (요구사항/설계 fake 응답은 실제 길이에 가까운 긴 응답, --prefill-per-1k 로 입력 길이만큼 첫 토큰 지연)
+    """
+    from retrieval.vector_store import get_retrieval_stats
+    from utils.answer_parser import parse_answer
+    from utils.user_input import build_user_input
+    from workflow.graph import (
+        create_pipeline_graph,
+        build_initial_state,
+        stream_lego_graph,
+        select_pipeline,
+        PIPELINE_AUTO,
+        PIPELINE_NODE_LABELS,
+        PIPELINES,
+    )
+    from benchmarks.fakes import LONG_REQUIREMENTS_RESPONSE, LONG_DESIGN_RESPONSE
+
+    base: LatencyChatModel = ctx["llm"]
+    sidebar = _sidebar("소형 (16x16 베이스 안쪽 / 손바닥 크기)")
+    results: Dict[str, Any] = {"auto_pipeline": select_pipeline(PIPELINE_AUTO, sidebar)}
+
+    for pipeline in PIPELINES:
+        llm = LatencyChatModel(
+            ttft=base.ttft,
+            token_delay=base.token_delay,
+            requirements_answer=LONG_REQUIREMENTS_RESPONSE,
+            design_answer=LONG_DESIGN_RESPONSE,
+            refiner_answer=base.refiner_answer,
+            prefill_per_1k=ctx["prefill_per_1k"],
+        )
+        graph = create_pipeline_graph(pipeline, llm=llm)
+        final_node = list(PIPELINE_NODE_LABELS[pipeline])[-1]
+        totals: List[float] = []
+        first_token: List[float] = []
+        final_first_token: List[float] = []
+        tokens = {"prompt": 0, "input": 0, "output": 0}
+        brick_rows: List[int] = []
+        searches_before = _search_count(get_retrieval_stats())
+        for i in range(ctx["iterations"]):
+            user_input = build_user_input(f"{GOALS[i % len(GOALS)]} #{70_000 + i}", sidebar)
+            started = time.perf_counter()
+            first: Optional[float] = None
+            final_first: Optional[float] = None
+            state: Dict[str, Any] = {}
+            for event in stream_lego_graph(graph, build_initial_state(user_input)):
+                if event["type"] == "token":
+                    elapsed = time.perf_counter() - started
+                    first = first if first is not None else elapsed
+                    if final_first is None and event["node"] == final_node:
+                        final_first = elapsed
+                elif event["type"] == "final":
+                    state = event["state"]
+            totals.append(time.perf_counter() - started)
+            first_token.append(first if first is not None else totals[-1])
+            final_first_token.append(final_first if final_first is not None else totals[-1])
+            for message in state.get("messages", []):
+                timing = message.get("timing") or {}
+                tokens["prompt"] += timing.get("prompt_tokens", 0)
+                tokens["input"] += timing.get("input_tokens", 0)
+                tokens["output"] += timing.get("output_tokens", 0)
+            brick_rows.append(len(parse_answer(state.get("final_answer") or "")["rows"]))
+
+        runs = len(totals)
+        stats = summarize(totals, sum(totals))
+        stats["first_token_p50_ms"] = summarize(first_token, sum(first_token))["p50_ms"]
+        stats["final_guide_first_token_p50_ms"] = summarize(final_first_token, sum(final_first_token))["p50_ms"]
+        stats["llm_calls_per_run"] = round(llm.calls / runs, 2)
+        stats["rag_searches_per_run"] = round((_search_count(get_retrieval_stats()) - searches_before) / runs, 2)
+        stats["tokens_per_run"] = {kind: round(value / runs, 1) for kind, value in tokens.items()}
+        stats["min_brick_rows"] = min(brick_rows)
+        results[pipeline] = stats
+
+    full, fast = results["full"], results["fast"]
+    results["fast_vs_full"] = {
+        "p50_speedup": round(full["p50_ms"] / max(fast["p50_ms"], 1e-9), 2),
+        "input_tokens_ratio": round(fast["tokens_per_run"]["input"] / max(full["tokens_per_run"]["input"], 1), 3),
+        "output_tokens_ratio": round(fast["tokens_per_run"]["output"] / max(full["tokens_per_run"]["output"], 1), 3),
+    }
+    return results
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def load_corpus() -> List[Dict[str, Any]]:
+    """benchmarks/corpus/*.md 답변 + expected.json 의 기대 부품 번호"""
+    with open(os.path.join(CORPUS_DIR, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    cases = []
+    for name in sorted(expected):
+        # CRLF 사례를 그대로 읽도록 줄바꿈 변환 없이 읽음
+        with open(os.path.join(CORPUS_DIR, name), encoding="utf-8", newline="") as f:
+            cases.append({"name": name, "answer": f.read(), "part_nums": expected[name]["part_nums"]})
+    return cases
+
+
+def _score_rows(rows: List[Dict[str, Any]], expected: List[str]) -> Dict[str, int]:
+    """표에 표시될 부품 번호(prepare_brick_rows 와 같은 추출) 기준으로 기대 행과 대조"""
+    from utils.answer_parser import split_part_num
+
+    got = [split_part_num(r.get("part_type") or "", r.get("part_num") or "")[0] for r in rows]
+    remaining = list(expected)
+    matched = 0
+    for num in got:
+        if num in remaining:
+            remaining.remove(num)
+            matched += 1
+    return {"expected": len(expected), "parsed": len(got), "matched": matched}
+
+
+def bench_parse(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    최종 답변 파싱: 코퍼스(benchmarks/corpus) 행 재현율/정밀도 + 처리량(answers/s)
+    단일 패스 파서(utils.answer_parser)와 예전 파서(benchmarks.legacy_parser)를 나란히 측정
+    """
+    from utils.answer_parser import parse_answer
+    from benchmarks.legacy_parser import parse_answer_legacy
+
+    parsers: Dict[str, Callable[[str], List[Dict[str, Any]]]] = {
+        "single_pass": lambda answer: parse_answer(answer)["rows"],
+        "legacy": parse_answer_legacy,
+    }
+    corpus = load_corpus()
+    large_answer = build_sample_answer(100)
+    results: Dict[str, Any] = {"corpus_cases": len(corpus)}
+
+    per_case: Dict[str, Dict[str, Any]] = {case["name"]: {} for case in corpus}
+    for name, parse in parsers.items():
+        totals = {"expected": 0, "parsed": 0, "matched": 0}
+        for case in corpus:
+            score = _score_rows(parse(case["answer"]), case["part_nums"])
+            per_case[case["name"]][name] = f"{score['matched']}/{score['expected']} (+{score['parsed'] - score['matched']})"
+            for key in totals:
+                totals[key] += score[key]
+
+        answers = [case["answer"] for case in corpus]
+        corpus_stats = measure(lambda i: parse(answers[i % len(answers)]), ctx["iterations"] * 50)
+        results[name] = {
+            "row_recall": round(totals["matched"] / totals["expected"], 4),
+            "row_precision": round(totals["matched"] / totals["parsed"], 4) if totals["parsed"] else 1.0,
+            "answers_per_sec": corpus_stats["throughput_per_sec"],
+            "corpus": corpus_stats,
+            "sample_25_parts": measure(lambda _: parse(ctx["answer"]), ctx["iterations"] * 50),
+            "sample_100_parts": measure(lambda _: parse(large_answer), ctx["iterations"] * 20),
+        }
+
+    # 사례별 "맞은 행/기대 행 (+잘못 들어간 행)"
+    results["per_case"] = per_case
+    results["recall_regressions"] = [
+        name for name, case in per_case.items()
+        if int(case["single_pass"].split("/")[0]) < int(case["legacy"].split("/")[0])
+    ]
+    results["answer_chars"] = len(ctx["answer"])
+    return results
+
+
+def bench_brick_table(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    브릭 표 HTML 생성 (Rebrickable mock): 캐시 없이 병렬/순차, 파트/이미지 캐시 적중,
+    Streamlit 재실행(화면 캐시 적중), 점진 렌더링 첫 표시
+    """
+    from components.brick_table import build_brick_table_html
+    from utils.answer_parser import parse_answer
+    from utils.image_cache import ImageCache, reset_image_cache
+    from utils.part_cache import PartCache
+    from utils.rebrickable_client import RebrickableClient
+
+    rows = parse_answer(ctx["answer"])["rows"]
+    server: MockRebrickableServer = ctx["server"]
+    cache_dir = os.path.join(ctx["workdir"], "brick_table")
+    os.makedirs(cache_dir, exist_ok=True)
+    iterations = max(3, ctx["iterations"] // 4)
+    results: Dict[str, Any] = {}
+
+    def use_cold_caches(tag: str) -> None:
+        RebrickableClient._part_cache = PartCache(os.path.join(cache_dir, f"{tag}.sqlite3"))
+        reset_image_cache(ImageCache(os.path.join(cache_dir, f"{tag}_images")))
+
+    def cold_cache(tag: str) -> Callable[[int], None]:
+        return lambda i: use_cold_caches(f"{tag}_{i}")
+
+    def remote_images(html: str) -> int:
+        """브라우저가 원격(CDN)에서 받아야 하는 이미지 수"""
+        return html.count("<img src='http")
+
+    runs = iterations + 2  # warmup 1 + 측정 + 메모리 측정 1
+    for name, workers in (("cold_parallel", None), ("cold_sequential", 1)):
+        client = RebrickableClient()
+        if workers:
+            client.max_workers = workers
+        before, images_before = server.requests, server.image_requests
+        stats = measure(lambda _: build_brick_table_html(rows, client), iterations, setup=cold_cache(name))
+        stats["http_requests_per_run"] = round((server.requests - before) / runs, 2)
+        stats["image_downloads_per_run"] = round((server.image_requests - images_before) / runs, 2)
+        stats["max_workers"] = client.max_workers
+        results[name] = stats
+
+    client = RebrickableClient()
+    use_cold_caches("warm")
+    build_brick_table_html(rows, client)
+    before, images_before = server.requests, server.image_requests
+    stats = measure(lambda _: build_brick_table_html(rows, client), ctx["iterations"])
+    html = build_brick_table_html(rows, client)
+    stats["http_requests_per_run"] = round((server.requests - before) / (ctx["iterations"] + 2), 2)
+    stats["image_downloads_total"] = server.image_requests - images_before
+    stats["remote_images_in_html"] = remote_images(html)
+    stats["html_kb"] = round(len(html.encode("utf-8")) / 1024, 1)
+    results["warm_cache"] = stats
+
+    # 이미지 캐시를 끈 경우 (표에 원본 URL → 페이지를 열 때마다 브라우저가 CDN 에서 이미지를 받음)
+    reset_image_cache(None)
+    os.environ["LEGO_IMAGE_CACHE"] = "off"
+    html = build_brick_table_html(rows, client)
+    results["without_image_cache"] = {
+        "remote_images_in_html": remote_images(html),
+        "html_kb": round(len(html.encode("utf-8")) / 1024, 1),
+    }
+    os.environ["LEGO_IMAGE_CACHE"] = "on"
+    use_cold_caches("rerun")
+
+    # Streamlit 재실행: 같은 답변이면 답변 해시로 파싱 결과와 조회 작업(최종 HTML)을 재사용
+    import hashlib
+    from main import _cached_brick_view, get_brick_table_job
+
+    _cached_brick_view.clear()
+    get_brick_table_job.clear()
+    answer = ctx["answer"]
+    answer_key = hashlib.sha256(answer.encode("utf-8")).hexdigest()
+    get_brick_table_job(answer_key, _cached_brick_view(answer_key, answer)["rows"]).wait()
+    before, images_before = server.requests, server.image_requests
+
+    def rerun(_: int) -> None:
+        view = _cached_brick_view(hashlib.sha256(answer.encode("utf-8")).hexdigest(), answer)
+        get_brick_table_job(answer_key, view["rows"]).html()
+
+    stats = measure(rerun, ctx["iterations"])
+    stats["http_requests_total"] = server.requests - before
+    stats["image_downloads_total"] = server.image_requests - images_before
+    results["rerun_memoized"] = stats
+
+    # 점진 렌더링: 답변 → 자리표시 표 HTML 까지 (첫 표시) vs 모든 칸이 채워질 때까지, 부품 수별
+    from main import build_brick_view
+    from components.brick_table import BrickTableJob
+
+    for n_parts in (5, 25, 100):
+        sample = build_sample_answer(n_parts)
+        first_paint: List[float] = []
+        complete: List[float] = []
+        for i in range(iterations):
+            use_cold_caches(f"progressive_{n_parts}_{i}")
+            started = time.perf_counter()
+            job = BrickTableJob(build_brick_view(sample)["rows"], RebrickableClient()).start()
+            job.html()
+            first_paint.append(time.perf_counter() - started)
+            job.wait()
+            complete.append(time.perf_counter() - started)
+        results[f"progressive_{n_parts}_parts"] = {
+            "first_paint": summarize(first_paint, sum(first_paint)),
+            "complete": summarize(complete, sum(complete)),
+        }
+    results["rows"] = len(rows)
+    return results
+
+
+def bench_result_cache(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """결과 캐시 조회(적중) 지연 시간 – 메모리/디스크 백엔드"""
+    from workflow.result_cache import ResultCache, MemoryBackend, DiskBackend, design_cache_key
+
+    state = {"final_answer": ctx["answer"], "messages": [{"role": "REFINER", "content": ctx["answer"]}]}
+    results: Dict[str, Any] = {}
+    for name, backend in (
+        ("memory", MemoryBackend()),
+        ("disk", DiskBackend(os.path.join(ctx["workdir"], "results.sqlite3"))),
+    ):
+        cache = ResultCache(backend)
+        key = design_cache_key(_user_input(0), {"benchmark": True})
+        cache.set(key, state)
+        results[name] = measure(lambda _: cache.get(key), ctx["iterations"] * 50)
+    return results
+
+
+def bench_metrics(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """계측 오버헤드: span/inc 1회 비용 (꺼짐/켜짐)과 계측을 켠 그래프 1회 실행의 구간별 시간"""
+    from utils import metrics
+    from workflow.graph import create_lego_graph, build_initial_state
+
+    calls = 10_000
+
+    def span_loop(_: int) -> None:
+        for _ in range(calls):
+            with metrics.span("benchmark.noop", role="DESIGN"):
+                pass
+
+    def inc_loop(_: int) -> None:
+        for _ in range(calls):
+            metrics.inc("benchmark_noop_total", role="DESIGN")
+
+    was_enabled = metrics.is_enabled()
+    results: Dict[str, Any] = {}
+    try:
+        for state in ("disabled", "enabled"):
+            metrics.set_enabled(state == "enabled")
+            span_stats = measure(span_loop, max(3, ctx["iterations"] // 4), track_memory=False)
+            inc_stats = measure(inc_loop, max(3, ctx["iterations"] // 4), track_memory=False)
+            results[state] = {
+                "span_ns_per_call": round(span_stats["p50_ms"] * 1e6 / calls, 1),
+                "inc_ns_per_call": round(inc_stats["p50_ms"] * 1e6 / calls, 1),
+            }
+
+        # 계측을 켠 상태로 그래프를 실행해 구간별 시간 합계 확인
+        metrics.get_registry().reset()
+        graph = create_lego_graph(llm=ctx["llm"])
+        for i in range(ctx["iterations"]):
+            graph.invoke(build_initial_state(_user_input(40_000 + i)))
+        spans = metrics.get_registry().snapshot()["histograms"].get(metrics.SPAN_METRIC, [])
+        results["graph_spans_mean_ms"] = {
+            " ".join(f"{k}={v}" for k, v in sorted(s["labels"].items())): round(s["sum"] / s["count"] * 1000, 3)
+            for s in spans
+            if s["count"]
+        }
+    finally:
+        metrics.set_enabled(was_enabled)
+        metrics.get_registry().reset()
+    return results
+
+
+STAGES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "clients": bench_clients,
+    "retrieval": bench_retrieval,
+    "context_size": bench_context_size,
+    "graph": bench_graph,
+    "routing": bench_routing,
+    "prompt_budget": bench_prompt_budget,
+    "prefix_cache": bench_prefix_cache,
+    "fast_mode": bench_fast_mode,
+    "parse": bench_parse,
+    "brick_table": bench_brick_table,
+    "result_cache": bench_result_cache,
+    "metrics": bench_metrics,
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(benchmarks.APP_DIR),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="레고 AI 서비스 오프라인 벤치마크")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"실행할 단계 (쉼표 구분, 기본 전체: {','.join(STAGES)})")
+    parser.add_argument("--iterations", type=int, default=20, help="단계별 반복 횟수 (기본 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 그래프 실행 수 (기본 4)")
+    parser.add_argument("--llm-ttft", type=float, default=0.05, help="fake LLM 첫 토큰 지연(초)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="fake LLM 토큰 간 지연(초)")
+    parser.add_argument(
+        "--prefill-per-1k", type=float, default=0.05, help="fake 모델의 입력 1000 토큰당 첫 토큰 추가 지연(초) (prompt_budget 단계)"
+    )
+    parser.add_argument("--strong-slowdown", type=float, default=3.0, help="fake strong 모델이 fast 보다 느린 배수 (routing 단계)")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="fake 임베딩 호출당 지연(초)")
+    parser.add_argument("--rebrickable-latency", type=float, default=0.02, help="mock Rebrickable 요청당 지연(초)")
+    parser.add_argument("--rebrickable-rate", type=float, default=100.0, help="Rebrickable 토큰 버킷 초당 요청 수")
+    parser.add_argument("--rebrickable-burst", type=float, default=10.0, help="Rebrickable 토큰 버킷 burst")
+    parser.add_argument("--parts", type=int, default=25, help="샘플 답변의 브릭 표 행 수")
+    parser.add_argument("--semantic-cache", action="store_true", help="에이전트 유사 요청 캐시 켜기 (기본 끔)")
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (기본 stdout)")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"알 수 없는 단계: {', '.join(unknown)}")
+
+    # app 로거가 파일 핸들러(app/logs)를 만들지 않도록 먼저 설정
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    workdir = tempfile.mkdtemp(prefix="lego-bench-")
+    server = MockRebrickableServer(latency=args.rebrickable_latency).start()
+    try:
+        configure_environment(workdir, args, server.api_base)
+
+        embeddings = LatencyEmbeddings(latency=args.embed_latency)
+        answer = SAMPLE_ANSWER if args.parts == 25 else build_sample_answer(args.parts)
+        ctx: Dict[str, Any] = {
+            "workdir": workdir,
+            "server": server,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "embed_latency": args.embed_latency,
+            "embeddings": embeddings,
+            "strong_slowdown": args.strong_slowdown,
+            "prefill_per_1k": args.prefill_per_1k,
+            "llm": LatencyChatModel(ttft=args.llm_ttft, token_delay=args.llm_token_delay, refiner_answer=answer),
+            "answer": answer,
+        }
+        _use_index(workdir, embeddings)
+
+        results: Dict[str, Any] = {}
+        for stage in stages:
+            print(f"[benchmarks] {stage} ...", file=sys.stderr)
+            started = time.perf_counter()
+            results[stage] = STAGES[stage](ctx)
+            print(f"[benchmarks] {stage} 완료 ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "stages": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[benchmarks] 결과 저장: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()